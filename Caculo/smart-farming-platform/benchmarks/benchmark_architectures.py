@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Size, CPU latency and accuracy of each model architecture
+Trains every entry of ARCHITECTURES with train_model.create_model for a few
+epochs on the same data and reports:
+
+    params        total and trainable parameters
+    file          the saved .h5 model (without optimizer state), as served
+    1 image       median predict_on_batch latency for one image
+    batch         median per-image latency in batches of --latency-batch
+    train         seconds per training epoch
+    accuracy      on the held-out 20%
+
+Data is a packed dataset (--shards, from dataset_shards.py) or, by default,
+synthetic leaves: a shaded green leaf with class-specific lesions (dark
+spots, brown blotches, yellow mottling, white mildew, orange pustules), so
+accuracy separates the architectures without a real dataset. Each
+architecture runs in its own process. The MobileNetV2 base needs its
+ImageNet weights (downloaded once by Keras); without network access it
+starts from random weights, which is flagged in the table.
+
+A few hundred steps leave batch-norm moving statistics far from the real
+ones (moving variance still mostly its initial 1.0), so every model would
+score chance on held-out images. Before scoring, one pass over the training
+images re-estimates them with the weights fixed.
+
+Usage: python benchmarks/benchmark_architectures.py [--images 480] [--epochs 5] [--shards packed/train]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'models'))
+
+from crop_disease_model import ARCHITECTURES
+
+CLASS_COLOURS = {
+    'Bacterial Spot': (45, 30, 20),
+    'Leaf Blight': (120, 80, 40),
+    'Mosaic Virus': (190, 190, 70),
+    'Powdery Mildew': (235, 235, 225),
+    'Rust Disease': (200, 100, 30),
+}
+
+
+def _stamp(image, rng, count, radius, colour):
+    # Soft-edged discs drawn in small windows, not over the whole image
+    size = image.shape[0]
+    for _ in range(count):
+        r = rng.uniform(*radius)
+        cy, cx = rng.uniform(0, size, 2)
+        top, bottom = int(max(cy - r - 1, 0)), int(min(cy + r + 2, size))
+        left, right = int(max(cx - r - 1, 0)), int(min(cx + r + 2, size))
+        yy, xx = np.mgrid[top:bottom, left:right]
+        alpha = np.clip(r - np.hypot(yy - cy, xx - cx), 0, 1)[..., None]
+        image[top:bottom, left:right] = image[top:bottom, left:right] * (1 - alpha) + np.asarray(colour) * alpha
+
+
+def synthetic_leaves(count, class_labels, size=224, seed=0):
+    """uint8 images (count, size, size, 3) and integer labels, classes in turn"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    images = np.empty((count, size, size, 3), dtype=np.uint8)
+    labels = np.arange(count) % len(class_labels)
+    for i, label in enumerate(labels):
+        name = class_labels[label]
+        green = np.array([60, 140, 50]) + rng.normal(0, 12, 3)
+        shading = 0.8 + 0.3 * np.sin(x * rng.uniform(2, 6) + y * rng.uniform(2, 6) + rng.uniform(0, 6))
+        image = green * shading[..., None]
+        colour = np.asarray(CLASS_COLOURS.get(name, green)) + rng.normal(0, 8, 3)
+        if name == 'Bacterial Spot':
+            _stamp(image, rng, rng.integers(25, 50), (2, 5), colour)
+        elif name == 'Leaf Blight':
+            _stamp(image, rng, rng.integers(2, 5), (20, 45), colour)
+        elif name == 'Mosaic Virus':
+            mottle = np.sin(x * rng.uniform(15, 25) + rng.uniform(0, 6)) * np.sin(y * rng.uniform(15, 25))
+            alpha = np.clip(mottle * 2, 0, 1)[..., None] * 0.7
+            image = image * (1 - alpha) + colour * alpha
+        elif name == 'Powdery Mildew':
+            _stamp(image, rng, rng.integers(150, 300), (1, 2.5), colour)
+        elif name == 'Rust Disease':
+            _stamp(image, rng, rng.integers(30, 60), (2, 4), colour)
+        images[i] = np.clip(image + rng.normal(0, 10, image.shape), 0, 255).astype(np.uint8)
+    return images, labels
+
+
+def load_data(args, data_path):
+    """(train images, train labels, val images, val labels): uint8 images, integer labels"""
+    if args.shards:
+        from dataset_shards import ShardedDataset
+        from train_model import CLASS_LABELS
+
+        shards = ShardedDataset(args.shards)
+        labels = shards.labels_for(CLASS_LABELS)
+        indices = np.flatnonzero(labels >= 0)
+        indices = np.random.default_rng(0).permutation(indices)[:args.images]
+        images, labels = shards.images(np.sort(indices)), labels[np.sort(indices)]
+    else:
+        with np.load(data_path) as data:
+            images, labels = data['images'], data['labels']
+    order = np.random.default_rng(1).permutation(len(labels))
+    split = int(len(order) * 0.8)
+    train, val = order[:split], order[split:]
+    return images[train], labels[train], images[val], labels[val]
+
+
+def median_ms(call, repeats):
+    call()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def settle_batch_norm(model, dataset):
+    """Moving mean/variance of trainable batch-norm layers := average over one pass of dataset"""
+    import tensorflow as tf
+
+    layers = [layer for layer in model.layers
+              if isinstance(layer, tf.keras.layers.BatchNormalization) and layer.trainable]
+    momentum = [layer.momentum for layer in layers]
+    for step, (images, _) in enumerate(dataset):
+        for layer in layers:
+            # Cumulative average: batch k gets weight 1/(k+1)
+            layer.momentum = step / (step + 1)
+        model(images, training=True)
+    for layer, value in zip(layers, momentum):
+        layer.momentum = value
+
+
+def run_architecture(name, args, data_path, result_path):
+    """Child process: build, train, time and score one architecture"""
+    from training_runtime import apply_environment
+    apply_environment()
+    import tensorflow as tf
+    from crop_disease_model import build_architecture
+    from train_model import CLASS_LABELS, create_model
+
+    tf.keras.utils.set_random_seed(0)
+    pretrained = name == 'mobilenet'
+    try:
+        model = create_model(len(CLASS_LABELS), architecture=name)
+    except Exception as error:
+        if name != 'mobilenet':
+            raise
+        print(f"ImageNet weights unavailable ({str(error).splitlines()[0][:80]}); MobileNetV2 base starts random")
+        pretrained = False
+        model = build_architecture(name, len(CLASS_LABELS), weights=None)
+        model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+
+    train_x, train_y, val_x, val_y = load_data(args, data_path)
+    num_classes = len(CLASS_LABELS)
+
+    def batches(images, labels, shuffle):
+        dataset = tf.data.Dataset.from_tensor_slices((images, tf.one_hot(labels, num_classes)))
+        if shuffle:
+            dataset = dataset.shuffle(len(labels), seed=0)
+        return dataset.batch(args.batch_size).map(lambda x, y: (tf.cast(x, tf.float32) / 255.0, y))
+
+    start = time.perf_counter()
+    model.fit(batches(train_x, train_y, True), epochs=args.epochs, verbose=0)
+    train_s = (time.perf_counter() - start) / args.epochs
+    settle_batch_norm(model, batches(train_x, train_y, False))
+    _, accuracy = model.evaluate(batches(val_x, val_y, False), verbose=0)
+
+    model_path = os.path.join(os.path.dirname(result_path), f"{name}.h5")
+    model.save(model_path, include_optimizer=False)
+    one = val_x[:1].astype(np.float32) / 255.0
+    batch = np.resize(val_x, (args.latency_batch,) + val_x.shape[1:]).astype(np.float32) / 255.0
+    result = {
+        'params': int(model.count_params()),
+        'trainable': int(sum(int(np.prod(v.shape)) for v in model.trainable_variables)),
+        'file_mb': os.path.getsize(model_path) / 1e6,
+        'single_ms': median_ms(lambda: model.predict_on_batch(one), args.repeats),
+        'batch_ms_per_image': median_ms(lambda: model.predict_on_batch(batch), max(3, args.repeats // 5))
+                              / args.latency_batch,
+        'train_s_per_epoch': train_s,
+        'accuracy': float(accuracy),
+        'pretrained': pretrained,
+    }
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--images', type=int, default=480, help='images used, 80%% train / 20%% held out')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=8, help='training batch size')
+    parser.add_argument('--latency-batch', type=int, default=32, help='batch size for the batch latency')
+    parser.add_argument('--repeats', type=int, default=30, help='timed single-image predictions')
+    parser.add_argument('--shards', help='labelled pack from dataset_shards.py instead of synthetic leaves')
+    parser.add_argument('--architectures', nargs='+', choices=list(ARCHITECTURES), default=list(ARCHITECTURES))
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--data', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        run_architecture(args.run, args, args.data, args.result)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        data_path = os.path.join(workdir, 'data.npz')
+        if not args.shards:
+            from train_model import CLASS_LABELS
+            images, labels = synthetic_leaves(args.images, CLASS_LABELS)
+            np.savez(data_path, images=images, labels=labels)
+        for name in args.architectures:
+            result_path = os.path.join(workdir, f"{name}.json")
+            command = [sys.executable, os.path.abspath(__file__), '--run', name, '--data', data_path,
+                       '--result', result_path, '--images', str(args.images), '--epochs', str(args.epochs),
+                       '--batch-size', str(args.batch_size), '--latency-batch', str(args.latency_batch),
+                       '--repeats', str(args.repeats)]
+            if args.shards:
+                command += ['--shards', args.shards]
+            print(f"--- {name}: {ARCHITECTURES[name]}", flush=True)
+            if subprocess.call(command) or not os.path.exists(result_path):
+                rows.append((name, None))
+                continue
+            with open(result_path) as f:
+                rows.append((name, json.load(f)))
+
+    print(f"\n{os.cpu_count()} CPU core(s), {args.images} {'packed' if args.shards else 'synthetic'} images, "
+          f"{args.epochs} epochs")
+    print(f"{'architecture':>12} {'params':>11} {'trainable':>11} {'file MB':>8} {'1 image ms':>10} "
+          f"{'ms/img @' + str(args.latency_batch):>10} {'train s/ep':>10} {'accuracy':>9}")
+    for name, result in rows:
+        if result is None:
+            print(f"{name:>12} {'failed':>11}")
+            continue
+        note = '' if result['pretrained'] or name != 'mobilenet' else '  (random base: no ImageNet weights)'
+        print(f"{name:>12} {result['params']:>11,} {result['trainable']:>11,} {result['file_mb']:>8.1f} "
+              f"{result['single_ms']:>10.1f} {result['batch_ms_per_image']:>10.2f} "
+              f"{result['train_s_per_epoch']:>10.1f} {result['accuracy']:>9.3f}{note}")
+
+
+if __name__ == "__main__":
+    main()
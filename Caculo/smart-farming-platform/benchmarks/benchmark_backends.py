@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Inference backend benchmark: Keras vs TFLite float32 vs TFLite int8 vs ONNX
+Each backend runs in a fresh subprocess so load time (including imports)
+and resident memory are measured in isolation. Top-1 agreement is checked
+against the Keras model on the same random batch.
+
+Run python export_model.py first to produce the exported models.
+
+Usage: python benchmarks/benchmark_backends.py [--batch-size 16] [--repeats 10]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+def rss_mb(field):
+    """Current (VmRSS) or peak (VmHWM) resident memory of this process"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def measure(backend_name, batch_path, repeats):
+    """Runs inside the child process"""
+    start = time.perf_counter()
+    from model_backends import load_backend
+    backend = load_backend(backend_name)
+    load_seconds = time.perf_counter() - start
+    load_rss = rss_mb('VmRSS')
+
+    batch = np.load(batch_path)
+    single = batch[:1]
+    backend.predict_on_batch(single)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        backend.predict_on_batch(single)
+    single_ms = (time.perf_counter() - start) / repeats * 1000
+
+    probabilities = backend.predict_on_batch(batch)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        probabilities = backend.predict_on_batch(batch)
+    batch_ms = (time.perf_counter() - start) / repeats * 1000
+
+    np.save(f"{batch_path}.{backend_name}.npy", np.asarray(probabilities))
+    print(json.dumps({
+        'load_s': load_seconds,
+        'rss_mb': load_rss,
+        'peak_mb': rss_mb('VmHWM'),
+        'single_ms': single_ms,
+        'batch_ms_per_image': batch_ms / len(batch)
+    }))
+
+
+def run_child(backend_name, batch_path, repeats):
+    output = subprocess.check_output(
+        [sys.executable, __file__, '--child', backend_name, batch_path, '--repeats', str(repeats)],
+        cwd=ROOT, stderr=subprocess.DEVNULL
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backends', default='keras,tflite,tflite-int8,onnx')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--child', nargs=2, metavar=('BACKEND', 'BATCH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child[0], args.child[1], args.repeats)
+        return
+
+    from model_backends import BACKEND_PATHS
+
+    print(f"{'backend':>12} {'size MB':>8} {'load s':>7} {'RSS MB':>7} {'peak MB':>8} "
+          f"{'1 img ms':>9} {'batch ms/img':>13} {'top-1 agree':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_path = os.path.join(tmp, 'batch.npy')
+        batch = np.random.default_rng(0).random((args.batch_size, 224, 224, 3), dtype=np.float32)
+        np.save(batch_path, batch)
+
+        reference = None
+        for name in args.backends.split(','):
+            path = os.path.join(ROOT, BACKEND_PATHS[name])
+            if not os.path.exists(path):
+                print(f"{name:>12} skipped: {BACKEND_PATHS[name]} not found")
+                continue
+            try:
+                stats = run_child(name, batch_path, args.repeats)
+            except subprocess.CalledProcessError:
+                print(f"{name:>12} skipped: runtime not installed")
+                continue
+
+            probabilities = np.load(f"{batch_path}.{name}.npy")
+            if reference is None and name == 'keras':
+                reference = probabilities
+            agreement = (f"{np.mean(reference.argmax(1) == probabilities.argmax(1)):.1%}"
+                         if reference is not None else 'n/a')
+            print(f"{name:>12} {os.path.getsize(path) / 1e6:>8.1f} {stats['load_s']:>7.2f} "
+                  f"{stats['rss_mb']:>7.0f} {stats['peak_mb']:>8.0f} {stats['single_ms']:>9.1f} "
+                  f"{stats['batch_ms_per_image']:>13.1f} {agreement:>12}")
+
+
+if __name__ == "__main__":
+    main()
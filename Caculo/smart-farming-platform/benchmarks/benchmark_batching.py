@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Micro-batching throughput benchmark
+Runs concurrent predict() callers against CropDiseasePredictor and reports
+images/sec for each (max batch size, max delay) setting.
+
+Usage: python benchmarks/benchmark_batching.py [--clients 32] [--requests 256]
+Run from the smart-farming-platform directory.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# src/ first: the root predict.py is the visual-analysis-only predictor
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from predict import CropDiseasePredictor
+
+
+def make_images(count, seed=0):
+    """Random RGB images at typical phone-thumbnail size"""
+    rng = np.random.default_rng(seed)
+    return [Image.fromarray(rng.integers(0, 256, (300, 400, 3), dtype=np.uint8))
+            for _ in range(count)]
+
+
+def load_predictor():
+    predictor = CropDiseasePredictor()
+    if predictor.model is None:
+        # No trained model on disk: an untrained network has the same cost
+        from train_model import create_model, CLASS_LABELS
+        predictor.model = create_model(len(CLASS_LABELS))
+        predictor.class_labels = list(CLASS_LABELS)
+    return predictor
+
+
+def run(predictor, images, clients):
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        start = time.perf_counter()
+        list(pool.map(predictor.predict, images))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=32, help='concurrent callers')
+    parser.add_argument('--requests', type=int, default=256, help='images per setting')
+    parser.add_argument('--batch-sizes', default='1,4,8,16,32')
+    parser.add_argument('--delays', default='0,2,5,10', help='max delay in ms')
+    args = parser.parse_args()
+
+    predictor = load_predictor()
+    images = make_images(args.requests)
+
+    # Warm up graph tracing so the first setting is not penalised
+    predictor.predict_batch(images[:4])
+
+    elapsed = run(predictor, images, args.clients)
+    print(f"{'unbatched':>24}: {args.requests / elapsed:8.1f} img/s")
+
+    for batch_size in [int(x) for x in args.batch_sizes.split(',')]:
+        for delay in [float(x) for x in args.delays.split(',')]:
+            predictor.enable_batching(batch_size, delay)
+            elapsed = run(predictor, images, args.clients)
+            stats = predictor.get_batching_stats()
+            label = f"batch={batch_size} delay={delay:g}ms"
+            print(f"{label:>24}: {args.requests / elapsed:8.1f} img/s "
+                  f"(avg batch {stats['average_batch']:.1f})")
+            predictor.disable_batching()
+
+    start = time.perf_counter()
+    predictor.predict_batch(images)
+    elapsed = time.perf_counter() - start
+    print(f"{'predict_batch (all)':>24}: {args.requests / elapsed:8.1f} img/s")
+
+
+if __name__ == "__main__":
+    main()
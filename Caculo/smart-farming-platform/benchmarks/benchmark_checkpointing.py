@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Checkpoint cost and resume correctness for train_model.create_model
+Trains on fixed in-memory batches three ways from the same seed:
+
+    straight   all epochs in one run
+    resumed    stopped after --stop-at epochs, then a new model resumed from
+               the checkpoint (weights and optimizer state) up to the end
+    weights    the same, but loading only the weights, as the old .h5
+               save allowed
+
+and compares the final weights with the straight run (resumed should match
+exactly; weights-only restarts Adam's moments). Then reports checkpoint
+size and the per-epoch cost of checkpointing.
+
+Usage: python benchmarks/benchmark_checkpointing.py [--epochs 3] [--steps 4]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from training_runtime import apply_environment, configure_runtime
+
+apply_environment()
+import tensorflow as tf
+
+from train_model import CLASS_LABELS, create_model
+from training_callbacks import LOG_FILE, load_checkpoint_state, restore_checkpoint, training_callbacks
+
+
+def batches(steps, batch_size):
+    rng = np.random.default_rng(0)
+    images = rng.random((steps * batch_size, 224, 224, 3), dtype=np.float32)
+    labels = tf.one_hot(rng.integers(0, len(CLASS_LABELS), steps * batch_size), len(CLASS_LABELS))
+    return tf.data.Dataset.from_tensor_slices((images, labels)).batch(batch_size)
+
+
+def train(runtime, epochs, steps, batch_size, checkpoint_dir=None, resume_from=None, weights_only=False):
+    """Child process: one training run; returns its seconds"""
+    tf.keras.utils.set_random_seed(0)
+    model = create_model(len(CLASS_LABELS))
+    state = None
+    if resume_from:
+        state = load_checkpoint_state(resume_from)
+        if weights_only:
+            # Optimizer not built yet, so only the layer weights load
+            model.load_weights(os.path.join(resume_from, state['file']))
+        else:
+            restore_checkpoint(model, resume_from, state)
+    callbacks = training_callbacks(runtime, checkpoint_dir, has_validation=False,
+                                   state=None if weights_only else state)
+    start = time.perf_counter()
+    runtime.fit(model, batches(steps, batch_size), epochs=epochs, batch_size=batch_size, verbose=0,
+                callbacks=callbacks, initial_epoch=state['epoch'] if state else 0)
+    return time.perf_counter() - start
+
+
+def run(args, workdir, **options):
+    """Each run in a fresh process: weights plus Adam moments are ~0.5 GB per model"""
+    result = os.path.join(workdir, 'seconds.json')
+    command = [sys.executable, os.path.abspath(__file__), '--run', json.dumps(options), '--result', result,
+               '--steps', str(args.steps), '--batch-size', str(args.batch_size)]
+    if subprocess.call(command):
+        sys.exit(f"❌ training run {options} failed")
+    with open(result) as f:
+        return json.load(f)
+
+
+def last_epoch_weights(checkpoint_dir):
+    # The checkpoint, not the model: early stopping hands back its best epoch
+    state = load_checkpoint_state(checkpoint_dir)
+    model = create_model(len(CLASS_LABELS))
+    model.load_weights(os.path.join(checkpoint_dir, state['file']))
+    return model.get_weights()
+
+
+def max_difference(a, b):
+    return max(float(np.max(np.abs(x - y))) for x, y in zip(a, b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--stop-at', type=int, default=1, help='epochs before the simulated crash')
+    parser.add_argument('--steps', type=int, default=4, help='training steps per epoch')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        runtime = configure_runtime()
+        runtime.throughput.verbose = False
+        seconds = train(runtime, steps=args.steps, batch_size=args.batch_size, **json.loads(args.run))
+        with open(args.result, 'w') as f:
+            json.dump(seconds, f)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='checkpoint_bench_')
+    try:
+        plain_s = run(args, workdir, epochs=args.epochs)
+        straight_dir = os.path.join(workdir, 'straight')
+        checkpointed_s = run(args, workdir, epochs=args.epochs, checkpoint_dir=straight_dir)
+        straight = last_epoch_weights(straight_dir)
+
+        checkpoints = os.path.join(workdir, 'resumed')
+        run(args, workdir, epochs=args.stop_at, checkpoint_dir=checkpoints)
+        run(args, workdir, epochs=args.epochs, checkpoint_dir=checkpoints, resume_from=checkpoints)
+
+        weights_dir = os.path.join(workdir, 'weights')
+        run(args, workdir, epochs=args.stop_at, checkpoint_dir=weights_dir)
+        run(args, workdir, epochs=args.epochs, checkpoint_dir=weights_dir, resume_from=weights_dir,
+            weights_only=True)
+
+        resumed_diff = max_difference(straight, last_epoch_weights(checkpoints))
+        weights_diff = max_difference(straight, last_epoch_weights(weights_dir))
+        print(f"{'run':>34} {'max |weight - straight|':>24}")
+        print(f"{'resumed (weights + optimizer)':>34} {resumed_diff:>24.3g}")
+        print(f"{'restarted from weights only':>34} {weights_diff:>24.3g}")
+        if resumed_diff != 0.0:
+            sys.exit("❌ resumed run diverged from the uninterrupted run")
+        print("✅ resumed run is bit-identical to the uninterrupted run")
+
+        state = load_checkpoint_state(checkpoints)
+        size_mb = os.path.getsize(os.path.join(checkpoints, state['file'])) / 1e6
+        with open(os.path.join(checkpoints, LOG_FILE)) as f:
+            epochs = [json.loads(line) for line in f]
+        epoch_s = np.median([entry['seconds'] for entry in epochs])
+        print(f"checkpoint {size_mb:.0f} MB (weights + Adam moments), epoch median {epoch_s:.2f} s")
+        print(f"{args.epochs} epochs: {plain_s:.1f} s without checkpoints, {checkpointed_s:.1f} s checkpointing "
+              f"every epoch ({(checkpointed_s - plain_s) / args.epochs:+.2f} s per epoch)")
+        print(f"{LOG_FILE}: {len(epochs)} lines, e.g. {json.dumps(epochs[-1])[:120]}...")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Packed uint8 shards versus decoding JPEGs every pass
+Writes a synthetic class-folder dataset of phone-sized JPEGs, packs it with
+dataset_shards.pack, checks the packed pixels are exactly what inference
+preprocessing gives, then reports:
+
+    size      JPEGs, packed uint8 shards, and the same images as float32
+    open      time to open the pack (index, labels, memory maps)
+    read      float32 batches per second: sequential slices, random
+              gathers, and decoding the JPEGs (one process) for comparison
+    tf.data   training batches per second from shards versus from JPEGs
+
+Usage: python benchmarks/benchmark_dataset_shards.py [--images 600]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from benchmark_input_pipeline import time_epoch, write_dataset
+from data_pipeline import list_image_files, make_datasets
+from dataset_shards import ShardedDataset, make_shard_datasets, pack
+from image_pipeline import open_image, preprocess_batch
+from train_model import CLASS_LABELS
+
+
+def rate(images, seconds):
+    return f"{images / seconds:>9.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--images', type=int, default=600)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--shard-size', type=int, default=256)
+    parser.add_argument('--keep', help='write the dataset and pack here and keep them')
+    args = parser.parse_args()
+
+    workdir = args.keep or tempfile.mkdtemp(prefix='shard_bench_')
+    data_dir = os.path.join(workdir, 'dataset')
+    pack_dir = os.path.join(workdir, 'packed')
+    try:
+        if not os.path.isdir(data_dir):
+            write_dataset(data_dir, args.images)
+        paths, labels = list_image_files(data_dir, CLASS_LABELS)
+
+        start = time.perf_counter()
+        pack(data_dir, pack_dir, CLASS_LABELS, shard_size=args.shard_size)
+        pack_s = time.perf_counter() - start
+
+        opens = []
+        for _ in range(20):
+            start = time.perf_counter()
+            shards = ShardedDataset(pack_dir)
+            opens.append(time.perf_counter() - start)
+
+        sample = np.arange(0, len(paths), max(1, len(paths) // 24))
+        expected = preprocess_batch([open_image(paths[i]) for i in sample])
+        if not np.array_equal(shards.batch(sample), expected) or not np.array_equal(shards.labels, labels):
+            sys.exit("❌ packed images or labels differ from inference preprocessing")
+        print(f"✅ {len(sample)} packed images bit-identical to inference preprocessing; labels match")
+
+        jpeg_mb = sum(os.path.getsize(path) for path in paths) / 1e6
+        shard_mb = sum(os.path.getsize(os.path.join(pack_dir, s['file'])) for s in shards.index['shards']) / 1e6
+        float_mb = len(shards) * int(np.prod(shards.image_shape)) * 4 / 1e6
+        print(f"{len(shards)} images: JPEG {jpeg_mb:.0f} MB, shards {shard_mb:.0f} MB uint8, "
+              f"{float_mb:.0f} MB as float32 ({float_mb / shard_mb:.1f}x); packed in {pack_s:.1f} s")
+        print(f"open pack: median {np.median(opens) * 1000:.2f} ms over {len(opens)} opens "
+              f"({len(shards.shards)} shards)")
+
+        print(f"{'float32 batches':>30} {'images':>7} {'seconds':>8} {'images/s':>9}")
+        start = time.perf_counter()
+        count = sum(len(batch) for batch, _ in shards.iter_batches(args.batch_size))
+        seconds = time.perf_counter() - start
+        print(f"{'shards, sequential':>30} {count:>7} {seconds:>8.2f} {rate(count, seconds)}")
+
+        order = np.random.default_rng(0).permutation(len(shards))
+        start = time.perf_counter()
+        for begin in range(0, len(order), args.batch_size):
+            shards.batch(order[begin:begin + args.batch_size])
+        seconds = time.perf_counter() - start
+        print(f"{'shards, shuffled gather':>30} {len(order):>7} {seconds:>8.2f} {rate(len(order), seconds)}")
+
+        decoded = paths[:min(len(paths), 128)]
+        start = time.perf_counter()
+        for begin in range(0, len(decoded), args.batch_size):
+            preprocess_batch([open_image(path) for path in decoded[begin:begin + args.batch_size]])
+        seconds = time.perf_counter() - start
+        print(f"{'JPEG decode, 1 process':>30} {len(decoded):>7} {seconds:>8.2f} {rate(len(decoded), seconds)}")
+
+        print(f"{'tf.data training epoch':>30} {'images':>7} {'seconds':>8} {'images/s':>9}")
+        pipelines = [
+            ('shards (augmented)', make_shard_datasets(pack_dir, CLASS_LABELS, batch_size=args.batch_size,
+                                                       validation_split=0)[0]),
+            ('JPEG decode (augmented)', make_datasets(data_dir, CLASS_LABELS, batch_size=args.batch_size,
+                                                      cache_dir=None, validation_split=0)[0]),
+        ]
+        for label, dataset in pipelines:
+            count, seconds = time_epoch(dataset)
+            print(f"{label:>30} {count:>7} {seconds:>8.2f} {rate(count, seconds)}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Farming-metrics throughput benchmark and equivalence check
+Runs the scalar WeatherService._calculate_farming_metrics rules and the
+vectorized src/farming_metrics.py engine over the same hourly observations.
+
+Before timing, randomized cases (weighted towards the exact rule thresholds,
+with rain and non-rain descriptions) are compared row by row; any mismatch
+aborts with the offending input. Both paths now run the same compiled rules,
+so this only catches a divergence between them; tests/test_farming_metrics.py
+checks the vectorized engine against frozen copies of the original ladders.
+
+Usage: python benchmarks/benchmark_farming_metrics.py [--rows 1000000] [--check-cases 200000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from farming_metrics import METRIC_COLUMNS, add_farming_metrics
+from weather_service import WeatherService
+
+DESCRIPTIONS = ['clear sky', 'light rain', 'Heavy Rain', 'overcast clouds', 'humid',
+                'thunderstorm with rain', 'mist', 'Drizzle', 'sunny', 'RAIN']
+# Every threshold used by the rules, so boundaries are hit exactly
+TEMPERATURE_EDGES = [10, 15, 20, 25, 28, 30, 32, 35]
+HUMIDITY_EDGES = [40, 50, 60, 70, 75, 80]
+WIND_EDGES = [8]
+
+
+def random_observations(rows, seed=0):
+    """Hourly-style observations; a third of values sit on or next to a threshold"""
+    rng = np.random.default_rng(seed)
+
+    def column(low, high, edges, decimals):
+        values = np.round(rng.uniform(low, high, rows), decimals)
+        on_edge = rng.random(rows) < 0.33
+        nudged = rng.choice(edges, rows) + rng.choice([-0.1, 0.0, 0.0, 0.1], rows)
+        return np.where(on_edge, nudged, values)
+
+    return pd.DataFrame({
+        'temperature': column(-10, 45, TEMPERATURE_EDGES, 1),
+        'humidity': column(5, 100, HUMIDITY_EDGES, 0),
+        'wind_speed': column(0, 20, WIND_EDGES, 1),
+        'description': rng.choice(DESCRIPTIONS, rows)
+    })
+
+
+def scalar_metrics(service, frame):
+    records = frame.to_dict('records')
+    with contextlib.redirect_stdout(io.StringIO()):  # scalar rules print debug lines
+        return [service._calculate_farming_metrics(record) for record in records]
+
+
+def check_equivalence(service, cases):
+    frame = random_observations(cases, seed=1)
+    expected = pd.DataFrame(scalar_metrics(service, frame))
+    actual = add_farming_metrics(frame)[METRIC_COLUMNS]
+    for name in METRIC_COLUMNS:
+        mismatch = np.flatnonzero(actual[name].astype(object).to_numpy() != expected[name].to_numpy())
+        if len(mismatch):
+            row = mismatch[0]
+            print(f"❌ {name} differs for {frame.iloc[row].to_dict()}: "
+                  f"scalar={expected[name][row]!r} vectorized={actual[name][row]!r}")
+            sys.exit(1)
+    print(f"✅ {cases} randomized cases identical to the scalar rules")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--scalar-rows', type=int, default=100_000,
+                        help='rows timed for the scalar path (extrapolated)')
+    parser.add_argument('--check-cases', type=int, default=200_000)
+    args = parser.parse_args()
+
+    service = WeatherService()
+    check_equivalence(service, args.check_cases)
+
+    frame = random_observations(args.rows)
+    sample = frame.head(args.scalar_rows)
+
+    start = time.perf_counter()
+    scalar_metrics(service, sample)
+    scalar_rate = len(sample) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    add_farming_metrics(frame)
+    vector_rate = len(frame) / (time.perf_counter() - start)
+
+    print(f"{'method':>12} {'rows/s':>14}")
+    print(f"{'scalar':>12} {scalar_rate:>14,.0f}")
+    print(f"{'vectorized':>12} {vector_rate:>14,.0f}")
+    print(f"speedup: {vector_rate / scalar_rate:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
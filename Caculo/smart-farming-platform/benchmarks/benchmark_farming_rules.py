@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Farming rule engine benchmark
+Times metrics plus dashboard and API advice per observation for the frozen
+if/elif ladders that data/farming_rules.json replaced (tests/legacy_rules.py)
+and for the compiled rules, one observation at a time and as columns.
+Equivalence with the ladders is checked by tests/test_farming_rules.py.
+
+Usage: python benchmarks/benchmark_farming_rules.py [--observations 200000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from farming_rules import FarmingRules
+from legacy_rules import legacy_all
+
+DESCRIPTIONS = ['clear sky', 'light rain', 'Heavy Rain', 'overcast clouds', 'thunderstorm',
+                'thunderstorm with rain', 'Drizzle', 'storm', 'mist', 'RAIN']
+
+
+def rules_all(rules, observation):
+    return (rules.metrics(observation), rules.advice(observation, 'dashboard'),
+            rules.advice(observation, 'service'))
+
+
+def random_cases(count, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield {
+            'temperature': round(float(rng.uniform(-10, 45)), 1),
+            'humidity': int(rng.integers(5, 101)),
+            'wind_speed': round(float(rng.uniform(0, 20)), 1),
+            'description': str(rng.choice(DESCRIPTIONS))
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--observations', type=int, default=200_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rules = FarmingRules.from_file(os.path.join(ROOT, 'data', 'farming_rules.json'))
+    print(f"compiled rules in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    observations = list(random_cases(args.observations, seed=2))
+    timings = {}
+    for label, function in [('ladders', legacy_all), ('rules', lambda o: rules_all(rules, o))]:
+        start = time.perf_counter()
+        for observation in observations:
+            function(observation)
+        timings[label] = time.perf_counter() - start
+
+    columns = {key: np.array([o[key] for o in observations]) for key in observations[0]}
+    start = time.perf_counter()
+    rules.metric_codes(**columns)
+    rules.advice_codes('dashboard', **columns)
+    rules.advice_codes('service', **columns)
+    timings['rules, vectorized codes'] = time.perf_counter() - start
+
+    print(f"{len(observations):,} observations: metrics + dashboard advice + API advice")
+    print(f"{'method':>24} {'µs/observation':>15}")
+    for label, seconds in timings.items():
+        print(f"{label:>24} {seconds / len(observations) * 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Image decode/preprocess benchmark on large JPEGs
+Compares the previous path (full decode, resize, convert, np.array,
+astype/255) with the draft-mode pipeline in src/image_pipeline.py.
+Each method runs in a fresh subprocess so peak RSS is measured in isolation.
+
+Usage: python benchmarks/benchmark_image_pipeline.py [--sizes 4000x3000,2000x1500]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+def legacy_preprocess(path):
+    image = Image.open(path)
+    image = image.resize((224, 224))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image_array = np.array(image)
+    image_array = image_array.astype('float32') / 255.0
+    return np.expand_dims(image_array, axis=0)
+
+
+def make_pipeline_preprocess():
+    from image_pipeline import BatchBuffer, open_image
+    buffer = BatchBuffer(capacity=1)
+    return lambda path: buffer.fill([open_image(path)])
+
+
+def make_jpeg(path, width, height):
+    """Smooth leaf-like gradients plus noise, so JPEG size is realistic"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    green = 120 + 60 * np.sin(x / 97) * np.cos(y / 61)
+    pixels = np.stack([green * 0.5, green, green * 0.3], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape)
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path, quality=90)
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process
+    Reads VmHWM where available: ru_maxrss survives exec on Linux and would
+    report the parent's peak instead
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(method, path, repeats):
+    """Runs inside the child process"""
+    preprocess = legacy_preprocess if method == 'legacy' else make_pipeline_preprocess()
+    baseline_kb = peak_rss_kb()
+    preprocess(path)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        preprocess(path)
+    elapsed = (time.perf_counter() - start) / repeats
+
+    peak_kb = peak_rss_kb()
+    print(json.dumps({'ms': elapsed * 1000, 'peak_delta_mb': (peak_kb - baseline_kb) / 1024}))
+
+
+def run_child(method, path, repeats):
+    output = subprocess.check_output(
+        [sys.executable, __file__, '--child', method, path, '--repeats', str(repeats)]
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='4000x3000,3024x4032,2000x1500')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--child', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child[0], args.child[1], args.repeats)
+        return
+
+    print(f"{'image':>10} {'file MB':>8} {'legacy ms':>10} {'pipeline ms':>12} "
+          f"{'legacy peak MB':>15} {'pipeline peak MB':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes.split(','):
+            width, height = (int(v) for v in size.split('x'))
+            path = os.path.join(tmp, f"{size}.jpg")
+            make_jpeg(path, width, height)
+
+            legacy = run_child('legacy', path, args.repeats)
+            pipeline = run_child('pipeline', path, args.repeats)
+            print(f"{size:>10} {os.path.getsize(path) / 1e6:>8.1f} {legacy['ms']:>10.1f} "
+                  f"{pipeline['ms']:>12.1f} {legacy['peak_delta_mb']:>15.1f} "
+                  f"{pipeline['peak_delta_mb']:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Training input pipeline benchmark (images/s delivered to the model)
+Writes a synthetic class-folder dataset of phone-sized JPEGs, then times one
+epoch through each option:
+
+    ImageDataGenerator  flow_from_directory, the generator train_model.py used
+                        to configure (rescale only if scipy is missing, since
+                        its augmentations need it)
+    tf.data pil         data_pipeline with the inference decode, no cache
+    tf.data tf          data_pipeline with tf.io decode, no cache
+    tf.data pil cached  first epoch (decode + write cache), then from cache
+
+All tf.data runs include the batched augmentations. Before timing, the
+validation pipeline (no augmentation) is checked to produce exactly the
+arrays image_pipeline.preprocess_batch gives the served model.
+
+Usage: python benchmarks/benchmark_input_pipeline.py [--images 600] [--fit-steps 0]
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from data_pipeline import build_dataset, list_image_files, make_datasets
+from image_pipeline import open_image, preprocess_batch
+from train_model import CLASS_LABELS, create_model
+
+
+def write_dataset(root, count, size=(1600, 1200), seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    x = np.arange(width + 256, dtype=np.float32)
+    templates = []
+    for _ in range(8):
+        # Smooth colour field plus noise: compresses like a photo, not like a flat fill
+        base = rng.uniform(40, 200, 3).astype(np.float32)
+        rows = base + 40 * np.sin(x[:, None] / rng.uniform(20, 80) + rng.uniform(0, 6, 3))
+        pixels = np.broadcast_to(rows, (height + 256, width + 256, 3)) + rng.normal(0, 12, (height + 256, width + 256, 3))
+        templates.append(np.clip(pixels, 0, 255).astype(np.uint8))
+    for i in range(count):
+        label = CLASS_LABELS[i % len(CLASS_LABELS)]
+        folder = os.path.join(root, label.replace(' ', '_'))
+        os.makedirs(folder, exist_ok=True)
+        top, left = rng.integers(0, 256, 2)
+        crop = templates[i % len(templates)][top:top + height, left:left + width]
+        Image.fromarray(crop).save(os.path.join(folder, f"leaf_{i:05d}.jpg"), quality=90)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_epoch(dataset, warm_up=True):
+    if warm_up:
+        # Thread pools and traced functions are set up on the first batch
+        for _ in dataset.take(1):
+            pass
+    start, images = time.perf_counter(), 0
+    for batch, _ in dataset:
+        images += int(batch.shape[0])
+    return images, time.perf_counter() - start
+
+
+def check_parity(data_dir):
+    paths, labels = list_image_files(data_dir, CLASS_LABELS)
+    paths, labels = paths[:16], labels[:16]
+    dataset = build_dataset(paths, labels, len(CLASS_LABELS), training=False, batch_size=16, cache_dir=None)
+    images, _ = next(iter(dataset))
+    expected = preprocess_batch([open_image(path) for path in paths])
+    difference = float(np.abs(images.numpy() - expected).max())
+    if difference != 0.0:
+        sys.exit(f"❌ training pixels differ from inference preprocessing (max {difference})")
+    print("✅ validation batches are bit-identical to inference preprocessing")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--images', type=int, default=600)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--fit-steps', type=int, default=0, help='also time model.fit for this many steps')
+    parser.add_argument('--keep', help='write the dataset here and keep it')
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    workdir = args.keep or tempfile.mkdtemp(prefix='pipeline_bench_')
+    data_dir = os.path.join(workdir, 'dataset')
+    cache_dir = os.path.join(workdir, 'cache')
+    try:
+        if not os.path.isdir(data_dir):
+            start = time.perf_counter()
+            write_dataset(data_dir, args.images)
+            print(f"wrote {args.images} 1600x1200 JPEGs in {time.perf_counter() - start:.1f} s")
+        check_parity(data_dir)
+
+        rows = []
+        try:
+            import scipy  # noqa: F401
+            augmentation = dict(rotation_range=20, width_shift_range=0.2, height_shift_range=0.2,
+                                horizontal_flip=True, zoom_range=0.2)
+            label = 'ImageDataGenerator'
+        except ImportError:
+            augmentation = {}
+            label = 'ImageDataGenerator (rescale)'
+        generator = tf.keras.preprocessing.image.ImageDataGenerator(rescale=1. / 255, **augmentation)
+        flow = generator.flow_from_directory(data_dir, target_size=(224, 224), batch_size=args.batch_size,
+                                             class_mode='categorical', shuffle=True)
+        start, images = time.perf_counter(), 0
+        for _ in range(len(flow)):
+            batch, _ = next(flow)
+            images += len(batch)
+        rows.append((label, images, time.perf_counter() - start))
+
+        for decoder in ('pil', 'tf'):
+            train_ds, _, counts = make_datasets(data_dir, CLASS_LABELS, batch_size=args.batch_size,
+                                                decoder=decoder, cache_dir=None, validation_split=0)
+            rows.append((f"tf.data {decoder}", *time_epoch(train_ds)))
+
+        train_ds, _, _ = make_datasets(data_dir, CLASS_LABELS, batch_size=args.batch_size,
+                                       cache_dir=cache_dir, validation_split=0)
+        # No warm-up here: a partially read cache is discarded
+        rows.append(('tf.data pil, epoch 1 (cache)', *time_epoch(train_ds, warm_up=False)))
+        rss_before = peak_rss_mb()
+        rows.append(('tf.data pil, epoch 2 (cached)', *time_epoch(train_ds, warm_up=False)))
+        cache_mb = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir)) / 1e6
+
+        print(f"{'pipeline':>30} {'images':>7} {'seconds':>8} {'images/s':>9}")
+        for label, images, seconds in rows:
+            print(f"{label:>30} {images:>7} {seconds:>8.2f} {images / seconds:>9.1f}")
+        print(f"cache {cache_mb:.0f} MB on disk; peak RSS {peak_rss_mb():.0f} MB "
+              f"(+{peak_rss_mb() - rss_before:.0f} MB during the cached epoch)")
+
+        if args.fit_steps:
+            model = create_model(len(CLASS_LABELS))
+            steps = min(args.fit_steps, counts['train'] // args.batch_size)
+            model.fit(train_ds.take(1), verbose=0)  # build and trace outside the timing
+            start = time.perf_counter()
+            model.fit(train_ds.repeat().take(steps), verbose=0)
+            seconds = time.perf_counter() - start
+            print(f"model.fit: {steps * args.batch_size / seconds:.1f} images/s over {steps} steps "
+                  f"(the CNN, not the input pipeline, is the limit when this is lower)")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
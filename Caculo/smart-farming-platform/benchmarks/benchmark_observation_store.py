@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Weather observation store benchmark
+Ingests hourly observations for many locations through the batched writer,
+then times range queries and daily downsampling for single locations, and
+retention compaction.
+
+Usage: python benchmarks/benchmark_observation_store.py [--locations 500] [--days 30]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from observation_store import DAY_SECONDS, ObservationStore
+
+
+def observations(locations, days, start, seed=0):
+    """Hourly rows, ordered by time as a live ingest would deliver them"""
+    rng = np.random.default_rng(seed)
+    for hour in range(days * 24):
+        timestamp = start + hour * 3600
+        temperature = 22 + 6 * np.sin(hour / 24 * 2 * np.pi) + rng.normal(0, 2, len(locations))
+        humidity = np.clip(65 + rng.normal(0, 12, len(locations)), 10, 100)
+        for i, location in enumerate(locations):
+            yield location, {
+                'temperature': float(temperature[i]),
+                'humidity': float(humidity[i]),
+                'wind_speed': 3.0,
+                'precipitation': 0.0,
+                'description': 'clear sky'
+            }, timestamp
+
+
+def timed(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--locations', type=int, default=500)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--retention-days', type=int, default=7)
+    args = parser.parse_args()
+
+    locations = [f"Town {i}" for i in range(args.locations)]
+    start = int(time.time()) // DAY_SECONDS * DAY_SECONDS - args.days * DAY_SECONDS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ObservationStore(os.path.join(tmp, 'observations.db'))
+
+        begin = time.perf_counter()
+        chunk = []
+        for row in observations(locations, args.days, start):
+            chunk.append(row)
+            if len(chunk) == len(locations):  # one reading per location per hour
+                store.add_many(chunk)
+                chunk = []
+        store.flush()
+        ingest_seconds = time.perf_counter() - begin
+        rows = store.get_stats()['rows']
+        print(f"ingest: {rows:,} rows in {ingest_seconds:.2f}s "
+              f"({rows / ingest_seconds:,.0f} rows/s, {rows / ingest_seconds * 60:,.0f}/min)")
+
+        week = (start + (args.days - 7) * DAY_SECONDS, start + args.days * DAY_SECONDS)
+        # The first read after a large ingest pays for the pandas import and the WAL index
+        ms, _ = timed(lambda: store.query('Town 0', *week), 1)
+        print(f"first query (cold): {ms:.1f} ms")
+        ms, frame = timed(lambda: store.query('Town 42', *week), 20)
+        print(f"range query, 1 location x 7 days ({len(frame)} rows): {ms:.2f} ms")
+        ms, frame = timed(lambda: store.query('Town 42'), 20)
+        print(f"range query, 1 location x all days ({len(frame)} rows): {ms:.2f} ms")
+        ms, frame = timed(lambda: store.daily('Town 42'), 20)
+        print(f"daily downsample, 1 location ({len(frame)} days): {ms:.2f} ms")
+
+        ms, removed = timed(lambda: store.compact(args.retention_days), 1)
+        print(f"compaction to {args.retention_days} days: {removed:,} raw rows rolled up in {ms:.0f} ms")
+        ms, frame = timed(lambda: store.daily('Town 42'), 20)
+        print(f"daily after compaction ({len(frame)} days): {ms:.2f} ms")
+        print(f"database size: {os.path.getsize(os.path.join(tmp, 'observations.db')) / 1e6:.1f} MB")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
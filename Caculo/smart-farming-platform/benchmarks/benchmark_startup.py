@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the launcher and each Streamlit page
+Every scenario runs in a fresh subprocess and reports wall time from
+interpreter start-up work to a rendered page, resident memory afterwards and
+whether TensorFlow ended up imported. Pages are rendered headlessly with
+streamlit.testing.
+
+--eager reproduces the previous start-up, which imported TensorFlow at
+module load and warmed up every service (including the model) on each page.
+
+Usage: python benchmarks/benchmark_startup.py [--eager]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ['launcher', 'Disease Detection', 'Weather Insights', 'About Platform', 'first analysis']
+LAUNCHER_PACKAGES = ['streamlit', 'tensorflow', 'PIL', 'requests', 'pandas', 'numpy']
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def run_scenario(scenario, eager):
+    """Runs inside the child process"""
+    import importlib
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+    if scenario == 'launcher':
+        if eager:
+            for name in LAUNCHER_PACKAGES:
+                importlib.import_module(name)
+        else:
+            sys.path.insert(0, ROOT)
+            import run
+            run.check_requirements()
+    else:
+        if eager:
+            import tensorflow
+            from service_registry import get_registry
+            get_registry().warm_up()
+
+        from streamlit.testing.v1 import AppTest
+        app = AppTest.from_file(os.path.join(ROOT, 'src', 'app.py'), default_timeout=300).run()
+        if scenario in ('Weather Insights', 'About Platform'):
+            app.sidebar.selectbox[0].select(scenario).run()
+        elif scenario == 'first analysis':
+            from PIL import Image
+            from service_registry import get_registry
+            get_registry().get('predictor').analyze(Image.new('RGB', (640, 480), (60, 140, 50)))
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+
+    print(json.dumps({
+        'seconds': time.perf_counter() - start,
+        'rss_mb': rss_mb(),
+        'tensorflow': 'tensorflow' in sys.modules
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--eager', action='store_true', help='emulate the previous eager start-up')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_scenario(args.child, args.eager)
+        return
+
+    print(f"{'mode':>6} {'scenario':>18} {'seconds':>8} {'RSS MB':>7} {'TF imported':>12}")
+    mode = 'eager' if args.eager else 'lazy'
+    for scenario in SCENARIOS:
+        command = [sys.executable, __file__, '--child', scenario] + (['--eager'] if args.eager else [])
+        start = time.perf_counter()
+        output = subprocess.check_output(command, cwd=ROOT, stderr=subprocess.DEVNULL)
+        total = time.perf_counter() - start
+        stats = json.loads(output.decode().strip().splitlines()[-1])
+        print(f"{mode:>6} {scenario:>18} {stats['seconds']:>8.2f} {stats['rss_mb']:>7.0f} "
+              f"{'yes' if stats['tensorflow'] else 'no':>12}   (process {total:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Training step time and images/s per CPU runtime setting
+Each setting runs in a fresh process (thread pools and oneDNN are fixed
+once TensorFlow starts), trains train_model.create_model on one in-memory
+batch for two short epochs and reports the second, so tracing and XLA
+compilation are left out and the input pipeline costs nothing. The
+multi-worker row runs a local two-process cluster; its images/s counts the
+global batch.
+
+Usage: python benchmarks/benchmark_training_runtime.py [--steps 5] [--batch-size 32]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from training_runtime import apply_environment, configure_runtime, launch_local_cluster, runtime_settings
+
+CORES = os.cpu_count() or 1
+SETTINGS = [
+    ('TensorFlow defaults', {}, 1),
+    ('1 intra / 1 inter thread', {'intra_op_threads': 1, 'inter_op_threads': 1}, 1),
+    (f"{CORES} intra / 2 inter threads", {'intra_op_threads': CORES, 'inter_op_threads': 2}, 1),
+    ('oneDNN off', {'onednn': False}, 1),
+    ('XLA', {'xla_jit': True}, 1),
+    ('mixed_bfloat16', {'mixed_precision': 'mixed_bfloat16'}, 1),
+    ('2 local workers', {'distribution': 'multi_worker'}, 2),
+]
+
+
+def run_setting(settings, steps, batch_size, result_path):
+    """Child process: train briefly and write the last epoch's throughput"""
+    apply_environment(runtime_settings(**settings))
+    runtime = configure_runtime(**settings)
+    import tensorflow as tf
+    from train_model import CLASS_LABELS, create_model
+
+    with runtime.scope():
+        model = create_model(len(CLASS_LABELS), runtime.jit_compile)
+    size = runtime.worker_batch_size(batch_size)
+    images = tf.random.uniform((size, 224, 224, 3))
+    labels = tf.one_hot(tf.range(size) % len(CLASS_LABELS), len(CLASS_LABELS))
+    dataset = tf.data.Dataset.from_tensors((images, labels)).repeat()
+    runtime.fit(model, dataset, epochs=2, steps_per_epoch=steps, batch_size=size, verbose=0)
+    if runtime.is_chief:
+        with open(result_path, 'w') as f:
+            json.dump(runtime.throughput.epochs[-1], f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--steps', type=int, default=5, help='timed training steps per setting')
+    parser.add_argument('--batch-size', type=int, default=32, help='global batch size')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        run_setting(json.loads(args.run), args.steps, args.batch_size, args.result)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, settings, workers in SETTINGS:
+            result_path = os.path.join(workdir, f"{len(rows)}.json")
+            command = [sys.executable, os.path.abspath(__file__), '--run', json.dumps(settings),
+                       '--result', result_path, '--steps', str(args.steps), '--batch-size', str(args.batch_size)]
+            print(f"--- {label}", flush=True)
+            if workers > 1:
+                code = launch_local_cluster(workers, command)
+            else:
+                code = subprocess.call(command)
+            if code or not os.path.exists(result_path):
+                rows.append((label, None))
+                continue
+            with open(result_path) as f:
+                rows.append((label, json.load(f)))
+
+    baseline = rows[0][1]
+    print(f"\n{CORES} CPU core(s), global batch {args.batch_size}, {args.steps} timed steps")
+    print(f"{'setting':>28} {'step ms':>9} {'images/s':>9} {'vs default':>10}")
+    for label, result in rows:
+        if result is None:
+            print(f"{label:>28} {'failed':>9}")
+            continue
+        speedup = result['images_per_sec'] / baseline['images_per_sec'] if baseline else float('nan')
+        print(f"{label:>28} {result['step_ms']:>9.1f} {result['images_per_sec']:>9.1f} {speedup:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
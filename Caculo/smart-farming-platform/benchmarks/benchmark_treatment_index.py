@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Treatment search index benchmark and linear-scan check
+Builds a synthetic catalogue (crops x diseases, each treatment with
+ingredients, a type and certifications) and runs random filtered, full-text
+and prefix queries through TreatmentIndex. Every query is also answered by
+scanning all records and sorting them with the catalogue's own sort keys;
+the pages must be identical. Then query latency is timed at full size.
+
+Usage: python benchmarks/benchmark_treatment_index.py [--treatments 100000] [--queries 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from treatment_catalogue import COST_TIERS, SORT_KEYS, TreatmentCatalogue
+from treatment_index import normalize, tokenize, TreatmentIndex
+
+CROPS = ['Tomato', 'Potato', 'Wheat', 'Rice', 'Maize', 'Grape', 'Apple', 'Pepper', 'Cucumber', 'Soybean',
+         'Cassava', 'Banana', 'Coffee', 'Cotton', 'Citrus', 'Strawberry', 'Onion', 'Cabbage', 'Bean', 'Sorghum']
+DISEASE_KINDS = ['Leaf Blight', 'Powdery Mildew', 'Rust Disease', 'Bacterial Spot', 'Mosaic Virus',
+                 'Downy Mildew', 'Root Rot', 'Anthracnose', 'Leaf Curl', 'Wilt']
+INGREDIENTS = ['Neem oil', 'Baking soda', 'Copper soap', 'Potassium bicarbonate', 'Milk', 'Garlic extract',
+               'Compost tea', 'Sulfur', 'Bacillus subtilis', 'Trichoderma', 'Kaolin clay', 'Chamomile',
+               'Hydrogen peroxide', 'Apple cider vinegar', 'Horsetail tea', 'Seaweed extract',
+               'Mild liquid soap', 'Water', 'Vegetable oil', 'Cinnamon']
+TYPES = ['Organic Fungicide', 'Biological Control', 'Cultural Practice', 'Natural Deterrent',
+         'Mineral Treatment', 'Plant Extract', 'Vector Control']
+CERTIFICATIONS = ['OMRI Approved', 'EU Organic', 'USDA Organic', 'Demeter', 'JAS Organic']
+METHODS = ['Foliar spray application', 'Soil drench', 'Seed treatment', 'Physical barrier', 'Pruning']
+
+
+def synthetic_catalogue(count, seed=0):
+    rng = np.random.default_rng(seed)
+    diseases = [f"{crop} {kind}" for crop in CROPS for kind in DISEASE_KINDS]
+    data = {disease: [] for disease in diseases}
+    for i in range(count):
+        disease = diseases[int(rng.integers(len(diseases)))]
+        crop = disease.split(' ')[0]
+        data[disease].append({
+            'name': f"{INGREDIENTS[int(rng.integers(len(INGREDIENTS)))]} Treatment {i}",
+            'type': TYPES[int(rng.integers(len(TYPES)))],
+            'method': METHODS[int(rng.integers(len(METHODS)))],
+            'eco_rating': int(rng.integers(1, 6)),
+            'cost': COST_TIERS[int(rng.integers(len(COST_TIERS)))],
+            'ingredients': [str(x) for x in rng.choice(INGREDIENTS, int(rng.integers(1, 4)), replace=False)],
+            'application': f"Apply every {int(rng.integers(3, 15))} days",
+            'effectiveness': 'Variable' if rng.random() < 0.02 else f"{int(rng.integers(40, 100))}%",
+            'crops': [crop] + ([CROPS[int(rng.integers(len(CROPS)))]] if rng.random() < 0.3 else []),
+            'certifications': [str(x) for x in rng.choice(CERTIFICATIONS, int(rng.integers(0, 3)), replace=False)],
+        })
+    return data
+
+
+def random_query(rng, diseases):
+    query = {}
+    if rng.random() < 0.5:
+        query['crop'] = CROPS[int(rng.integers(len(CROPS)))].lower()
+    if rng.random() < 0.3:
+        query['disease'] = diseases[int(rng.integers(len(diseases)))]
+    if rng.random() < 0.4:
+        query['ingredient'] = INGREDIENTS[int(rng.integers(len(INGREDIENTS)))]
+    if rng.random() < 0.3:
+        query['type'] = TYPES[int(rng.integers(len(TYPES)))]
+    if rng.random() < 0.4:
+        query['certification'] = CERTIFICATIONS[int(rng.integers(len(CERTIFICATIONS)))]
+    if rng.random() < 0.4:
+        word = INGREDIENTS[int(rng.integers(len(INGREDIENTS)))].split()[0].lower()
+        query['prefix'] = rng.random() < 0.5
+        query['text'] = word[:int(rng.integers(2, len(word) + 1))] if query['prefix'] else word
+    if rng.random() < 0.3:
+        query['min_eco'] = int(rng.integers(1, 6))
+    if rng.random() < 0.2:
+        query['max_cost'] = COST_TIERS[int(rng.integers(len(COST_TIERS)))]
+    query['sort_by'] = str(rng.choice(list(SORT_KEYS)))
+    query['offset'] = int(rng.choice([0, 0, 0, 20]))
+    return query
+
+
+def linear_scan(catalogue, query, limit=20):
+    """Reference answer: test every record, then sort file order with the catalogue key"""
+    keys = {'crop': 'crops', 'ingredient': 'ingredients', 'certification': 'certifications'}
+    words = tokenize(query.get('text') or '')
+
+    def matches(record):
+        view = record.view
+        for name, field in keys.items():
+            if name in query and normalize(query[name]) not in {normalize(v) for v in view.get(field, ())}:
+                return False
+        if 'disease' in query and normalize(query['disease']) != normalize(record.disease):
+            return False
+        if 'type' in query and normalize(query['type']) != normalize(view['type']):
+            return False
+        if words:
+            tokens = set()
+            for field in ('name', 'type', 'method', 'application'):
+                tokens.update(tokenize(view[field]))
+            for ingredient in view.get('ingredients', ()):
+                tokens.update(tokenize(ingredient))
+            for position, word in enumerate(words):
+                if query.get('prefix') and position == len(words) - 1:
+                    if not any(token.startswith(word) for token in tokens):
+                        return False
+                elif word not in tokens:
+                    return False
+        if 'min_eco' in query and record.eco_rating < query['min_eco']:
+            return False
+        if 'max_cost' in query and record.cost_rank > COST_TIERS.index(query['max_cost']):
+            return False
+        return True
+
+    found = [r for disease in catalogue.diseases() for r in catalogue.records(disease) if matches(r)]
+    found.sort(key=SORT_KEYS[query['sort_by']], reverse=True)
+    offset = query['offset']
+    return len(found), [r.view for r in found[offset:offset + limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--treatments', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--checked', type=int, default=300, help='queries compared with a linear scan')
+    args = parser.parse_args()
+
+    data = synthetic_catalogue(args.treatments)
+    start = time.perf_counter()
+    catalogue = TreatmentCatalogue(data)
+    catalogue_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index = TreatmentIndex(catalogue)
+    index_s = time.perf_counter() - start
+    print(f"{len(catalogue):,} treatments, {len(data)} diseases: catalogue {catalogue_s:.2f} s, "
+          f"index {index_s:.2f} s, {len(index.vocabulary):,} tokens")
+
+    rng = np.random.default_rng(1)
+    diseases = list(data)
+    for _ in range(args.checked):
+        query = random_query(rng, diseases)
+        result = index.search(**query)
+        total, expected = linear_scan(catalogue, query)
+        if result['total'] != total or [id(v) for v in result['treatments']] != [id(v) for v in expected]:
+            sys.exit(f"❌ index and linear scan differ for {query}: {result['total']} vs {total} matches")
+    print(f"✅ {args.checked} random queries identical to a linear scan")
+
+    disease = diseases[0]
+    if catalogue.treatments(disease) != index.search(disease=disease, limit=len(index))['treatments']:
+        sys.exit(f"❌ index order differs from catalogue ranking for {disease}")
+
+    queries = [random_query(rng, diseases) for _ in range(args.queries)]
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(**query)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    print(f"{args.queries} random queries over {len(index):,} treatments (ms):")
+    print(f"  mean {timings.mean():.3f}  p50 {np.percentile(timings, 50):.3f}  "
+          f"p95 {np.percentile(timings, 95):.3f}  max {timings.max():.3f}")
+
+    examples = [
+        ('crop + certification', dict(crop='tomato', certification='OMRI Approved')),
+        ('ingredient + eco >= 4', dict(ingredient='neem oil', min_eco=4)),
+        ('full text, 2 words', dict(text='neem treatment')),
+        ('prefix "co"', dict(text='co', prefix=True)),
+        ('no filters, by cost', dict(sort_by='cost')),
+    ]
+    for label, query in examples:
+        start = time.perf_counter()
+        for _ in range(200):
+            result = index.search(**query)
+        print(f"  {label:>22}: {(time.perf_counter() - start) / 200 * 1000:.3f} ms ({result['total']:,} matches)")
+    start = time.perf_counter()
+    for _ in range(2000):
+        index.suggest('ingredient', 'ne')
+    print(f"  {'suggest ingredient':>22}: {(time.perf_counter() - start) / 2000 * 1000:.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
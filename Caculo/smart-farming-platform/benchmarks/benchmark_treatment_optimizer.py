@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Treatment optimizer benchmark and brute-force check
+Per-plot queries (best_plans) are compared with enumerating every treatment
+combination for each plot, as a per-request implementation would; the
+answers must have the same effectiveness. Farm-wide plans (plan_farm) are
+compared with an exact knapsack over the same options on small farms: the
+greedy must stay within budget and within one plot's best effectiveness of
+the optimum.
+
+Usage: python benchmarks/benchmark_treatment_optimizer.py [--plots 500] [--queries 200]
+"""
+
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from treatment_advisor import TreatmentAdvisor
+from treatment_optimizer import MAX_TREATMENTS, TreatmentSet
+
+
+def brute_force_plan(catalogue, disease, budget, min_eco):
+    """Most effective combination within budget and eco floor, by enumeration"""
+    records = catalogue.records(disease)
+    best = None
+    for size in range(1, MAX_TREATMENTS + 1):
+        for combo in itertools.combinations(records, size):
+            option = TreatmentSet(disease, combo)
+            if option.cost <= budget and option.eco_score >= min_eco - 1e-9:
+                if best is None or option.effectiveness > best.effectiveness:
+                    best = option
+    return best
+
+
+def exact_farm(optimizer, diseases, total_budget, min_eco):
+    """Multiple-choice knapsack over each plot's Pareto options (costs are whole dollars)"""
+    budget = int(total_budget)
+    value = np.zeros(budget + 1)
+    for disease in diseases:
+        options = [o for o in optimizer.pareto_front(disease) if o.eco_score >= min_eco - 1e-9]
+        updated = value.copy()
+        for option in options:
+            cost = int(option.cost)
+            if cost <= budget:
+                updated[cost:] = np.maximum(updated[cost:], value[:budget + 1 - cost] + option.effectiveness)
+        value = updated
+    return value[budget]
+
+
+def random_queries(diseases, count, rng):
+    plots = [str(d) for d in rng.choice(diseases + ['Unknown Blight'], count)]
+    budgets = rng.choice([0, 4, 5, 10, 15, 19.5, 20, 30, 35, 40, 50, 80, 150], count).astype(float)
+    min_ecos = rng.choice([0, 3, 3.5, 4, 4.5, 5, 5.5], count).astype(float)
+    return plots, budgets, min_ecos
+
+
+def check_best_plans(advisor, rng, count):
+    catalogue, optimizer = advisor.catalogue, advisor.optimizer
+    plots, budgets, min_ecos = random_queries(list(catalogue.diseases()), count, rng)
+    plans = optimizer.best_plans(plots, budgets, min_ecos)
+    for plot, budget, min_eco, plan in zip(plots, budgets, min_ecos, plans):
+        expected = brute_force_plan(catalogue, plot, budget, min_eco)
+        got = plan.effectiveness if plan else None
+        want = expected.effectiveness if expected else None
+        if got != want or (plan and (plan.cost > budget or plan.eco_score < min_eco - 1e-9)):
+            sys.exit(f"❌ {plot} budget={budget} min_eco={min_eco}: optimizer {plan} vs brute force {expected}")
+    print(f"✅ best_plans matches brute-force enumeration on {count:,} random queries")
+
+
+def check_plan_farm(advisor, rng, farms):
+    catalogue, optimizer = advisor.catalogue, advisor.optimizer
+    diseases = list(catalogue.diseases())
+    worst_gap = 0.0
+    for _ in range(farms):
+        plots = [str(d) for d in rng.choice(diseases, int(rng.integers(1, 25)))]
+        budget = float(rng.integers(0, 40 * len(plots)))
+        min_eco = float(rng.choice([0, 4, 4.5, 5]))
+        result = optimizer.plan_farm(plots, budget, min_eco)
+        if result['total_cost'] > budget:
+            sys.exit(f"❌ plan_farm overspent: {result['total_cost']} > {budget} for {plots}")
+        greedy = sum(plan.effectiveness for plan in result['plans'] if plan)
+        optimum = exact_farm(optimizer, plots, budget, min_eco)
+        if greedy > optimum + 1e-9 or optimum - greedy > 1 + 1e-9:
+            sys.exit(f"❌ plan_farm {greedy:.4f} vs exact {optimum:.4f} for {plots} budget={budget}")
+        worst_gap = max(worst_gap, (optimum - greedy) / len(plots))
+    print(f"✅ plan_farm within budget and one plot of the exact knapsack on {farms} farms "
+          f"(worst gap {worst_gap:.4f} effectiveness per plot)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--plots', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    advisor = TreatmentAdvisor()
+    optimizer = advisor.optimizer
+    start = time.perf_counter()
+    for disease in advisor.catalogue.diseases():
+        optimizer.pareto_front(disease)
+    print(f"Pareto fronts and tables built in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    check_best_plans(advisor, rng, 20_000)
+    check_plan_farm(advisor, rng, 300)
+
+    plots, budgets, min_ecos = random_queries(list(advisor.catalogue.diseases()), args.plots, rng)
+    timings = {}
+    start = time.perf_counter()
+    for _ in range(max(args.queries // 20, 1)):
+        for plot, budget, min_eco in zip(plots, budgets, min_ecos):
+            brute_force_plan(advisor.catalogue, plot, budget, min_eco)
+    timings['enumerate per plot'] = (time.perf_counter() - start) / max(args.queries // 20, 1)
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        optimizer.best_plans(plots, budgets, min_ecos)
+    timings['best_plans (tables)'] = (time.perf_counter() - start) / args.queries
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        optimizer.plan_farm(plots, 25.0 * args.plots, 4.0)
+    timings['plan_farm (shared budget)'] = (time.perf_counter() - start) / args.queries
+
+    print(f"{args.plots} plots per query")
+    print(f"{'method':>26} {'ms/query':>10}")
+    for label, seconds in timings.items():
+        print(f"{label:>26} {seconds * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
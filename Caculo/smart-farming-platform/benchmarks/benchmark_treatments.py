@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Treatment recommendation lookup micro-benchmark
+Compares the precomputed TreatmentCatalogue lookups used by TreatmentAdvisor
+with the previous approach (sorting the disease's list in place and parsing
+'85%' strings on every call, rebuilding the prevention tips dict each time).
+
+Before timing, each disease's ranking is checked against that reference
+sort, and every sort key against a plain sorted() over the raw JSON.
+
+Usage: python benchmarks/benchmark_treatments.py [--calls 200000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from treatment_advisor import TREATMENTS_PATH, TreatmentAdvisor
+from treatment_catalogue import COST_TIERS, SORT_KEYS, parse_effectiveness
+
+
+class ReferenceAdvisor:
+    """The old per-call behaviour, kept as the baseline"""
+
+    def __init__(self, path):
+        with open(path) as f:
+            self.treatments_db = json.load(f)
+
+    def get_recommendations(self, disease_name):
+        treatments = self.treatments_db.get(disease_name, [])
+        treatments.sort(key=lambda x: (x['eco_rating'], int(x['effectiveness'].rstrip('%'))), reverse=True)
+        return treatments
+
+    def get_prevention_tips(self, disease_name):
+        prevention_tips = {
+            "Leaf Blight": ["Ensure good air circulation between plants", "Avoid overhead watering",
+                            "Remove plant debris regularly", "Rotate crops annually",
+                            "Use disease-resistant varieties"],
+            "Powdery Mildew": ["Maintain proper plant spacing", "Reduce humidity around plants",
+                               "Avoid overhead irrigation", "Prune for better air flow",
+                               "Apply preventive organic sprays"],
+            "Rust Disease": ["Water at soil level, not on leaves", "Remove infected plant material",
+                             "Improve soil drainage", "Use resistant plant varieties",
+                             "Apply mulch to prevent soil splash"],
+            "Bacterial Spot": ["Use drip irrigation instead of sprinklers", "Disinfect tools between plants",
+                               "Avoid working with wet plants", "Remove and destroy infected plants",
+                               "Practice crop rotation"],
+            "Mosaic Virus": ["Control aphid and thrips populations", "Remove weeds that harbor viruses",
+                             "Use virus-free planting material", "Install physical barriers",
+                             "Practice good sanitation"]
+        }
+        return prevention_tips.get(disease_name, ["Maintain healthy soil with organic matter"])
+
+
+def check_rankings(advisor, reference, raw):
+    raw_keys = {
+        'recommended': lambda t: (t['eco_rating'], parse_effectiveness(t['effectiveness'])),
+        'eco_rating': lambda t: t['eco_rating'],
+        'effectiveness': lambda t: parse_effectiveness(t['effectiveness']),
+        'cost': lambda t: -COST_TIERS.index(t['cost']),
+    }
+    for disease in raw:
+        names = [t['name'] for t in advisor.get_recommendations(disease)]
+        expected = [t['name'] for t in reference.get_recommendations(disease)]
+        if names != expected:
+            sys.exit(f"❌ {disease}: catalogue {names} != reference {expected}")
+        for sort_by in SORT_KEYS:
+            names = [t['name'] for t in advisor.get_recommendations(disease, sort_by)]
+            expected = [t['name'] for t in sorted(raw[disease], key=raw_keys[sort_by], reverse=True)]
+            if names != expected:
+                sys.exit(f"❌ {disease} by {sort_by}: {names} != {expected}")
+    print(f"✅ rankings match for {len(raw)} diseases x {len(SORT_KEYS)} sort keys")
+
+
+def per_call_us(function, diseases, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        function(diseases[i % len(diseases)])
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with open(TREATMENTS_PATH) as f:
+        raw = json.load(f)
+    start = time.perf_counter()
+    advisor = TreatmentAdvisor()
+    load_ms = (time.perf_counter() - start) * 1000
+    reference = ReferenceAdvisor(TREATMENTS_PATH)
+    check_rankings(advisor, reference, raw)
+
+    diseases = list(raw) + ['Unknown Blight']
+    rows = [
+        ('get_recommendations', reference.get_recommendations, advisor.get_recommendations),
+        ('get_prevention_tips', reference.get_prevention_tips, advisor.get_prevention_tips),
+    ]
+    print(f"catalogue built in {load_ms:.2f} ms ({len(advisor.catalogue)} treatments)")
+    print(f"{'call':>22} {'before µs':>10} {'after µs':>10} {'speedup':>8}")
+    for name, before, after in rows:
+        before_us = per_call_us(before, diseases, args.calls)
+        after_us = per_call_us(after, diseases, args.calls)
+        print(f"{name:>22} {before_us:>10.3f} {after_us:>10.3f} {before_us / after_us:>7.1f}x")
+    plan_us = per_call_us(advisor.generate_treatment_plan, diseases, args.calls // 4)
+    print(f"{'generate_treatment_plan':>22} {'':>10} {plan_us:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Visual analysis engine benchmark
+Compares per-image cost of the vectorized engine against the previous
+one-image-at-a-time colour statistics, for batch sizes 1 to 1024, and
+checks that both give the same labels.
+
+Usage: python benchmarks/benchmark_visual_analysis.py [--max-batch 1024]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from visual_analysis import classify_batch, demo_distributions
+
+
+def legacy_fallback(image_array):
+    """Per-image rules as previously written in the predictors"""
+    red = np.mean(image_array[:, :, 0])
+    green = np.mean(image_array[:, :, 1])
+    blue = np.mean(image_array[:, :, 2])
+    brightness = np.mean(image_array)
+
+    if green > red + 15 and green > blue + 10 and brightness > 100:
+        return "Healthy"
+    elif brightness > 180 or (red > 200 and green > 200 and blue > 200):
+        return "Powdery Mildew"
+    elif red > green + 25 and red > 130:
+        return "Rust Disease"
+    elif brightness < 80 or (red < 90 and green < 90 and blue < 90):
+        return "Leaf Blight"
+    elif 90 < brightness < 150 and abs(red - green) > 10:
+        return "Bacterial Spot"
+    return "Mosaic Virus"
+
+
+def legacy_demo(image_array):
+    """Per-image statistics used by the previous demo detector, including std"""
+    red = np.mean(image_array[:, :, 0])
+    green = np.mean(image_array[:, :, 1])
+    blue = np.mean(image_array[:, :, 2])
+    return red, green, blue, np.mean(image_array), np.std(image_array)
+
+
+def make_batch(size, rng):
+    """Images with a random base colour plus noise, so every rule gets exercised"""
+    base = rng.integers(0, 256, (size, 1, 1, 3))
+    noise = rng.integers(-40, 41, (size, 224, 224, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def time_per_image(fn, batch, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(batch)
+    return (time.perf_counter() - start) / repeats / len(batch) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--max-batch', type=int, default=1024)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sizes = [s for s in (1, 4, 16, 64, 256, 1024) if s <= args.max_batch]
+
+    print(f"{'batch':>6} {'legacy us/img':>14} {'engine us/img':>14} "
+          f"{'demo legacy':>12} {'demo engine':>12} {'speedup':>8}")
+    for size in sizes:
+        batch = make_batch(size, rng)
+        repeats = max(1, 256 // size)
+
+        labels, _ = classify_batch(batch)
+        expected = [legacy_fallback(image) for image in batch]
+        if list(labels) != expected:
+            raise SystemExit(f"Label mismatch at batch size {size}")
+
+        legacy_us = time_per_image(lambda b: [legacy_fallback(image) for image in b], batch, repeats)
+        engine_us = time_per_image(classify_batch, batch, repeats)
+        demo_legacy_us = time_per_image(lambda b: [legacy_demo(image) for image in b], batch, repeats)
+        demo_engine_us = time_per_image(demo_distributions, batch, repeats)
+
+        print(f"{size:>6} {legacy_us:>14.1f} {engine_us:>14.1f} "
+              f"{demo_legacy_us:>12.1f} {demo_engine_us:>12.1f} {legacy_us / engine_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
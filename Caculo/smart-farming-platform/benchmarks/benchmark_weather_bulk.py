@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Bulk weather fetch benchmark against a local mock OpenWeatherMap server
+Compares a sequential get_weather_data loop with WeatherService.get_weather_bulk
+over a portfolio of plots (with duplicate towns). The mock server adds a fixed
+latency per request and fails a fraction of requests with 503, so retries and
+per-location errors are exercised too.
+
+Usage: python benchmarks/benchmark_weather_bulk.py [--locations 200] [--latency-ms 80]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+class MockWeatherHandler(BaseHTTPRequestHandler):
+    """OpenWeatherMap-shaped responses with latency, transient 503s and unknown-city 404s"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+
+        name = query['q'][0] if 'q' in query else f"{query['lat'][0]},{query['lon'][0]}"
+        if name.startswith('unknown'):
+            return self._send(404, {'message': 'city not found'})
+        if self.server.rng.random() < self.server.failure_rate:
+            return self._send(503, {'message': 'busy'})
+
+        seed = sum(map(ord, name))
+        self._send(200, {
+            'name': name,
+            'sys': {'country': 'MK'},
+            'main': {'temp': 10 + seed % 25, 'feels_like': 12 + seed % 25,
+                     'humidity': 30 + seed % 65, 'pressure': 1013},
+            'weather': [{'description': ['clear sky', 'light rain', 'overcast clouds'][seed % 3],
+                         'main': 'Clouds'}],
+            'wind': {'speed': seed % 12, 'deg': seed % 360},
+            'visibility': 10000
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(latency, failure_rate):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockWeatherHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.failure_rate = failure_rate
+    server.rng = random.Random(0)
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def portfolio(size, seed=0):
+    """Plots spread over towns (many duplicates), a few coordinates and unknown towns"""
+    rng = random.Random(seed)
+    towns = [f"Town {i}" for i in range(size // 2)]
+    locations = []
+    for i in range(size):
+        if i % 25 == 0:
+            locations.append(f"unknown {i}")
+        elif i % 10 == 0:
+            locations.append((round(18 + rng.random(), 4), round(73 + rng.random(), 4)))
+        else:
+            locations.append(rng.choice(towns).upper() if rng.random() < 0.2 else rng.choice(towns))
+    return locations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--locations', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    import contextlib
+    import io
+    from weather_providers import OpenWeatherMapProvider
+    from weather_service import WeatherService
+
+    server = start_mock_server(args.latency_ms / 1000, args.failure_rate)
+    url = f"http://127.0.0.1:{server.server_port}/data/2.5/weather"
+    locations = portfolio(args.locations)
+
+    def new_service():
+        return WeatherService(provider=OpenWeatherMapProvider('bench', url))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = new_service()
+        server.requests = 0
+        start = time.perf_counter()
+        sequential = [service.get_weather_data(location) for location in locations]
+        sequential_seconds = time.perf_counter() - start
+        sequential_requests = server.requests
+        service.close()
+
+        service = new_service()
+        server.requests = 0
+        start = time.perf_counter()
+        table = service.get_weather_bulk(locations, max_concurrency=args.concurrency)
+        bulk_seconds = time.perf_counter() - start
+        bulk_requests = server.requests
+        service.close()
+
+    failed_sequential = sum(result is None for result in sequential)
+    print(f"{len(locations)} plots, {len(table)} unique locations, "
+          f"{args.latency_ms:.0f} ms latency, {args.failure_rate:.0%} transient failures")
+    print(f"{'method':>12} {'seconds':>8} {'requests':>9} {'failed':>7}")
+    print(f"{'sequential':>12} {sequential_seconds:>8.2f} {sequential_requests:>9} {failed_sequential:>7}")
+    print(f"{'bulk':>12} {bulk_seconds:>8.2f} {bulk_requests:>9} {table['error'].notna().sum():>7}")
+    print(f"speedup: {sequential_seconds / bulk_seconds:.1f}x")
+    print(table['error'].dropna().value_counts().to_string())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Streaming tf.data input pipeline for training on image folders
+Expects one sub-folder per class, named like the class labels (case, spaces,
+underscores and dashes are ignored when matching):
+
+    dataset/
+        Bacterial Spot/   *.jpg, *.png, ...
+        Healthy/
+        ...
+
+Only file paths are held in memory. Per epoch, images are decoded in
+parallel into compact uint8 224x224 arrays. The default 'pil' decoder is the
+same draft-mode decode and resize the app uses at inference, so training
+sees exactly the pixels the model will be served. The decoded images are
+cached to a local file on the first epoch. Later epochs read that cache,
+shuffle it through a bounded buffer and batch it. The TRAINING_CONFIG
+augmentations (rotation, shifts, zoom, horizontal flip) are then applied to
+whole batches with a single projective transform. Memory use depends on the
+buffer sizes, not on the number of images.
+
+Usage (inspect a dataset and time one pass):
+    python data_pipeline.py dataset/ --batches 50
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'models'))
+
+from crop_disease_model import TRAINING_CONFIG
+from image_pipeline import IMAGE_SIZE, fit_image, open_image
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
+DECODERS = ('pil', 'tf')
+DEFAULT_CACHE_DIR = os.path.join(ROOT, 'cache', 'tf_data')
+
+
+def _folder_key(name):
+    return ' '.join(name.replace('_', ' ').replace('-', ' ').lower().split())
+
+
+def list_image_files(data_dir, class_labels):
+    """
+    (paths, labels) for every image under data_dir/<class>/, in class_labels
+    order and sorted within each class. Folders that match no label are
+    reported and skipped.
+    """
+    folders = {}
+    for entry in sorted(os.listdir(data_dir)):
+        if os.path.isdir(os.path.join(data_dir, entry)):
+            folders.setdefault(_folder_key(entry), entry)
+
+    known = {_folder_key(label) for label in class_labels}
+    for key, entry in folders.items():
+        if key not in known:
+            print(f"Skipping folder {entry!r}: not one of the class labels")
+
+    paths, labels = [], []
+    for index, label in enumerate(class_labels):
+        folder = folders.get(_folder_key(label))
+        if folder is None:
+            print(f"Warning: no folder for class {label!r} in {data_dir}")
+            continue
+        for dirpath, dirnames, filenames in os.walk(os.path.join(data_dir, folder)):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                    paths.append(os.path.join(dirpath, filename))
+                    labels.append(index)
+    return paths, np.array(labels, dtype=np.int32)
+
+
+def split_files(paths, labels, validation_split, seed=42):
+    """
+    Shuffled, per-class train/validation split of a file list
+    Shuffling file names here (once, for free) means the bounded shuffle
+    buffer later only has to mix neighbours.
+    """
+    rng = np.random.default_rng(seed)
+    paths = np.asarray(paths)
+    train, val = [], []
+    for label in np.unique(labels):
+        indices = rng.permutation(np.flatnonzero(labels == label))
+        cut = int(round(len(indices) * validation_split))
+        val.append(indices[:cut])
+        train.append(indices[cut:])
+    train = rng.permutation(np.concatenate(train)) if train else np.empty(0, dtype=np.int64)
+    val = rng.permutation(np.concatenate(val)) if val else np.empty(0, dtype=np.int64)
+    return (paths[train].tolist(), labels[train]), (paths[val].tolist(), labels[val])
+
+
+def worker_share(length, shard):
+    """
+    Slice selecting one worker's share of a list: every count-th item from
+    index, the same number on every worker so they all run the same steps
+    """
+    count, index = shard
+    return slice(index, index + (length // count) * count, count)
+
+
+def decode_with_pil(path):
+    """uint8 (H, W, 3) pixels exactly as inference prepares an upload"""
+    return np.asarray(fit_image(open_image(path.decode(), IMAGE_SIZE), IMAGE_SIZE), dtype=np.uint8)
+
+
+def _decode_fn(decoder):
+    import tensorflow as tf
+    height, width = IMAGE_SIZE[1], IMAGE_SIZE[0]
+
+    if decoder == 'pil':
+        def decode(path, label):
+            image = tf.numpy_function(decode_with_pil, [path], tf.uint8, stateful=False)
+            image.set_shape((height, width, 3))
+            return image, label
+    elif decoder == 'tf':
+        ratios = (8, 4, 2, 1)
+
+        def decode_jpeg(contents):
+            # Like PIL's draft(): decode at the smallest DCT scale still covering the target size
+            shape = tf.image.extract_jpeg_shape(contents)
+            fits = tf.logical_and(shape[0] // ratios >= height, shape[1] // ratios >= width)
+            branch = tf.argmax(tf.concat([tf.cast(fits, tf.int32), [1]], axis=0), output_type=tf.int32)
+            branches = [lambda ratio=ratio: tf.io.decode_jpeg(contents, channels=3, ratio=ratio)
+                        for ratio in ratios]
+            return tf.switch_case(tf.minimum(branch, len(ratios) - 1), branches)
+
+        def decode(path, label):
+            contents = tf.io.read_file(path)
+            image = tf.cond(tf.io.is_jpeg(contents), lambda: decode_jpeg(contents),
+                            lambda: tf.io.decode_image(contents, channels=3, expand_animations=False))
+            image = tf.image.resize(image, (height, width), method='bicubic', antialias=True)
+            image = tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+            image.set_shape((height, width, 3))
+            return image, label
+    else:
+        raise ValueError(f"Unknown decoder {decoder!r}; expected one of {', '.join(DECODERS)}")
+    return decode
+
+
+def augment_batch(images, augmentation, seed=None):
+    """
+    Random rotation, shift, zoom and horizontal flip for a whole batch
+    Parameters follow ImageDataGenerator: rotation_range in degrees, shift
+    ranges as fractions of the image size, zoom_range z gives scales in
+    [1 - z, 1 + z]. All of it becomes one projective transform per image,
+    applied to the batch in a single op with nearest-edge fill. Works on
+    uint8 or float images.
+    """
+    import tensorflow as tf
+
+    shape = tf.shape(images)
+    count = shape[0]
+    height, width = tf.cast(shape[1], tf.float32), tf.cast(shape[2], tf.float32)
+
+    def uniform(limit):
+        return tf.random.uniform((count,), -limit, limit, seed=seed)
+
+    angle = uniform(augmentation.get('rotation_range', 0) * math.pi / 180)
+    zoom = augmentation.get('zoom_range', 0)
+    zoom_x = 1 + uniform(zoom)
+    zoom_y = 1 + uniform(zoom)
+    shift_x = uniform(augmentation.get('width_shift_range', 0)) * width
+    shift_y = uniform(augmentation.get('height_shift_range', 0)) * height
+    flip = tf.ones((count,))
+    if augmentation.get('horizontal_flip'):
+        flip = tf.where(tf.random.uniform((count,), seed=seed) < 0.5, -1.0, 1.0)
+
+    # Output pixel -> input pixel: rotate(zoom(flip(p - centre))) + centre + shift
+    cos, sin = tf.cos(angle), tf.sin(angle)
+    a0, a1 = cos * zoom_x * flip, -sin * zoom_y
+    b0, b1 = sin * zoom_x * flip, cos * zoom_y
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    a2 = cx + shift_x - (a0 * cx + a1 * cy)
+    b2 = cy + shift_y - (b0 * cx + b1 * cy)
+    zeros = tf.zeros((count,))
+    transforms = tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images, transforms=transforms, output_shape=shape[1:3], fill_value=0.0,
+        interpolation='BILINEAR', fill_mode='NEAREST')
+
+
+def cache_file(cache_dir, name, paths, decoder):
+    """
+    Cache path keyed by the file list and decode settings, so a changed
+    dataset never reads a stale cache. A lock left by an interrupted run is
+    removed (the partial cache it guarded is never used).
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode('utf-8', 'surrogateescape') + b'\0')
+    digest.update(f"{decoder}:{IMAGE_SIZE}".encode())
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{name}-{digest.hexdigest()[:16]}")
+    for filename in os.listdir(cache_dir):
+        if filename.startswith(os.path.basename(path)) and filename.endswith('.lockfile'):
+            print(f"Removing stale cache lock {filename}")
+            os.remove(os.path.join(cache_dir, filename))
+    return path
+
+
+def build_dataset(paths, labels, num_classes, training, batch_size=None, augmentation=None,
+                  decoder='pil', cache_dir=DEFAULT_CACHE_DIR, cache_name=None,
+                  shuffle_buffer=None, seed=None):
+    """
+    Batched (images, one-hot labels) dataset of float32 [0, 1] images
+    cache_dir=None streams (and decodes) every epoch without a cache.
+    """
+    import tensorflow as tf
+
+    batch_size = batch_size or TRAINING_CONFIG['batch_size']
+    shuffle_buffer = shuffle_buffer or TRAINING_CONFIG.get('shuffle_buffer', 1024)
+    if augmentation is None and training:
+        augmentation = TRAINING_CONFIG['data_augmentation']
+    autotune = tf.data.AUTOTUNE
+
+    dataset = tf.data.Dataset.from_tensor_slices((tf.constant(paths, dtype=tf.string),
+                                                  tf.constant(labels, dtype=tf.int32)))
+    dataset = dataset.map(_decode_fn(decoder), num_parallel_calls=autotune, deterministic=not training)
+    # Unreadable or corrupt files are dropped with a warning instead of ending the epoch
+    dataset = dataset.ignore_errors(log_warning=True)
+    if cache_dir:
+        dataset = dataset.cache(cache_file(cache_dir, cache_name or ('train' if training else 'val'),
+                                           paths, decoder))
+    if training:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, num_parallel_calls=autotune, deterministic=not training)
+    return to_model_batches(dataset, num_classes, training, augmentation, seed)
+
+
+def to_model_batches(dataset, num_classes, training, augmentation=None, seed=None):
+    """
+    Augment (when training), scale and one-hot a dataset of uint8 image
+    batches with integer labels, then prefetch
+    """
+    import tensorflow as tf
+
+    def to_model_input(images, labels):
+        if training and augmentation:
+            # Warping uint8 is cheaper than float32 and the values stay on the same grid
+            images = augment_batch(images, augmentation, seed)
+        # Same [0, 1] scaling as inference
+        return tf.cast(images, tf.float32) / 255.0, tf.one_hot(labels, num_classes)
+
+    dataset = dataset.map(to_model_input, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def make_datasets(data_dir, class_labels, val_dir=None, batch_size=None, decoder='pil',
+                  cache_dir=DEFAULT_CACHE_DIR, validation_split=None, seed=42, shard=None):
+    """
+    (train_dataset, val_dataset, counts) for a class-folder dataset
+    Without val_dir, validation_split (default from TRAINING_CONFIG) of each
+    class is held out. shard=(workers, index) builds one multi-worker
+    training process's share, batched by batch_size per worker; counts
+    stay totals.
+    """
+    paths, labels = list_image_files(data_dir, class_labels)
+    if not paths:
+        raise ValueError(f"No images found under {data_dir} for classes {', '.join(class_labels)}")
+    if val_dir:
+        order = np.random.default_rng(seed).permutation(len(paths))
+        train = ([paths[i] for i in order], labels[order])
+        val = list_image_files(val_dir, class_labels)
+    else:
+        split = TRAINING_CONFIG['validation_split'] if validation_split is None else validation_split
+        train, val = split_files(paths, labels, split, seed)
+
+    counts = {'train': len(train[0]), 'val': len(val[0]),
+              'per_class': np.bincount(labels, minlength=len(class_labels)).tolist()}
+    if shard:
+        share, val_share = worker_share(len(train[0]), shard), worker_share(len(val[0]), shard)
+        train = (train[0][share], train[1][share])
+        val = (val[0][val_share], val[1][val_share])
+
+    num_classes = len(class_labels)
+    train_ds = build_dataset(*train, num_classes, training=True, batch_size=batch_size,
+                             decoder=decoder, cache_dir=cache_dir, seed=seed)
+    val_ds = None
+    if len(val[0]):
+        val_ds = build_dataset(*val, num_classes, training=False, batch_size=batch_size,
+                               decoder=decoder, cache_dir=cache_dir)
+    return train_ds, val_ds, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('data_dir')
+    parser.add_argument('--batches', type=int, default=50, help='batches to time (0 = one full epoch)')
+    parser.add_argument('--decoder', choices=DECODERS, default='pil')
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    from train_model import CLASS_LABELS
+    train_ds, val_ds, counts = make_datasets(args.data_dir, CLASS_LABELS, decoder=args.decoder,
+                                             cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR)
+    print(f"{counts['train']} training / {counts['val']} validation images")
+    for label, count in zip(CLASS_LABELS, counts['per_class']):
+        print(f"  {label:>16}: {count}")
+
+    dataset = train_ds.take(args.batches) if args.batches else train_ds
+    start, images = time.perf_counter(), 0
+    for batch, _ in dataset:
+        images += int(batch.shape[0])
+    elapsed = time.perf_counter() - start
+    print(f"{images} images in {elapsed:.2f} s ({images / elapsed:.0f} images/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Packed image shards: decode a dataset once, read it back zero-copy
+`pack` decodes every image with the inference preprocessing (draft decode,
+resize to 224x224) in a process pool and writes the uint8 pixels into
+fixed-size raw shard files, plus labels, relative paths and an index:
+
+    packed/
+        index.json          format, image size, class labels, shard sizes
+        shard-00000.u8      shard_size x 224 x 224 x 3 uint8, row-major
+        shard-00001.u8      ...
+        labels.npy          int16 class number per image (-1 = unlabelled)
+        paths.txt           source path of each image, relative to the dataset
+
+A packed image is 147 KB, a quarter of its float32 model input. Opening a
+pack maps the shards with np.memmap and reads nothing else but the index
+and labels, so it takes milliseconds at any size. Batches are sliced (or
+gathered) from the mapped pages and scaled to float32 only per batch.
+train_model.py --shards, export_model.py --calibration-dir and scan.py all
+accept a packed directory in place of an image folder.
+
+Usage:
+    python dataset_shards.py pack dataset/train packed/train
+    python dataset_shards.py pack field_photos/ packed/field --unlabelled
+    python dataset_shards.py info packed/train
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from data_pipeline import TRAINING_CONFIG, list_image_files, split_files, worker_share
+from image_pipeline import IMAGE_SIZE
+
+FORMAT_VERSION = 1
+INDEX_FILE = 'index.json'
+LABELS_FILE = 'labels.npy'
+PATHS_FILE = 'paths.txt'
+DEFAULT_SHARD_SIZE = 1024  # ~150 MB per shard at 224x224
+
+
+def is_shard_dir(path):
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+
+def pack(data_dir, out_dir, class_labels=None, shard_size=DEFAULT_SHARD_SIZE, workers=None):
+    """
+    Decode every image under data_dir into shards in out_dir
+    With class_labels, images come from class-named sub-folders (as in
+    training); without, every image in the tree is packed unlabelled.
+    The pack is built next to out_dir and swapped in when complete, so an
+    interrupted run never leaves a half-written pack behind.
+    Returns the index.
+    """
+    # scan imports this module, so its decode worker is imported here
+    from scan import decode_for_model, iter_image_paths
+
+    if class_labels:
+        paths, labels = list_image_files(data_dir, class_labels)
+    else:
+        paths = list(iter_image_paths(data_dir))
+        labels = np.full(len(paths), -1, dtype=np.int32)
+    if not paths:
+        raise ValueError(f"No images found under {data_dir}")
+
+    staging = f"{out_dir.rstrip(os.sep)}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    shards, kept_labels, kept_paths, skipped = [], [], [], []
+    shard_file = None
+
+    def write(index, pixels):
+        nonlocal shard_file
+        if shard_file is None:
+            name = f"shard-{len(shards):05d}.u8"
+            shards.append({'file': name, 'count': 0})
+            shard_file = open(os.path.join(staging, name), 'wb')
+        shard_file.write(pixels.tobytes())
+        shards[-1]['count'] += 1
+        kept_labels.append(labels[index])
+        kept_paths.append(os.path.relpath(paths[index], data_dir))
+        if shards[-1]['count'] == shard_size:
+            shard_file.close()
+            shard_file = None
+
+    def collect(index, future):
+        _, pixels, error = future.result()
+        if error is None:
+            write(index, pixels)
+        else:
+            skipped.append(paths[index])
+            print(f"Skipping {paths[index]}: {error}")
+
+    start = time.perf_counter()
+    try:
+        in_flight = deque()
+        for index, path in enumerate(paths):
+            in_flight.append((index, executor.submit(decode_for_model, path)))
+            # Results are written in submission order, so the pack keeps the listing order
+            while len(in_flight) >= workers * 16:
+                collect(*in_flight.popleft())
+        while in_flight:
+            collect(*in_flight.popleft())
+    finally:
+        if shard_file is not None:
+            shard_file.close()
+        executor.shutdown(cancel_futures=True)
+
+    if not kept_paths:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise ValueError(f"No readable images under {data_dir}")
+
+    np.save(os.path.join(staging, LABELS_FILE), np.array(kept_labels, dtype=np.int16))
+    with open(os.path.join(staging, PATHS_FILE), 'w', encoding='utf-8', errors='surrogateescape') as f:
+        f.write(''.join(f"{path}\n" for path in kept_paths))
+    index = {
+        'format': FORMAT_VERSION,
+        'image_size': list(IMAGE_SIZE),
+        'channels': 3,
+        'dtype': 'uint8',
+        'class_labels': list(class_labels) if class_labels else None,
+        'source': os.path.abspath(data_dir),
+        'shard_size': shard_size,
+        'count': len(kept_paths),
+        'skipped': len(skipped),
+        'shards': shards,
+        'created_at': time.time(),
+    }
+    with open(os.path.join(staging, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+
+    # Open readers keep their mappings of the old files until they close
+    previous = f"{out_dir.rstrip(os.sep)}.old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, previous)
+    os.rename(staging, out_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+
+    print(f"Packed {len(kept_paths)} images into {len(shards)} shard(s) in {out_dir} "
+          f"({time.perf_counter() - start:.1f}s, {len(skipped)} unreadable)")
+    return index
+
+
+class ShardedDataset:
+    """
+    Read-only view of a packed directory
+    - images(indices) -> uint8 (N, H, W, 3); a slice inside one shard is a view
+    - batch(indices) -> float32 [0, 1] model input
+    - iter_batches(batch_size) -> (float32 images, labels) in pack order
+    - to_tf_dataset(indices, num_classes, training) -> batches for model.fit
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), 'r') as f:
+            self.index = json.load(f)
+        if self.index.get('format') != FORMAT_VERSION:
+            raise ValueError(f"{path} was packed with format {self.index.get('format')}; "
+                             f"expected {FORMAT_VERSION} (re-run dataset_shards.py pack)")
+
+        width, height = self.index['image_size']
+        self.image_shape = (height, width, self.index['channels'])
+        self.class_labels = self.index['class_labels']
+        self.shards = [
+            np.memmap(os.path.join(path, shard['file']), dtype=np.uint8, mode='r',
+                      shape=(shard['count'],) + self.image_shape)
+            for shard in self.index['shards']
+        ]
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+        self.labels = np.load(os.path.join(path, LABELS_FILE))
+        self._paths = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def paths(self):
+        """Source paths relative to the packed folder (read on first use)"""
+        if self._paths is None:
+            with open(os.path.join(self.path, PATHS_FILE), 'r', encoding='utf-8', errors='surrogateescape') as f:
+                self._paths = [line.rstrip('\n') for line in f]
+        return self._paths
+
+    def labels_for(self, class_labels):
+        """Labels renumbered to another class list; -1 for unlabelled or unknown classes"""
+        if self.class_labels is None:
+            return np.full(len(self), -1, dtype=np.int32)
+        mapping = np.array([class_labels.index(label) if label in class_labels else -1
+                            for label in self.class_labels] + [-1], dtype=np.int32)
+        return mapping[self.labels]  # -1 indexes the trailing "unknown" entry
+
+    def images(self, indices):
+        """uint8 pixels for a slice or an array of image numbers"""
+        if isinstance(indices, slice):
+            start, stop, step = indices.indices(len(self))
+            if step != 1:
+                return self.images(np.arange(start, stop, step))
+            shard = int(np.searchsorted(self.offsets, start, side='right')) - 1
+            if stop <= self.offsets[shard + 1]:
+                base = self.offsets[shard]
+                return self.shards[shard][start - base:stop - base]
+            indices = np.arange(start, stop)
+
+        indices = np.asarray(indices, dtype=np.int64)
+        out = np.empty((len(indices),) + self.image_shape, dtype=np.uint8)
+        owners = np.searchsorted(self.offsets, indices, side='right') - 1
+        for shard in np.unique(owners):
+            rows = owners == shard
+            out[rows] = self.shards[shard][indices[rows] - self.offsets[shard]]
+        return out
+
+    def batch(self, indices):
+        # Same float32 division as image_pipeline.preprocess_batch
+        return np.divide(self.images(indices), np.float32(255.0), dtype=np.float32)
+
+    def iter_batches(self, batch_size=32):
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            yield self.batch(slice(start, stop)), self.labels[start:stop]
+
+    def to_tf_dataset(self, indices, num_classes, training, batch_size=None, augmentation=None,
+                      labels=None, seed=None):
+        """
+        Batched (images, one-hot labels) tf.data pipeline over some of the
+        images. Only image numbers are shuffled, so every epoch is a full
+        shuffle; each batch is then gathered from the mapped shards.
+        """
+        import tensorflow as tf
+        from data_pipeline import to_model_batches
+
+        batch_size = batch_size or TRAINING_CONFIG['batch_size']
+        if augmentation is None and training:
+            augmentation = TRAINING_CONFIG['data_augmentation']
+        labels = (self.labels if labels is None else labels).astype(np.int32)
+
+        def gather(batch_indices):
+            return self.images(batch_indices), labels[batch_indices]
+
+        def load(batch_indices):
+            images, batch_labels = tf.numpy_function(gather, [batch_indices], (tf.uint8, tf.int32),
+                                                     stateful=False)
+            images.set_shape((None,) + self.image_shape)
+            batch_labels.set_shape((None,))
+            return images, batch_labels
+
+        dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+        if training:
+            dataset = dataset.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+        return to_model_batches(dataset, num_classes, training, augmentation, seed)
+
+
+def make_shard_datasets(shard_dir, class_labels, val_dir=None, batch_size=None,
+                        validation_split=None, seed=42, shard=None):
+    """
+    (train_dataset, val_dataset, counts) from packed shards, split like
+    data_pipeline.make_datasets: a separate packed val_dir, or
+    validation_split of each class held out. shard=(workers, index) as in
+    make_datasets.
+    """
+    train_set = ShardedDataset(shard_dir)
+    labels = train_set.labels_for(class_labels)
+    if (labels < 0).any():
+        raise ValueError(f"{shard_dir} has images without one of the classes {', '.join(class_labels)}; "
+                         f"pack it from class folders")
+
+    if val_dir:
+        val_set = ShardedDataset(val_dir)
+        val_labels = val_set.labels_for(class_labels)
+        if (val_labels < 0).any():
+            raise ValueError(f"{val_dir} has images without one of the classes {', '.join(class_labels)}")
+        train = np.random.default_rng(seed).permutation(len(train_set))
+        val = np.arange(len(val_set))
+    else:
+        split = TRAINING_CONFIG['validation_split'] if validation_split is None else validation_split
+        (train, _), (val, _) = split_files(np.arange(len(train_set)), labels, split, seed)
+        val_set, val_labels = train_set, labels
+
+    counts = {'train': len(train), 'val': len(val),
+              'per_class': np.bincount(labels, minlength=len(class_labels)).tolist()}
+    if shard:
+        train = np.asarray(train)[worker_share(len(train), shard)]
+        val = np.asarray(val)[worker_share(len(val), shard)]
+
+    num_classes = len(class_labels)
+    train_ds = train_set.to_tf_dataset(train, num_classes, training=True, batch_size=batch_size,
+                                       labels=labels, seed=seed)
+    val_ds = None
+    if len(val):
+        val_ds = val_set.to_tf_dataset(val, num_classes, training=False, batch_size=batch_size,
+                                       labels=val_labels)
+    return train_ds, val_ds, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack_parser = commands.add_parser('pack', help='decode a dataset into shards')
+    pack_parser.add_argument('data_dir', help='class-folder dataset (or any image tree with --unlabelled)')
+    pack_parser.add_argument('out_dir')
+    pack_parser.add_argument('--unlabelled', action='store_true', help='pack every image, without class labels')
+    pack_parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                             help=f"images per shard (default: {DEFAULT_SHARD_SIZE})")
+    pack_parser.add_argument('--workers', type=int, help='decode processes (default: CPU count)')
+    info_parser = commands.add_parser('info', help='describe a pack and time one pass over it')
+    info_parser.add_argument('shard_dir')
+    info_parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        class_labels = None
+        if not args.unlabelled:
+            from train_model import CLASS_LABELS
+            class_labels = CLASS_LABELS
+        try:
+            pack(args.data_dir, args.out_dir, class_labels, args.shard_size, args.workers)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        return
+
+    if not is_shard_dir(args.shard_dir):
+        print(f"❌ No {INDEX_FILE} in {args.shard_dir}; pack a dataset first")
+        sys.exit(1)
+    start = time.perf_counter()
+    shards = ShardedDataset(args.shard_dir)
+    open_ms = (time.perf_counter() - start) * 1000
+    size_mb = sum(shard.nbytes for shard in shards.shards) / 1e6
+    print(f"{len(shards)} images in {len(shards.shards)} shard(s), {size_mb:.0f} MB uint8 "
+          f"({size_mb * 4:.0f} MB as float32), opened in {open_ms:.1f} ms")
+    if shards.class_labels:
+        for label, count in zip(shards.class_labels, np.bincount(shards.labels, minlength=len(shards.class_labels))):
+            print(f"  {label:>16}: {count}")
+
+    start, images = time.perf_counter(), 0
+    for batch, _ in shards.iter_batches(args.batch_size):
+        images += len(batch)
+    elapsed = time.perf_counter() - start
+    print(f"{images} images in {elapsed:.2f} s ({images / elapsed:.0f} images/s as float32 batches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Export the trained crop disease CNN to lightweight CPU runtimes
+Writes next to models/crop_disease_model.h5:
+
+    crop_disease_model.tflite        float32 TFLite
+    crop_disease_model_int8.tflite   int8 weights/activations, calibrated on sample images
+    crop_disease_model.onnx          ONNX (needs: pip install tf2onnx onnxruntime)
+    export_report.json               accuracy delta of each export against the Keras model
+
+Calibration/evaluation images come from --calibration-dir. If it has one
+sub-folder per class (same names as models/class_labels.txt) the report also
+includes top-1 accuracy; without it random images are used, which is enough
+to check agreement but calibrates int8 poorly.
+A folder packed with dataset_shards.py (class folders, or --unlabelled)
+works too and skips decoding.
+
+Serve an export with SMART_FARMING_BACKEND=tflite-int8 (or tflite / onnx).
+
+Usage:
+    python export_model.py --calibration-dir dataset/val
+    python export_model.py --formats tflite,tflite-int8 --samples 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from image_pipeline import IMAGE_SIZE, InvalidImageError, fit_image, open_image, preprocess_batch
+from dataset_shards import ShardedDataset, is_shard_dir
+from model_backends import BACKEND_PATHS, load_backend
+
+LABELS_PATH = 'models/class_labels.txt'
+EXPORT_FORMATS = ('tflite', 'tflite-int8', 'onnx')
+REPORT_PATH = 'models/export_report.json'
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
+
+
+def load_class_labels():
+    if os.path.exists(LABELS_PATH):
+        with open(LABELS_PATH, 'r') as f:
+            return [line.strip() for line in f if line.strip()]
+    return []
+
+
+def load_samples(directory, class_labels, limit, seed=0):
+    """
+    (N, 224, 224, 3) float32 batch plus integer labels (or None)
+    Labels are taken from class-named sub-folders when every image has one.
+    A folder packed by dataset_shards.py is sampled from its shards.
+    """
+    rng = np.random.default_rng(seed)
+    if not directory:
+        print(f"No --calibration-dir given; using {limit} random images")
+        return rng.random((limit, IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.float32), None
+
+    if is_shard_dir(directory):
+        shards = ShardedDataset(directory)
+        indices = np.arange(len(shards))
+        if len(indices) > limit:
+            indices = np.sort(rng.choice(len(indices), limit, replace=False))
+        labels = shards.labels_for(class_labels)[indices]
+        print(f"Loaded {len(indices)} sample images from packed {directory}")
+        return shards.batch(indices), None if (labels < 0).any() else labels
+
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                paths.append(os.path.join(dirpath, filename))
+    if len(paths) > limit:
+        paths = [paths[i] for i in sorted(rng.choice(len(paths), limit, replace=False))]
+
+    images, labels = [], []
+    for path in paths:
+        try:
+            images.append(fit_image(open_image(path, IMAGE_SIZE), IMAGE_SIZE))
+        except InvalidImageError as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        folder = os.path.basename(os.path.dirname(path))
+        labels.append(class_labels.index(folder) if folder in class_labels else None)
+
+    if not images:
+        print(f"❌ No readable images under {directory}")
+        sys.exit(1)
+
+    print(f"Loaded {len(images)} sample images from {directory}")
+    labelled = None if None in labels else np.array(labels)
+    return preprocess_batch(images), labelled
+
+
+def export_tflite(model, path, samples=None):
+    """Float32 export, or full int8 post-training quantization when samples are given"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if samples is not None:
+        def representative_dataset():
+            for i in range(len(samples)):
+                yield [samples[i:i + 1]]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        # Input/output stay float32 so the predictor feeds the same [0, 1] batch
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_onnx(model, path):
+    try:
+        import tf2onnx
+    except ImportError:
+        print("Skipping ONNX export: pip install -r requirements-optional.txt")
+        return False
+
+    import tensorflow as tf
+    signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name='input')]
+    tf2onnx.convert.from_keras(model, input_signature=signature, output_path=path)
+    return True
+
+
+def predict_all(backend, samples, batch_size=32):
+    return np.concatenate([
+        backend.predict_on_batch(samples[start:start + batch_size])
+        for start in range(0, len(samples), batch_size)
+    ])
+
+
+def accuracy_delta(reference, probabilities, labels):
+    """Agreement and probability drift of one backend against the Keras reference"""
+    report = {
+        'top1_agreement': float(np.mean(reference.argmax(axis=1) == probabilities.argmax(axis=1))),
+        'max_abs_prob_diff': float(np.max(np.abs(reference - probabilities))),
+        'mean_abs_prob_diff': float(np.mean(np.abs(reference - probabilities))),
+    }
+    if labels is not None:
+        report['accuracy'] = float(np.mean(probabilities.argmax(axis=1) == labels))
+        report['accuracy_delta'] = report['accuracy'] - float(np.mean(reference.argmax(axis=1) == labels))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the crop disease model for CPU serving")
+    parser.add_argument('--model', default=BACKEND_PATHS['keras'], help='trained Keras model')
+    parser.add_argument('--formats', default=','.join(EXPORT_FORMATS),
+                        help=f"comma-separated subset of: {', '.join(EXPORT_FORMATS)}")
+    parser.add_argument('--calibration-dir', help='sample images or packed shards (class labels enable accuracy)')
+    parser.add_argument('--samples', type=int, default=100, help='calibration/evaluation images (default: 100)')
+    parser.add_argument('--report', default=REPORT_PATH, help=f"report path (default: {REPORT_PATH})")
+    args = parser.parse_args()
+
+    formats = [name.strip() for name in args.formats.split(',') if name.strip()]
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        print(f"❌ Unknown format(s): {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    if not os.path.exists(args.model):
+        print(f"❌ Model not found: {args.model}. Please train first: python train_model.py")
+        sys.exit(1)
+
+    print("🌱 Smart Farming Model Export")
+    print("=" * 50)
+
+    reference = load_backend('keras', args.model)
+    samples, labels = load_samples(args.calibration_dir, load_class_labels(), args.samples)
+    reference_probs = predict_all(reference, samples)
+
+    report = {
+        'source_model': args.model,
+        'samples': len(samples),
+        'labelled': labels is not None,
+        'backends': {}
+    }
+    if labels is not None:
+        report['keras_accuracy'] = float(np.mean(reference_probs.argmax(axis=1) == labels))
+
+    for name in formats:
+        path = BACKEND_PATHS[name]
+        start = time.perf_counter()
+        if name == 'tflite':
+            export_tflite(reference.model, path)
+        elif name == 'tflite-int8':
+            export_tflite(reference.model, path, samples)
+        elif not export_onnx(reference.model, path):
+            continue
+        export_seconds = time.perf_counter() - start
+
+        backend = load_backend(name, path)
+        entry = accuracy_delta(reference_probs, predict_all(backend, samples), labels)
+        entry.update({
+            'path': path,
+            'size_mb': os.path.getsize(path) / 1e6,
+            'export_seconds': export_seconds
+        })
+        report['backends'][name] = entry
+        print(f"✅ {name}: {path} ({entry['size_mb']:.1f} MB), "
+              f"top-1 agreement {entry['top1_agreement']:.1%}, "
+              f"max prob diff {entry['max_abs_prob_diff']:.4f}")
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
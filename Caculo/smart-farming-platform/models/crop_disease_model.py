@@ -4,9 +4,80 @@ This is a simplified model for demonstration purposes.
 In production, replace with a properly trained CNN model.
 """
 
-import tensorflow as tf
+import os
+import sys
+
 import numpy as np
-from tensorflow.keras import layers, models
+
+# TensorFlow is imported inside the functions that build or load a model, so
+# reading TRAINING_CONFIG or the architecture info stays cheap
+
+# Selectable with TRAINING_CONFIG["architecture"] or train_model.py --architecture
+ARCHITECTURES = {
+    "baseline": "conv blocks, Flatten, Dense(512): the dense layer holds most of the weights",
+    "gap": "the same conv blocks, global average pooling head",
+    "separable": "depthwise-separable conv blocks, global average pooling head",
+    "mobilenet": "frozen MobileNetV2 base (ImageNet weights), global average pooling head",
+}
+
+
+def build_architecture(name, num_classes=6, input_shape=(224, 224, 3), weights='imagenet', alpha=1.0):
+    """
+    Uncompiled model for one of the lightweight ARCHITECTURES ('gap',
+    'separable', 'mobilenet'); 'baseline' is each caller's own Flatten model.
+    All take images scaled to [0, 1], like every other model here.
+    weights and alpha apply to the MobileNetV2 base only.
+    """
+    from tensorflow.keras import layers, models
+
+    if name == 'gap':
+        model = models.Sequential([layers.Input(shape=input_shape)])
+        for filters in (32, 64, 128, 256):
+            model.add(layers.Conv2D(filters, (3, 3), activation='relu'))
+            model.add(layers.BatchNormalization())
+            model.add(layers.MaxPooling2D((2, 2)))
+            model.add(layers.Dropout(0.25))
+        # One value per channel instead of Flatten: 256 features, not 43k
+        model.add(layers.GlobalAveragePooling2D())
+        model.add(layers.Dense(128, activation='relu'))
+        model.add(layers.Dropout(0.5))
+    elif name == 'separable':
+        model = models.Sequential([
+            layers.Input(shape=input_shape),
+            # Full convolution only on the 3-channel input, at stride 2
+            layers.Conv2D(32, (3, 3), strides=2, padding='same', use_bias=False),
+            layers.BatchNormalization(),
+            layers.ReLU(),
+        ])
+        for filters in (64, 128, 128, 256, 256):
+            # Depthwise 3x3 then pointwise 1x1: ~1/9 of the multiply-adds of Conv2D
+            model.add(layers.SeparableConv2D(filters, (3, 3), padding='same', use_bias=False))
+            model.add(layers.BatchNormalization())
+            model.add(layers.ReLU())
+            model.add(layers.MaxPooling2D((2, 2)))
+        model.add(layers.GlobalAveragePooling2D())
+        model.add(layers.Dropout(0.3))
+    elif name == 'mobilenet':
+        import tensorflow as tf
+
+        base = tf.keras.applications.MobileNetV2(input_shape=input_shape, include_top=False,
+                                                 weights=weights, alpha=alpha)
+        base.trainable = False
+        inputs = layers.Input(shape=input_shape)
+        # MobileNetV2 expects [-1, 1]; the shared preprocessing gives [0, 1]
+        x = layers.Rescaling(2.0, offset=-1.0)(inputs)
+        # training=False keeps the frozen base's batch-norm statistics fixed
+        x = base(x, training=False)
+        x = layers.GlobalAveragePooling2D()(x)
+        x = layers.Dropout(0.2)(x)
+        outputs = layers.Dense(num_classes, activation='softmax', dtype='float32')(x)
+        return models.Model(inputs, outputs, name='mobilenet_v2_transfer')
+    else:
+        raise ValueError(f"Unknown architecture {name!r}; expected one of {', '.join(ARCHITECTURES)}")
+
+    # float32 softmax, also under mixed precision
+    model.add(layers.Dense(num_classes, activation='softmax', dtype='float32'))
+    return model
 
 class CropDiseaseModel:
     """
@@ -14,15 +85,21 @@ class CropDiseaseModel:
     This is a demonstration model - replace with trained model in production
     """
     
-    def __init__(self, num_classes=6, input_shape=(224, 224, 3)):
+    def __init__(self, num_classes=6, input_shape=(224, 224, 3), architecture='baseline'):
         self.num_classes = num_classes
         self.input_shape = input_shape
+        self.architecture = architecture
         self.model = self._build_model()
         
     def _build_model(self):
         """
         Build CNN architecture for crop disease detection
         """
+        from tensorflow.keras import layers, models
+
+        if self.architecture != 'baseline':
+            return build_architecture(self.architecture, self.num_classes, self.input_shape)
+
         model = models.Sequential([
             # First Convolutional Block
             layers.Conv2D(32, (3, 3), activation='relu', input_shape=self.input_shape),
@@ -58,22 +135,24 @@ class CropDiseaseModel:
             layers.BatchNormalization(),
             layers.Dropout(0.5),
             
-            # Output Layer
-            layers.Dense(self.num_classes, activation='softmax')
+            # Output Layer (float32 softmax, also under mixed precision)
+            layers.Dense(self.num_classes, activation='softmax', dtype='float32')
         ])
         
         return model
     
-    def compile_model(self, learning_rate=0.001):
+    def compile_model(self, learning_rate=0.001, jit_compile=False):
         """
         Compile the model with optimizer, loss, and metrics
         """
+        import tensorflow as tf
         optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate)
         
         self.model.compile(
             optimizer=optimizer,
             loss='categorical_crossentropy',
-            metrics=['accuracy', 'top_3_accuracy']
+            metrics=['accuracy', tf.keras.metrics.TopKCategoricalAccuracy(k=3, name='top_3_accuracy')],
+            jit_compile=jit_compile
         )
         
         return self.model
@@ -95,6 +174,7 @@ class CropDiseaseModel:
         """
         Load a pre-trained model
         """
+        import tensorflow as tf
         self.model = tf.keras.models.load_model(filepath)
         print(f"Model loaded from {filepath}")
         return self.model
@@ -103,31 +183,46 @@ def create_dummy_trained_model():
     """
     Create a dummy trained model for demonstration
     In production, this would be replaced with actual training data and process
+    Runs with the TRAINING_CONFIG['runtime'] settings
     """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from training_runtime import configure_runtime
+    from training_callbacks import training_callbacks
+    runtime = configure_runtime()
+    import tensorflow as tf
+
     # Disease classes
     classes = ["Healthy", "Leaf Blight", "Powdery Mildew", "Rust Disease", "Bacterial Spot", "Mosaic Virus"]
     
     # Create model
-    model = CropDiseaseModel(num_classes=len(classes))
-    compiled_model = model.compile_model()
+    with runtime.scope():
+        model = CropDiseaseModel(num_classes=len(classes))
+        compiled_model = model.compile_model(jit_compile=runtime.jit_compile)
     
     # Generate dummy training data for demonstration
     # In production, use real crop disease images
-    dummy_images = np.random.random((100, 224, 224, 3))
+    dummy_images = np.random.random((100, 224, 224, 3)).astype(np.float32)
     dummy_labels = tf.keras.utils.to_categorical(
         np.random.randint(0, len(classes), 100), 
         num_classes=len(classes)
     )
+    batch_size = runtime.worker_batch_size(32)
+    dataset = tf.data.Dataset.from_tensor_slices((dummy_images, dummy_labels))
+    if runtime.shard:
+        dataset = dataset.shard(*runtime.shard)
     
     # "Train" the model with dummy data (just for demonstration)
     # In production, use real training process with validation
     print("Training dummy model (for demonstration only)...")
-    history = compiled_model.fit(
-        dummy_images, 
-        dummy_labels,
+    history = runtime.fit(
+        compiled_model,
+        dataset.batch(batch_size),
         epochs=1,  # Minimal training for demo
-        batch_size=32,
-        verbose=0
+        steps_per_epoch=runtime.steps_per_epoch(len(dummy_images), 32),
+        batch_size=batch_size,
+        verbose=0,
+        # Early stopping and LR reduction only: a demo run keeps no checkpoints
+        callbacks=training_callbacks(runtime, has_validation=False)
     )
     
     print("Dummy model training completed!")
@@ -153,25 +248,22 @@ def get_model_architecture_info():
         ],
         "input_size": "224x224x3 (RGB images)",
         "output_classes": 6,
-        "total_parameters": "~2.5M parameters (estimated)"
+        "total_parameters": "~2.5M parameters (estimated)",
+        "selectable_architectures": dict(ARCHITECTURES)
     }
     
     return info
 
-def preprocess_for_training(image_directory):
+def preprocess_for_training(image_directory, class_labels, **options):
     """
     Preprocessing pipeline for training data
-    This is a template - implement based on your dataset
+    Returns (train_dataset, val_dataset, counts) streaming from class folders;
+    see data_pipeline.make_datasets for the options
     """
-    preprocessing_steps = [
-        "1. Image resizing to 224x224 pixels",
-        "2. Normalization (pixel values 0-1)",
-        "3. Data augmentation (rotation, flip, zoom)",
-        "4. Train/validation/test split (70/20/10)",
-        "5. Batch creation for efficient training"
-    ]
-    
-    return preprocessing_steps
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from data_pipeline import make_datasets
+
+    return make_datasets(image_directory, class_labels, **options)
 
 # Model training configuration
 TRAINING_CONFIG = {
@@ -179,8 +271,23 @@ TRAINING_CONFIG = {
     "epochs": 50,
     "learning_rate": 0.001,
     "validation_split": 0.2,
+    "shuffle_buffer": 1024,  # decoded images held for shuffling (~150 KB each)
     "early_stopping_patience": 10,
     "reduce_lr_patience": 5,
+    "architecture": "baseline",          # or one of the lighter ARCHITECTURES: "gap", "separable", "mobilenet"
+    "reduce_lr_factor": 0.2,             # learning rate multiplier after a plateau
+    "min_learning_rate": 1e-6,
+    "checkpoint_every": 1,               # epochs between checkpoints (training_callbacks.py)
+    "keep_checkpoints": 2,               # newest checkpoints kept on disk
+    # CPU runtime knobs, applied by training_runtime.configure_runtime()
+    "runtime": {
+        "intra_op_threads": 0,           # threads inside one op; 0 = TensorFlow default (all cores)
+        "inter_op_threads": 0,           # ops run concurrently; 0 = TensorFlow default
+        "onednn": True,                  # oneDNN kernels (TF_ENABLE_ONEDNN_OPTS, read at import)
+        "xla_jit": False,                # XLA-compile the training step
+        "mixed_precision": "float32",    # or "mixed_bfloat16" on CPUs with AVX512-BF16 / AMX
+        "distribution": None             # or "multi_worker" (cluster from TF_CONFIG)
+    },
     "data_augmentation": {
         "rotation_range": 20,
         "width_shift_range": 0.2,
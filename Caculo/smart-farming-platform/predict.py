@@ -1,69 +1,42 @@
 import numpy as np
 from PIL import Image
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from visual_analysis import classify_batch, classify_image, stack_images
 
 class CropDiseasePredictor:
     """Visual analysis-based crop disease predictor for deployment"""
-    
+
     def __init__(self):
         self.class_labels = [
             'Bacterial Spot',
-            'Healthy', 
+            'Healthy',
             'Leaf Blight',
             'Mosaic Virus',
             'Powdery Mildew',
             'Rust Disease'
         ]
         print("Visual analysis predictor initialized")
-    
+
     def predict(self, image):
         """Predict disease using visual analysis"""
         try:
-            image_array = np.array(image.resize((224, 224)))
-            
-            if len(image_array.shape) == 3:
-                # Extract color statistics
-                red = np.mean(image_array[:, :, 0])
-                green = np.mean(image_array[:, :, 1])
-                blue = np.mean(image_array[:, :, 2])
-                brightness = np.mean(image_array)
-                
-                # Disease detection based on visual characteristics
-                
-                # Healthy: Dominant green, good brightness
-                if green > red + 15 and green > blue + 10 and brightness > 100:
-                    return "Healthy", 85.0
-                
-                # Powdery Mildew: High brightness (white patches)
-                elif brightness > 180 or (red > 200 and green > 200 and blue > 200):
-                    return "Powdery Mildew", 82.0
-                
-                # Rust Disease: High red, low green (orange/brown)
-                elif red > green + 25 and red > 130:
-                    return "Rust Disease", 80.0
-                
-                # Leaf Blight: Low brightness (dark spots)
-                elif brightness < 80 or (red < 90 and green < 90 and blue < 90):
-                    return "Leaf Blight", 78.0
-                
-                # Bacterial Spot: Moderate values with some contrast
-                elif 90 < brightness < 150 and abs(red - green) > 10:
-                    return "Bacterial Spot", 75.0
-                
-                # Mosaic Virus: Default for other patterns
-                else:
-                    return "Mosaic Virus", 72.0
-                    
-            else:
-                # Grayscale analysis
-                brightness = np.mean(image_array)
-                if brightness > 180:
-                    return "Powdery Mildew", 70.0
-                elif brightness < 80:
-                    return "Leaf Blight", 70.0
-                else:
-                    return "Healthy", 65.0
-                    
+            return classify_image(image)
+
         except Exception as e:
             print(f"Prediction error: {e}")
             return "Uncertain - Retake Image", 0.0
+
+    def predict_batch(self, images):
+        """Predict diseases for a list of same-mode images in one vectorized pass"""
+        try:
+            labels, confidences = classify_batch(stack_images(images))
+            return [(label, float(confidence)) for label, confidence in zip(labels, confidences)]
+
+        except Exception as e:
+            # Mixed modes or unreadable images: fall back to one at a time
+            print(f"Batch prediction error: {e}")
+            return [self.predict(image) for image in images]
@@ -4,25 +4,22 @@ Smart Farming Platform Launcher
 Run this script to start the Streamlit application
 """
 
+import importlib.util
 import subprocess
 import sys
 import os
 
+REQUIRED_PACKAGES = ['streamlit', 'tensorflow', 'PIL', 'requests', 'pandas', 'numpy']
+
 def check_requirements():
-    """Check if required packages are installed"""
-    try:
-        import streamlit
-        import tensorflow
-        import PIL
-        import requests
-        import pandas
-        import numpy
-        print("✅ All required packages are installed")
-        return True
-    except ImportError as e:
-        print(f"❌ Missing package: {e}")
+    """Check if required packages are installed (located, not imported, so the check is instant)"""
+    missing = [name for name in REQUIRED_PACKAGES if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"❌ Missing package: {', '.join(missing)}")
         print("Please install requirements: pip install -r requirements.txt")
         return False
+    print("✅ All required packages are installed")
+    return True
 
 def main():
     print("🌱 Smart Farming Platform")
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Bulk crop-image scanner
+Streams every image under a directory tree, decodes them in a process pool,
+runs inference in batches and writes labels, confidences, full class
+distributions and recommended treatment IDs to CSV, JSONL or Parquet.
+
+Memory stays bounded however many images there are: paths are walked
+lazily, at most a few batches are in flight, and results are flushed to
+disk after every batch. A checkpoint file next to the output records how far
+the scan got and how much of the output holds those results, so an
+interrupted scan resumes with --resume without losing or repeating rows.
+
+Usage:
+    python scan.py DIR --out results.csv
+    python scan.py DIR --out results.jsonl --workers 8 --batch-size 64
+    python scan.py DIR --out results.parquet --resume
+    python scan.py PACKED_DIR --out results.csv   # images packed by dataset_shards.py
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+# src/ first: the root predict.py is the visual-analysis-only predictor
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from image_pipeline import IMAGE_SIZE, InvalidImageError, fit_image, open_image
+from dataset_shards import ShardedDataset, is_shard_dir
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
+TOP_TREATMENTS = 3
+
+
+def iter_image_paths(root):
+    """Yield image paths under root in a stable order, without listing the whole tree up front"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(dirpath, filename)
+
+
+def decode_for_model(path):
+    """
+    Worker-process decode: (path, uint8 pixels or None, error or None)
+    Returns compact uint8 pixels; normalisation happens per batch in the parent
+    """
+    try:
+        image = fit_image(open_image(path, IMAGE_SIZE), IMAGE_SIZE)
+        return path, np.asarray(image, dtype=np.uint8), None
+    except InvalidImageError as e:
+        return path, None, str(e)
+    except Exception as e:
+        return path, None, f"Decode failed: {e}"
+
+
+class Checkpoint:
+    """
+    High-water mark of a scan: how many images, in the scan's stable order,
+    have their results on disk, the last of them, and the writer position
+    just after their rows. Batches are written in that order, so resuming
+    skips that many images, in constant memory however large the tree, and
+    drops any rows written after the mark.
+    """
+
+    def __init__(self, path, resume):
+        self.path = path
+        self.count = 0
+        self.last = None
+        self.position = 0
+        if resume and os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            self.count, self.last = state['count'], state['last']
+            self.position = state.get('position')
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def verify(self, name):
+        """Stop if the image at the mark is not the one recorded (the tree changed since)"""
+        if name != self.last:
+            print(f"\n❌ {self.path}: image {self.count} is now {name!r}, not {self.last!r}; "
+                  f"the images changed since the checkpoint, rerun without --resume")
+            sys.exit(1)
+
+    def mark(self, names, position):
+        """Record names as done; call only once their rows are durable up to position"""
+        names = list(names)
+        if not names:
+            return
+        self.count += len(names)
+        self.last = names[-1]
+        self.position = position
+        partial = f"{self.path}.partial"
+        with open(partial, 'w') as f:
+            json.dump({'count': self.count, 'last': self.last, 'position': self.position}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, self.path)
+
+
+def _open_for_resume(path, append, position, newline=None):
+    """
+    Open a text output for writing; when appending, bytes after position
+    (rows written after the last checkpoint) are cut first
+    """
+    if append and position is not None and os.path.exists(path) and os.path.getsize(path) > position:
+        os.truncate(path, position)
+    return open(path, 'a' if append else 'w', newline=newline)
+
+
+def _sync(f):
+    """Flush a file to disk and return its size, the position a checkpoint records"""
+    f.flush()
+    os.fsync(f.fileno())
+    return os.fstat(f.fileno()).st_size
+
+
+class CsvResultWriter:
+    """Flat CSV: one probability column per class, treatment IDs joined with ';'"""
+
+    def __init__(self, path, class_labels, append, position=None):
+        self.class_labels = class_labels
+        self._file = _open_for_resume(path, append, position, newline='')
+        write_header = os.fstat(self._file.fileno()).st_size == 0
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(['path', 'label', 'confidence', 'source', 'error', 'treatment_ids']
+                                  + [f"p_{label}" for label in class_labels])
+
+    def write(self, rows):
+        for row in rows:
+            distribution = row['distribution'] or {}
+            self._writer.writerow(
+                [row['path'], row['label'], row['confidence'], row['source'], row['error'],
+                 ';'.join(row['treatment_ids'])]
+                + [distribution.get(label, '') for label in self.class_labels]
+            )
+        return _sync(self._file)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlResultWriter:
+    """One JSON object per image, distribution kept as a nested mapping"""
+
+    def __init__(self, path, class_labels, append, position=None):
+        self._file = _open_for_resume(path, append, position)
+
+    def write(self, rows):
+        self._file.write(''.join(json.dumps(row) + '\n' for row in rows))
+        return _sync(self._file)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """
+    Parquet dataset directory with one complete part file per batch: a
+    Parquet file is only readable once closed, so each batch is written to a
+    hidden temporary file and renamed into place. The position is the number
+    of parts; a resumed scan deletes parts past it and appends new ones.
+    Read with pandas.read_parquet(path).
+    """
+
+    def __init__(self, path, class_labels, append, position=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("❌ Parquet output needs pyarrow: pip install -r requirements-optional.txt")
+            sys.exit(1)
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.class_labels = class_labels
+        os.makedirs(path, exist_ok=True)
+        parts = sorted(name for name in os.listdir(path) if name.startswith('part-') and name.endswith('.parquet'))
+        if append and position is None:
+            position = len(parts)
+        self._part = position if append else 0
+        for name in parts[self._part:] + [name for name in os.listdir(path) if name.startswith('.part-')]:
+            os.remove(os.path.join(path, name))
+
+        fields = [
+            ('path', pa.string()), ('label', pa.string()), ('confidence', pa.float64()),
+            ('source', pa.string()), ('error', pa.string()), ('treatment_ids', pa.list_(pa.string()))
+        ] + [(f"p_{label}", pa.float64()) for label in class_labels]
+        self.schema = pa.schema(fields)
+
+    def write(self, rows):
+        columns = {name: [] for name in self.schema.names}
+        for row in rows:
+            distribution = row['distribution'] or {}
+            for name in ('path', 'label', 'confidence', 'source', 'error', 'treatment_ids'):
+                columns[name].append(row[name])
+            for label in self.class_labels:
+                columns[f"p_{label}"].append(distribution.get(label))
+
+        name = f"part-{self._part:05d}.parquet"
+        partial = os.path.join(self.path, f".{name}")
+        self.pq.write_table(self.pa.table(columns, schema=self.schema), partial)
+        with open(partial, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(partial, os.path.join(self.path, name))
+        self._part += 1
+        return self._part
+
+    def close(self):
+        pass
+
+
+WRITERS = {
+    'csv': CsvResultWriter,
+    'jsonl': JsonlResultWriter,
+    'parquet': ParquetResultWriter,
+}
+
+
+def output_format(path, requested):
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in WRITERS:
+        print(f"❌ Cannot infer output format from '{path}'; use --format csv|jsonl|parquet")
+        sys.exit(1)
+    return extension
+
+
+class ProgressReporter:
+    """Single-line progress and throughput readout"""
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last = 0.0
+        self.processed = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def update(self, processed=0, errors=0, skipped=0, force=False):
+        self.processed += processed
+        self.errors += errors
+        self.skipped += skipped
+        elapsed = time.perf_counter() - self.start
+        if force or elapsed - self.last >= self.interval:
+            self.last = elapsed
+            rate = self.processed / elapsed if elapsed > 0 else 0.0
+            print(f"\r📷 {self.processed} scanned | {self.errors} unreadable | "
+                  f"{self.skipped} already done | {rate:.1f} img/s", end='', flush=True)
+
+
+def scan(root, out, fmt=None, batch_size=32, workers=None, resume=False, checkpoint_path=None):
+    """
+    Scan a directory tree and write one result row per image
+    A directory packed by dataset_shards.py is read from its shards instead
+    of being decoded.
+    """
+    from predict import CropDiseasePredictor
+    from treatment_advisor import TreatmentAdvisor, treatment_id
+
+    fmt = output_format(out, fmt)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = batch_size * 4
+
+    shards = ShardedDataset(root) if is_shard_dir(root) else None
+    executor = None
+    if shards is None:
+        # Spawned workers import only the decode pipeline, never TensorFlow
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    predictor = CropDiseasePredictor()
+    advisor = TreatmentAdvisor()
+    treatment_ids = {}
+
+    def recommended_ids(label):
+        if label not in treatment_ids:
+            treatments = advisor.get_recommendations(label)[:TOP_TREATMENTS]
+            treatment_ids[label] = [treatment_id(t) for t in treatments]
+        return treatment_ids[label]
+
+    checkpoint = Checkpoint(checkpoint_path or f"{out}.checkpoint", resume)
+    writer = WRITERS[fmt](out, predictor.class_labels, append=resume, position=checkpoint.position)
+    progress = ProgressReporter()
+
+    def flush(names, pixels, failures=()):
+        """
+        Run one uint8 batch through the model and persist it with any decode
+        failures; returns the writer position after the batch
+        """
+        rows = []
+        results = predictor.analyze_pixels(pixels) if len(names) else []
+        for name, result in zip(names, results):
+            rows.append({
+                'path': name,
+                'label': result.label,
+                'confidence': result.confidence,
+                'source': result.source,
+                'error': None,
+                'treatment_ids': recommended_ids(result.label),
+                'distribution': result.distribution or None
+            })
+        for name, error in failures:
+            rows.append({
+                'path': name, 'label': None, 'confidence': None,
+                'source': None, 'error': error, 'treatment_ids': [], 'distribution': None
+            })
+
+        position = writer.write(rows)
+        progress.update(processed=len(names), errors=len(failures))
+        return position
+
+    def flush_decoded(decoded):
+        good = [(path, pixels) for path, pixels, error in decoded if error is None]
+        position = flush([os.path.relpath(path, root) for path, _ in good],
+                         np.stack([pixels for _, pixels in good]) if good else (),
+                         [(os.path.relpath(path, root), error) for path, _, error in decoded if error is not None])
+        # In scan order: failures are written after the batch's good rows
+        checkpoint.mark((os.path.relpath(path, root) for path, _, _ in decoded), position)
+
+    try:
+        if shards is not None:
+            if checkpoint.count:
+                checkpoint.verify(shards.paths[checkpoint.count - 1] if checkpoint.count <= len(shards) else None)
+                progress.update(skipped=checkpoint.count)
+            for start in range(checkpoint.count, len(shards), batch_size):
+                stop = min(start + batch_size, len(shards))
+                # Zero-copy: the batch is a view of the mapped shard
+                position = flush(shards.paths[start:stop], shards.images(slice(start, stop)))
+                checkpoint.mark(shards.paths[start:stop], position)
+            return progress
+
+        paths = iter_image_paths(root)
+        if checkpoint.count:
+            consumed = 0
+            for consumed, path in enumerate(itertools.islice(paths, checkpoint.count), 1):
+                pass
+            checkpoint.verify(os.path.relpath(path, root) if consumed == checkpoint.count else None)
+            progress.update(skipped=checkpoint.count)
+
+        in_flight = deque()
+        pending = []
+        for path in paths:
+            in_flight.append(executor.submit(decode_for_model, path))
+            # Bounded window: wait for the oldest decode before queuing more
+            while len(in_flight) >= max_in_flight:
+                pending.append(in_flight.popleft().result())
+                if len(pending) >= batch_size:
+                    flush_decoded(pending)
+                    pending = []
+
+        while in_flight:
+            pending.append(in_flight.popleft().result())
+            if len(pending) >= batch_size:
+                flush_decoded(pending)
+                pending = []
+        if pending:
+            flush_decoded(pending)
+
+    finally:
+        progress.update(force=True)
+        print()
+        writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a folder of crop images for diseases")
+    parser.add_argument('directory', help='root folder of images (scanned recursively) or a packed shard folder')
+    parser.add_argument('--out', required=True, help='output file: .csv, .jsonl or .parquet')
+    parser.add_argument('--format', choices=sorted(WRITERS), help='override format inferred from --out')
+    parser.add_argument('--batch-size', type=int, default=32, help='images per forward pass (default: 32)')
+    parser.add_argument('--workers', type=int, help='decode processes (default: CPU count)')
+    parser.add_argument('--resume', action='store_true', help='continue after the images the checkpoint marks as done')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <out>.checkpoint)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"❌ Not a directory: {args.directory}")
+        sys.exit(1)
+
+    print("🌱 Smart Farming Bulk Scan")
+    print("=" * 50)
+    progress = scan(args.directory, args.out, args.format, args.batch_size,
+                    args.workers, args.resume, args.checkpoint)
+    elapsed = time.perf_counter() - progress.start
+    print(f"✅ Done: {progress.processed} images in {elapsed:.1f}s -> {args.out}")
+
+if __name__ == "__main__":
+    main()
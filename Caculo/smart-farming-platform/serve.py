@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Smart Farming Platform HTTP API
+Run this script to start the headless inference service (no Streamlit)
+"""
+
+import argparse
+import os
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Farming Platform HTTP API")
+    parser.add_argument('--host', default='127.0.0.1', help='interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on (default: 8000)')
+    parser.add_argument('--max-concurrent', type=int, default=8,
+                        help='requests processed at once; others wait (default: 8)')
+    parser.add_argument('--queue-timeout', type=float, default=5.0,
+                        help='seconds a request may wait for a slot before 503 (default: 5)')
+    parser.add_argument('--no-warm-up', action='store_true', help='load services on first request')
+    args = parser.parse_args()
+
+    print("🌱 Smart Farming Platform API")
+    print("=" * 50)
+
+    # Check if we're in the right directory
+    if not os.path.exists("src/api_server.py"):
+        print("❌ Error: Please run this script from the smart-farming-platform directory")
+        sys.exit(1)
+
+    sys.path.insert(0, os.path.abspath("src"))
+    from api_server import serve
+
+    serve(args.host, args.port, args.max_concurrent, args.queue_timeout, warm_up=not args.no_warm_up)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Headless HTTP inference service
+Exposes the same shared predictor, treatment advisor and weather service as
+the Streamlit app (via the process-wide service registry), so mobile clients
+and batch jobs can call them without paying for a Streamlit rerun.
+
+Endpoints:
+    GET  /health                          liveness and service load state
+    GET  /metrics                         registry, cache and batching counters
+    POST /predict                         one image (raw body or multipart "image")
+    POST /predict/batch                   multipart, one or more image parts
+    GET  /recommendations?disease=...     treatment options
+    GET  /treatment-plan?disease=...&severity=medium[&budget=40&min_eco=4]
+    GET  /treatments/search?q=...&crop=...&certification=...&sort_by=...&limit=20
+    GET  /treatments/suggest?field=ingredient&prefix=ne
+    POST /farm-plan                       JSON {"plots": [disease, ...], "budget": 5000, "min_eco": 4}
+    GET  /weather?city=...                conditions, farming metrics and advice
+    GET  /forecast?city=...&hours=120     hourly forecast with rolling disease-risk window
+"""
+
+import email.parser
+import email.policy
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from image_pipeline import InvalidImageError, open_image
+from service_registry import get_registry
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024  # same limit as the upload helpers
+MAX_BATCH_IMAGES = 64
+MAX_FARM_PLOTS = 100_000
+MAX_JSON_BYTES = 4 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    """Error that maps directly to an HTTP status and JSON message"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def parse_multipart(content_type, body):
+    """Return [(field_name, filename, bytes)] for each part of a multipart body"""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode('latin-1') + b"\r\n\r\n" + body
+    )
+    if not message.is_multipart():
+        raise HTTPError(400, "Malformed multipart body")
+
+    parts = []
+    for part in message.iter_parts():
+        payload = part.get_payload(decode=True) or b''
+        parts.append((part.get_param('name', header='content-disposition'), part.get_filename(), payload))
+    return parts
+
+
+def to_jsonable(value):
+    """Plain dicts/lists for JSON encoding (read-only mappings, tuples, numpy scalars)"""
+    if isinstance(value, dict) or hasattr(value, 'keys'):
+        return {key: to_jsonable(value[key]) for key in value.keys()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if hasattr(value, 'item') and callable(value.item):
+        return value.item()
+    return value
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the shared services with bounded concurrency"""
+
+    server_version = "SmartFarmingAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    routes = {
+        ('GET', '/health'): 'handle_health',
+        ('GET', '/metrics'): 'handle_metrics',
+        ('POST', '/predict'): 'handle_predict',
+        ('POST', '/predict/batch'): 'handle_predict_batch',
+        ('GET', '/recommendations'): 'handle_recommendations',
+        ('GET', '/treatment-plan'): 'handle_treatment_plan',
+        ('POST', '/farm-plan'): 'handle_farm_plan',
+        ('GET', '/treatments/search'): 'handle_treatment_search',
+        ('GET', '/treatments/suggest'): 'handle_treatment_suggest',
+        ('GET', '/weather'): 'handle_weather',
+        ('GET', '/forecast'): 'handle_forecast',
+    }
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        handler_name = self.routes.get((method, url.path.rstrip('/') or '/'))
+        self.query = parse_qs(url.query)
+        self._body_read = False
+
+        try:
+            if handler_name is None:
+                raise HTTPError(404, f"No route for {method} {url.path}")
+
+            # Cheap endpoints are never queued behind inference work
+            if handler_name in ('handle_health', 'handle_metrics'):
+                self._send_json(200, getattr(self, handler_name)())
+                return
+
+            if not self.server.slots.acquire(timeout=self.server.queue_timeout):
+                raise HTTPError(503, "Server busy, retry shortly", {'Retry-After': '1'})
+            try:
+                self._send_json(200, getattr(self, handler_name)())
+            finally:
+                self.server.slots.release()
+
+        except HTTPError as e:
+            self._send_json(e.status, {'error': e.message}, e.headers)
+        except Exception as e:
+            print(f"API error on {method} {url.path}: {e}")
+            self._send_json(500, {'error': 'Internal server error'})
+
+    # Helpers
+
+    def _param(self, name, default=None, required=False):
+        values = self.query.get(name)
+        if not values:
+            if required:
+                raise HTTPError(400, f"Missing query parameter: {name}")
+            return default
+        return values[0]
+
+    def _content_length(self):
+        try:
+            return int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+
+    def _read_body(self, limit):
+        length = self._content_length()
+        if length <= 0:
+            raise HTTPError(400, "Empty request body")
+        if length > limit:
+            # Left unread: the response closes the connection instead
+            raise HTTPError(413, f"Request body too large (max {limit} bytes)")
+        self._body_read = True
+        return self.rfile.read(length)
+
+    def _body_pending(self):
+        """True when the request sent a body that was never read"""
+        if self._body_read:
+            return False
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            return True
+        try:
+            return self._content_length() > 0
+        except HTTPError:
+            return True
+
+    def _float_param(self, name, default=None):
+        value = self._param(name)
+        if value is None:
+            return default
+        try:
+            number = float(value)
+        except ValueError:
+            raise HTTPError(400, f"{name} must be a number")
+        if number != number or number < 0:
+            raise HTTPError(400, f"{name} must be a non-negative number")
+        return number
+
+    def _read_json(self, limit=MAX_JSON_BYTES):
+        try:
+            return json.loads(self._read_body(limit))
+        except ValueError:
+            raise HTTPError(400, "Request body must be valid JSON")
+
+    def _read_images(self, max_images):
+        content_type = self.headers.get('Content-Type', '')
+        body = self._read_body(MAX_IMAGE_BYTES * max_images)
+
+        if content_type.startswith('multipart/form-data'):
+            blobs = [payload for _, _, payload in parse_multipart(content_type, body) if payload]
+        else:
+            blobs = [body]
+
+        if not blobs:
+            raise HTTPError(400, "No image data in request")
+        if len(blobs) > max_images:
+            raise HTTPError(413, f"Too many images (max {max_images})")
+
+        images = []
+        for index, blob in enumerate(blobs):
+            if len(blob) > MAX_IMAGE_BYTES:
+                raise HTTPError(413, f"Image {index} too large (max {MAX_IMAGE_BYTES} bytes)")
+            try:
+                images.append(open_image(io.BytesIO(blob)))
+            except InvalidImageError as e:
+                raise HTTPError(400, f"Image {index}: {e}")
+        return images
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(to_jsonable(payload)).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self._body_pending():
+            # An unread body would be parsed as the next request on a kept-alive
+            # connection, and reading a rejected one wastes the bandwidth and time
+            self.close_connection = True
+            self.send_header('Connection', 'close')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    # Endpoints
+
+    def handle_health(self):
+        registry = self.server.registry
+        return {
+            'status': 'ok',
+            'services': {name: registry.is_loaded(name) for name in registry.names()}
+        }
+
+    def handle_metrics(self):
+        registry = self.server.registry
+        metrics = {'services': registry.get_metrics()}
+        if registry.is_loaded('predictor'):
+            predictor = registry.get('predictor')
+            metrics['prediction_cache'] = predictor.get_cache_stats()
+            metrics['batching'] = predictor.get_batching_stats()
+        if registry.is_loaded('treatment_advisor'):
+            metrics['treatment_database'] = registry.get('treatment_advisor').database.get_stats()
+        if registry.is_loaded('weather_service'):
+            metrics['weather_cache'] = registry.get('weather_service').get_cache_stats()
+        return metrics
+
+    def handle_predict(self):
+        image = self._read_images(max_images=1)[0]
+        return self.server.registry.get('predictor').analyze(image).to_dict()
+
+    def handle_predict_batch(self):
+        images = self._read_images(max_images=MAX_BATCH_IMAGES)
+        results = self.server.registry.get('predictor').analyze_batch(images)
+        return {'results': [result.to_dict() for result in results]}
+
+    def handle_recommendations(self):
+        disease = self._param('disease', required=True)
+        advisor = self.server.registry.get('treatment_advisor')
+        return {'disease': disease, 'treatments': advisor.get_recommendations(disease)}
+
+    def handle_treatment_plan(self):
+        disease = self._param('disease', required=True)
+        severity = self._param('severity', 'medium')
+        return self.server.registry.get('treatment_advisor').generate_treatment_plan(
+            disease, severity, budget=self._float_param('budget'), min_eco=self._float_param('min_eco'))
+
+    def _int_param(self, name, default, low, high):
+        try:
+            return min(max(int(self._param(name, default)), low), high)
+        except ValueError:
+            raise HTTPError(400, f"{name} must be an integer")
+
+    def handle_treatment_search(self):
+        query = {key: self.query[key] if len(self.query[key]) > 1 else self.query[key][0]
+                 for key in ('crop', 'disease', 'ingredient', 'type', 'certification') if key in self.query}
+        text = self._param('q')
+        min_eco = self._float_param('min_eco')
+        try:
+            result = self.server.registry.get('treatment_advisor').search_treatments(
+                text=text, prefix=self._param('prefix', '0') in ('1', 'true'), min_eco=min_eco,
+                max_cost=self._param('max_cost'), sort_by=self._param('sort_by', 'recommended'),
+                limit=self._int_param('limit', 20, 1, 500), offset=self._int_param('offset', 0, 0, 10**9),
+                **query)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return result
+
+    def handle_treatment_suggest(self):
+        field = self._param('field', required=True)
+        try:
+            values = self.server.registry.get('treatment_advisor').suggest(
+                field, self._param('prefix', ''), self._int_param('limit', 10, 1, 100))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return {'field': field, 'values': values}
+
+    def handle_farm_plan(self):
+        body = self._read_json()
+        plots = body.get('plots') if isinstance(body, dict) else None
+        if not isinstance(plots, list) or not all(isinstance(plot, str) for plot in plots):
+            raise HTTPError(400, "plots must be a list of disease names")
+        if len(plots) > MAX_FARM_PLOTS:
+            raise HTTPError(413, f"Too many plots (max {MAX_FARM_PLOTS})")
+        try:
+            budget = float(body['budget'])
+            min_eco = float(body.get('min_eco', 0))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "budget (and min_eco, if given) must be numbers")
+        if not (budget >= 0 and min_eco >= 0) or budget == float('inf'):
+            raise HTTPError(400, "budget and min_eco must be finite and non-negative")
+
+        result = self.server.registry.get('treatment_advisor').plan_farm(plots, budget, min_eco)
+        result['plans'] = [plan.to_dict() if plan else None for plan in result['plans']]
+        return result
+
+    def handle_weather(self):
+        city = self._param('city', required=True)
+        weather_service = self.server.registry.get('weather_service')
+        weather_data = weather_service.get_weather_data(city)
+        if not weather_data:
+            raise HTTPError(502, "Could not fetch weather data")
+        return {'weather': weather_data, 'advice': weather_service.get_farming_advice(weather_data)}
+
+    def handle_forecast(self):
+        city = self._param('city', required=True)
+        try:
+            hours = int(self._param('hours', 120))
+        except ValueError:
+            raise HTTPError(400, "hours must be an integer")
+        forecast = self.server.registry.get('weather_service').get_forecast(city, hours=min(max(hours, 1), 240))
+        if forecast is None:
+            raise HTTPError(502, "Could not fetch forecast data")
+        if not len(forecast.series):
+            raise HTTPError(503, "No forecast hours available for this location")
+        series = forecast.series
+        return {
+            'summary': forecast.summary(),
+            'hourly': {
+                'time': series.time.tolist(),
+                'temperature': series.temperature.round(1).tolist(),
+                'humidity': series.humidity.tolist(),
+                'wind_speed': series.wind_speed.round(1).tolist(),
+                'precipitation': series.precipitation.round(1).tolist(),
+                'disease_risk': forecast.hourly_metrics['disease_risk'].tolist()
+            }
+        }
+
+
+class InferenceServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with a bounded number of in-flight requests
+    Requests beyond max_concurrent wait up to queue_timeout seconds for a
+    slot and are then rejected with 503 + Retry-After (backpressure)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, registry=None, max_concurrent=8, queue_timeout=5.0, quiet=False):
+        super().__init__(address, InferenceRequestHandler)
+        self.registry = registry or get_registry()
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.queue_timeout = queue_timeout
+        self.quiet = quiet
+
+
+def serve(host='127.0.0.1', port=8000, max_concurrent=8, queue_timeout=5.0, warm_up=True):
+    """Start the service and block until interrupted"""
+    server = InferenceServer((host, port), max_concurrent=max_concurrent, queue_timeout=queue_timeout)
+    if warm_up:
+        start = time.perf_counter()
+        server.registry.warm_up()
+        print(f"Services warmed up in {time.perf_counter() - start:.1f}s")
+
+    print(f"Serving on http://{host}:{port} (max {max_concurrent} concurrent requests)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
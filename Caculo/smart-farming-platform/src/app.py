@@ -8,9 +8,9 @@ import json
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from predict import CropDiseasePredictor
-from weather_service import WeatherService
-from treatment_advisor import TreatmentAdvisor
+from farming_rules import get_farming_rules
+from image_pipeline import InvalidImageError, open_image
+from service_registry import get_registry
 
 # Page configuration
 st.set_page_config(
@@ -60,19 +60,28 @@ def main():
     page = st.sidebar.selectbox("Choose a feature:", 
                                ["Disease Detection", "Weather Insights", "About Platform"])
     
-    # Initialize services
-    predictor = CropDiseasePredictor()
-    weather_service = WeatherService()
-    treatment_advisor = TreatmentAdvisor()
-    
+    # Shared services are built once per process, not on every rerun. The
+    # predictor (and TensorFlow) loads on the first analysis, so the Weather
+    # and About pages never pay for it
+    registry = get_registry()
+    registry.warm_up(['weather_service', 'treatment_advisor'])
+    weather_service = registry.get('weather_service')
+    treatment_advisor = registry.get('treatment_advisor')
+
+    with st.sidebar.expander("⚙️ Service Metrics"):
+        for name, metrics in registry.get_metrics().items():
+            load_time = metrics['last_load_seconds'] or 0.0
+            st.write(f"**{name}**: loaded in {load_time:.2f}s, "
+                     f"{metrics['hits']} hits, {metrics['reloads']} reloads")
+
     if page == "Disease Detection":
-        disease_detection_page(predictor, treatment_advisor)
+        disease_detection_page(registry, treatment_advisor)
     elif page == "Weather Insights":
         weather_insights_page(weather_service)
     else:
         about_page()
 
-def disease_detection_page(predictor, treatment_advisor):
+def disease_detection_page(registry, treatment_advisor):
     st.header("🔍 Crop Disease Detection & Treatment")
     
     col1, col2 = st.columns([1, 1])
@@ -86,19 +95,27 @@ def disease_detection_page(predictor, treatment_advisor):
         )
         
         if uploaded_file is not None:
-            # Display uploaded image
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded Crop Image", use_column_width=True)
+            # Display uploaded image (the browser decodes the original file)
+            st.image(uploaded_file, caption="Uploaded Crop Image", use_column_width=True)
             
             # Analyze button
             if st.button("🔬 Analyze Crop Health", type="primary"):
                 with st.spinner("AI is analyzing your crop..."):
-                    # Get prediction using proper CNN model
-                    disease_name, confidence = predictor.predict(image)
+                    # Reduced-resolution decode, validated in the same pass
+                    uploaded_file.seek(0)
+                    try:
+                        image = open_image(uploaded_file)
+                    except InvalidImageError as e:
+                        st.error(f"❌ **Invalid Image**: {e}")
+                        return
+                    
+                    # One forward pass gives the label and the full distribution
+                    result = registry.get('predictor').analyze(image)
                     
                     # Display results in the second column
                     with col2:
-                        display_analysis_results(disease_name, confidence, treatment_advisor)
+                        display_analysis_results(result.label, result.confidence, treatment_advisor,
+                                                 result.distribution)
     
     with col2:
         if uploaded_file is None:
@@ -110,7 +127,7 @@ def disease_detection_page(predictor, treatment_advisor):
             for disease in diseases:
                 st.write(f"• {disease}")
 
-def display_analysis_results(disease_name, confidence, treatment_advisor):
+def display_analysis_results(disease_name, confidence, treatment_advisor, all_predictions=None):
     st.subheader("📊 Analysis Results")
     
     # Disease prediction with confidence check
@@ -129,6 +146,11 @@ def display_analysis_results(disease_name, confidence, treatment_advisor):
         st.warning(f"⚠️ **Detected Issue**: {disease_name}")
         st.metric("Confidence", f"{confidence:.1f}%")
     
+    if all_predictions:
+        with st.expander("📈 All Class Probabilities"):
+            for class_name, probability in sorted(all_predictions.items(), key=lambda x: x[1], reverse=True):
+                st.write(f"{class_name}: {probability:.1f}%")
+    
     # Get treatment recommendations
     treatments = treatment_advisor.get_recommendations(disease_name)
     
@@ -223,104 +245,10 @@ def display_weather_insights(weather_data, col):
     st.session_state['weather_displayed'] = True
 
 def generate_farming_advice(weather_data):
-    """FIXED: Generate scientifically accurate farming advice"""
-    advice = []
-    temp = weather_data['temperature']
-    humidity = weather_data['humidity']
-    description = weather_data['description'].lower()
-    wind_speed = weather_data.get('wind_speed', 0)
-    
-    print(f"DEBUG: Generating advice for - Temp: {temp}°C, Humidity: {humidity}%, Wind: {wind_speed} m/s")
-    
-    # FIXED: Scientifically accurate temperature thresholds
-    if temp > 35:  # Extreme heat stress
-        advice.append({
-            'type': 'critical',
-            'advice': f'EXTREME HEAT ({temp:.1f}°C)! Crops under severe stress. Provide shade, increase irrigation 3x.'
-        })
-    elif temp > 32:  # High heat stress starts at 32°C
-        advice.append({
-            'type': 'warning',
-            'advice': f'HIGH HEAT ({temp:.1f}°C). Crops stressed. Water early morning/evening, provide shade.'
-        })
-    elif temp > 28:  # Moderate stress
-        advice.append({
-            'type': 'warning',
-            'advice': f'Warm temperature ({temp:.1f}°C). Monitor for heat stress, ensure adequate water.'
-        })
-    elif temp < 5:  # Frost damage
-        advice.append({
-            'type': 'critical',
-            'advice': f'FROST RISK ({temp:.1f}°C)! Cover crops, use frost protection, harvest immediately.'
-        })
-    elif temp < 10:  # Cold stress
-        advice.append({
-            'type': 'warning',
-            'advice': f'COLD STRESS ({temp:.1f}°C). Protect tender plants, delay planting, use row covers.'
-        })
-    elif 18 <= temp <= 28:  # Optimal range
-        advice.append({
-            'type': 'positive',
-            'advice': f'OPTIMAL temperature ({temp:.1f}°C) for most crops. Perfect growing conditions.'
-        })
-    else:
-        advice.append({
-            'type': 'info',
-            'advice': f'Moderate temperature ({temp:.1f}°C). Suitable for most farming activities.'
-        })
-    
-    # FIXED: Humidity thresholds for disease management
-    if humidity > 85:  # Very high disease risk
-        advice.append({
-            'type': 'critical',
-            'advice': f'VERY HIGH humidity ({humidity}%). CRITICAL disease risk! Improve ventilation, reduce watering.'
-        })
-    elif humidity > 75:  # High disease risk
-        advice.append({
-            'type': 'warning',
-            'advice': f'High humidity ({humidity}%). HIGH fungal disease risk. Ensure air circulation.'
-        })
-    elif humidity < 30:  # Too dry
-        advice.append({
-            'type': 'warning',
-            'advice': f'Very low humidity ({humidity}%). Plants may wilt. Increase irrigation, consider misting.'
-        })
-    elif 50 <= humidity <= 70:  # Optimal range
-        advice.append({
-            'type': 'positive',
-            'advice': f'Good humidity level ({humidity}%) for healthy plant growth.'
-        })
-    
-    # FIXED: Weather-specific advice
-    if 'rain' in description or 'drizzle' in description:
-        advice.append({
-            'type': 'info',
-            'advice': 'RAIN detected. STOP irrigation, check drainage, harvest ripe crops before damage.'
-        })
-    elif 'storm' in description or 'thunder' in description:
-        advice.append({
-            'type': 'critical',
-            'advice': 'STORM WARNING! Secure equipment, harvest what you can, avoid fieldwork.'
-        })
-    
-    # FIXED: Wind-based spraying advice
-    if wind_speed > 12:  # Too windy for spraying
-        advice.append({
-            'type': 'critical',
-            'advice': f'STRONG WINDS ({wind_speed:.1f} m/s). DO NOT SPRAY - drift risk. Secure plants.'
-        })
-    elif wind_speed > 8:  # Moderate wind
-        advice.append({
-            'type': 'warning',
-            'advice': f'Moderate winds ({wind_speed:.1f} m/s). Avoid spraying, check plant support.'
-        })
-    elif wind_speed < 3 and humidity < 75:  # Ideal spraying
-        advice.append({
-            'type': 'positive',
-            'advice': f'PERFECT spraying conditions. Low wind ({wind_speed:.1f} m/s), good humidity.'
-        })
+    """Dashboard farming advice (the 'dashboard' rules in data/farming_rules.json)"""
+    print(f"DEBUG: Generating advice for - Temp: {weather_data['temperature']}°C, Humidity: {weather_data['humidity']}%, Wind: {weather_data.get('wind_speed', 0)} m/s")
     
-    return advice
+    return get_farming_rules().advice(weather_data, 'dashboard')
 
 def about_page():
     st.header("🌍 About Smart Farming Platform")
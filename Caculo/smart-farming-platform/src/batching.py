@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class BatcherClosedError(RuntimeError):
+    """Raised for items submitted to, or left queued in, a closed MicroBatcher"""
+
+
+class MicroBatcher:
+    """
+    Background micro-batcher for inference requests
+    Callers submit single items and get a Future back; a worker thread
+    groups queued items into batches of up to max_batch_size, waiting at
+    most max_delay_ms after the first item, and runs batch_fn once per
+    batch. batch_fn receives a list of items and must return one result
+    per item, in order.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_delay_ms=10.0, name="micro-batcher"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max(0.0, max_delay_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        # Guards _closed with the put, so nothing is queued after _STOP
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {'batches': 0, 'items': 0, 'largest_batch': 0, 'errors': 0}
+
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue one item for the next batch and return its Future"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise BatcherClosedError("MicroBatcher is closed")
+            self._queue.put((item, future))
+        return future
+
+    def close(self, timeout=None):
+        """Stop the worker after the already queued items are processed"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def get_stats(self):
+        """Batch counters, including the average batch size"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['average_batch'] = stats['items'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+    def _collect(self, first):
+        """Gather items after `first` until the batch is full or the deadline passes"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        stop = False
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    # Deadline passed: still take whatever is already waiting
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                stop = True
+                break
+            batch.append(entry)
+
+        return batch, stop
+
+    def _worker(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            self._run(batch)
+        self._fail_pending()
+
+    def _fail_pending(self):
+        """Complete anything still queued after _STOP, so no caller waits forever"""
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not _STOP:
+                entry[1].set_exception(BatcherClosedError("MicroBatcher closed before the item ran"))
+
+    def _run(self, batch):
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            with self._stats_lock:
+                self._stats['errors'] += 1
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['items'] += len(items)
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(items))
@@ -1,7 +1,10 @@
 import numpy as np
 import random
 from PIL import Image
-import tensorflow as tf
+import time
+
+from predict import PredictionResult
+from visual_analysis import DEMO_CLASSES, demo_distributions, image_to_array
 
 class CropDiseaseDetector:
     """
@@ -10,23 +13,25 @@ class CropDiseaseDetector:
     """
     
     def __init__(self):
-        self.diseases = [
-            "Healthy",
-            "Leaf Blight", 
-            "Powdery Mildew",
-            "Rust Disease",
-            "Bacterial Spot",
-            "Mosaic Virus"
-        ]
+        self.diseases = list(DEMO_CLASSES)
         
-        # Initialize dummy model (in production, load trained CNN model)
-        self.model = self._create_dummy_model()
+        # Dummy model is built on first use (in production, load trained CNN model)
+        self._model = None
+
+    @property
+    def model(self):
+        """Dummy CNN, built on first access so importing TensorFlow is deferred"""
+        if self._model is None:
+            self._model = self._create_dummy_model()
+        return self._model
         
     def _create_dummy_model(self):
         """
         Create a dummy CNN model for demonstration
         In production, replace with trained model loading
         """
+        import tensorflow as tf
+
         model = tf.keras.Sequential([
             tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(224, 224, 3)),
             tf.keras.layers.MaxPooling2D(2, 2),
@@ -34,7 +39,8 @@ class CropDiseaseDetector:
             tf.keras.layers.MaxPooling2D(2, 2),
             tf.keras.layers.Conv2D(128, (3, 3), activation='relu'),
             tf.keras.layers.MaxPooling2D(2, 2),
-            tf.keras.layers.Flatten(),
+            # Pooled per channel: a Flatten head here held ~44M weights
+            tf.keras.layers.GlobalAveragePooling2D(),
             tf.keras.layers.Dense(512, activation='relu'),
             tf.keras.layers.Dropout(0.5),
             tf.keras.layers.Dense(len(self.diseases), activation='softmax')
@@ -67,32 +73,42 @@ class CropDiseaseDetector:
         
         return image_array
     
+    def analyze(self, image):
+        """
+        Analyze uploaded image once
+        Returns PredictionResult with label, confidence and full distribution
+        """
+        start = time.perf_counter()
+
+        # For demo purposes, generate realistic predictions
+        # In production, use: predictions = self.model.predict(self.preprocess_image(image))
+        predictions = self._generate_demo_prediction(image)
+
+        # Get predicted class and confidence
+        predicted_class = int(np.argmax(predictions[0]))
+        confidence = float(predictions[0][predicted_class]) * 100
+
+        return PredictionResult(
+            self.diseases[predicted_class],
+            confidence,
+            predictions[0],
+            self.diseases,
+            source='demo',
+            timings={'total_ms': (time.perf_counter() - start) * 1000}
+        )
+
     def predict_disease(self, image):
         """
         Predict crop disease from uploaded image
         Returns disease name and confidence score
         """
         try:
-            # Preprocess image
-            processed_image = self.preprocess_image(image)
-            
-            # For demo purposes, generate realistic predictions
-            # In production, use: predictions = self.model.predict(processed_image)
-            predictions = self._generate_demo_prediction(image)
-            
-            # Get predicted class and confidence
-            predicted_class = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_class]) * 100
-            
-            disease_name = self.diseases[predicted_class]
+            result = self.analyze(image)
             
             return {
-                'disease': disease_name,
-                'confidence': confidence,
-                'all_predictions': {
-                    disease: float(prob) * 100 
-                    for disease, prob in zip(self.diseases, predictions[0])
-                }
+                'disease': result.label,
+                'confidence': result.confidence,
+                'all_predictions': result.distribution
             }
             
         except Exception as e:
@@ -106,39 +122,7 @@ class CropDiseaseDetector:
         """
         Analyze image features to predict disease accurately
         """
-        image_array = np.array(image.resize((224, 224)))
-        
-        if len(image_array.shape) == 3:
-            # Color analysis
-            red = np.mean(image_array[:, :, 0])
-            green = np.mean(image_array[:, :, 1])
-            blue = np.mean(image_array[:, :, 2])
-            
-            brightness = np.mean(image_array)
-            contrast = np.std(image_array)
-            
-            # Disease detection based on visual symptoms
-            if green > 140 and brightness > 120:
-                # Healthy: bright green
-                return np.array([[0.90, 0.03, 0.02, 0.02, 0.02, 0.01]])
-            elif red > 120 and green < 100:
-                # Rust Disease: reddish-brown spots
-                return np.array([[0.05, 0.10, 0.05, 0.70, 0.08, 0.02]])
-            elif brightness > 150 and contrast > 60:
-                # Powdery Mildew: white powdery patches
-                return np.array([[0.08, 0.05, 0.75, 0.05, 0.05, 0.02]])
-            elif green < 90 and brightness < 100:
-                # Leaf Blight: dark brown/black spots
-                return np.array([[0.05, 0.80, 0.05, 0.05, 0.03, 0.02]])
-            elif red > 100 and contrast > 50:
-                # Bacterial Spot: dark spots with yellow halos
-                return np.array([[0.05, 0.08, 0.05, 0.10, 0.70, 0.02]])
-            elif contrast > 70:
-                # Mosaic Virus: mottled yellow-green pattern
-                return np.array([[0.05, 0.05, 0.05, 0.05, 0.05, 0.75]])
-        
-        # Default moderate disease
-        return np.array([[0.20, 0.25, 0.20, 0.15, 0.15, 0.05]])
+        return demo_distributions(image_to_array(image)[np.newaxis])
     
     def get_disease_info(self, disease_name):
         """
@@ -0,0 +1,52 @@
+"""
+Vectorized farming metrics
+Applies the heat stress, irrigation, disease risk and spraying rules from
+data/farming_rules.json (the same compiled rules WeatherService uses for a
+single observation) to whole columns of observations at once: historical
+backfills, portfolio tables, hourly forecasts. Results are pandas
+categoricals, so millions of rows cost one byte per label.
+"""
+
+import numpy as np
+import pandas as pd
+
+from farming_rules import get_farming_rules
+
+METRIC_COLUMNS = ['heat_stress', 'irrigation_need', 'disease_risk', 'optimal_for_spraying']
+
+
+def calculate_farming_metrics(temperature, humidity, wind_speed=0.0, description='', index=None, rules=None):
+    """
+    Farming metrics for column arrays of observations
+    Scalars broadcast (e.g. one description for every row). Returns a
+    DataFrame with categorical heat_stress, irrigation_need and disease_risk
+    columns and a boolean optimal_for_spraying column.
+    """
+    rules = rules or get_farming_rules()
+    codes = rules.metric_codes(temperature, humidity, wind_speed, description)
+
+    columns = {}
+    for name in METRIC_COLUMNS:
+        levels = rules.levels(name)
+        if name == 'optimal_for_spraying':
+            columns[name] = np.asarray(levels, dtype=bool)[codes[name].ravel()]
+        else:
+            columns[name] = pd.Categorical.from_codes(codes[name].ravel(), levels)
+    return pd.DataFrame(columns, index=index)
+
+
+def add_farming_metrics(frame, temperature='temperature', humidity='humidity',
+                        wind_speed='wind_speed', description='description'):
+    """
+    Return a copy of an observations DataFrame with the metric columns added
+    Missing wind speed or description columns are treated as calm and dry,
+    matching the scalar defaults
+    """
+    metrics = calculate_farming_metrics(
+        frame[temperature].to_numpy(),
+        frame[humidity].to_numpy(),
+        frame[wind_speed].to_numpy() if wind_speed in frame else 0.0,
+        frame[description] if description in frame else '',
+        index=frame.index
+    )
+    return frame.drop(columns=METRIC_COLUMNS, errors='ignore').join(metrics)
@@ -0,0 +1,489 @@
+"""
+Declarative farming rules
+Heat stress, irrigation, disease risk and spraying metrics, and the advice
+shown on the dashboard and returned by the API, are ordered rule lists in
+data/farming_rules.json. As in the if/elif chains they replace, the first
+matching rule of a ladder wins. Rules are compiled once into lookup tables:
+
+- the thresholds a numeric field is compared against split its axis into
+  intervals, with each threshold as its own point interval, so any reading
+  maps to an interval with one bisect
+- description keywords are compiled into one regex per keyword set
+- each ladder becomes a table over the intervals and keyword flags it
+  depends on, filled by running its rules once per cell
+- for single observations, every cell is also mapped to its ready-made
+  metrics dict and advice entries (there are only a few hundred distinct
+  combinations)
+
+One observation then costs a memoized bisect per field and two list reads,
+about as much as the old ladders; a column of observations costs one
+searchsorted and one fancy index per ladder.
+
+Rule format: {"when": {field: test, ...}, "any": [{field: test}, ...], "then": output}
+    numeric fields (temperature, humidity, wind_speed): {">": 15, "<": 30}
+    description: {"contains": ["rain", "drizzle"]} or {"excludes": ["rain"]}
+    an earlier metric: {"disease_risk": "High"}
+"""
+
+import bisect
+import json
+import operator
+import os
+import re
+import string
+import threading
+
+import numpy as np
+
+from service_registry import file_stat_key
+
+FARMING_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'data', 'farming_rules.json')
+
+NUMERIC_FIELDS = ('temperature', 'humidity', 'wind_speed')
+# Fields an observation may omit (same defaults as the old ladders)
+FIELD_DEFAULTS = {'wind_speed': 0, 'description': ''}
+
+# Distinct description strings whose keyword flags are remembered
+MAX_MEMO_DESCRIPTIONS = 4096
+# Distinct readings per numeric field whose interval is remembered
+MAX_MEMO_VALUES = 4096
+
+_OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le, '==': operator.eq}
+
+
+class RuleError(ValueError):
+    """The rule file is malformed"""
+
+
+class _Ladder:
+    """One ordered rule list: outputs[i] is rule i's result, outputs[-1] the default"""
+
+    def __init__(self, name, spec, metrics, is_metric):
+        self.name = name
+        self.levels = spec.get('levels') if is_metric else None
+        self.rules = []
+        self.outputs = []
+        self.numeric_fields = set()
+        self.keyword_sets = set()
+        self.metric_refs = set()
+
+        if not isinstance(spec.get('rules'), list):
+            raise RuleError(f"{name}: 'rules' must be a list")
+        for position, rule in enumerate(spec['rules']):
+            where = f"{name} rule {position + 1}"
+            if 'then' not in rule:
+                raise RuleError(f"{where}: missing 'then'")
+            clauses = self._parse(rule.get('when', {}), where, metrics)
+            groups = [self._parse(group, where, metrics) for group in rule.get('any', [])]
+            self.rules.append((clauses, groups))
+            self.outputs.append(rule['then'])
+        self.outputs.append(spec.get('default'))
+
+        if is_metric:
+            if not isinstance(self.levels, list) or not self.levels:
+                raise RuleError(f"{name}: metrics need a non-empty 'levels' list")
+            if self.outputs[-1] is None:
+                raise RuleError(f"{name}: metrics need a default")
+            unknown = [output for output in self.outputs if output not in self.levels]
+            if unknown:
+                raise RuleError(f"{name}: {unknown[0]!r} is not one of {self.levels}")
+        else:
+            for output in self.outputs:
+                _check_templates(name, output)
+            self.outputs = [None if output is None else {key: str(text) for key, text in output.items()}
+                            for output in self.outputs]
+            # Per output, the text fields with {field} placeholders to fill in
+            self.templated = [() if output is None else tuple(key for key, text in output.items() if '{' in text)
+                              for output in self.outputs]
+
+    def _parse(self, when, where, metrics):
+        """Flatten a {field: test} mapping into (kind, ...) clauses that must all hold"""
+        if not isinstance(when, dict):
+            raise RuleError(f"{where}: conditions must be an object")
+        clauses = []
+        for field, test in when.items():
+            if field in NUMERIC_FIELDS:
+                if not isinstance(test, dict) or not test:
+                    raise RuleError(f"{where}: {field} needs comparisons such as {{\">\": 30}}")
+                for op, threshold in test.items():
+                    if op not in _OPERATORS:
+                        raise RuleError(f"{where}: unknown operator {op!r} for {field}")
+                    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+                        raise RuleError(f"{where}: {field} {op} needs a number")
+                    clauses.append(('number', field, op, threshold))
+                self.numeric_fields.add(field)
+            elif field == 'description':
+                if not isinstance(test, dict):
+                    raise RuleError(f"{where}: description needs {{\"contains\": [...]}} or {{\"excludes\": [...]}}")
+                for mode, keywords in test.items():
+                    if mode not in ('contains', 'excludes') or not keywords:
+                        raise RuleError(f"{where}: description needs 'contains' or 'excludes' keywords")
+                    keywords = tuple(sorted({keyword.lower() for keyword in keywords}))
+                    clauses.append(('keywords', keywords, mode == 'contains'))
+                    self.keyword_sets.add(keywords)
+            elif field in metrics:
+                clauses.append(('metric', field, test))
+                self.metric_refs.add(field)
+            else:
+                raise RuleError(f"{where}: unknown field {field!r} (metrics can only use metrics defined above them)")
+        return clauses
+
+
+def _check_templates(name, output):
+    """Advice templates may only reference the numeric fields"""
+    if output is None:
+        return
+    if not isinstance(output, dict):
+        raise RuleError(f"{name}: advice must be an object of text fields")
+    for text in output.values():
+        for _, field, _, _ in string.Formatter().parse(str(text)):
+            if field is not None and field not in NUMERIC_FIELDS:
+                raise RuleError(f"{name}: unknown placeholder {{{field}}} in {text!r}")
+
+
+def _split_template(text):
+    """
+    (prefix, field, format_spec, suffix) for a text with one plain {field}
+    placeholder, so it is filled without reparsing; any other text as is
+    """
+    parts = list(string.Formatter().parse(text))
+    if len(parts) == 1:
+        suffix = ''
+    elif len(parts) == 2 and parts[1][1] is None:
+        suffix = parts[1][0]
+    else:
+        return text
+    prefix, field, spec, conversion = parts[0]
+    if field not in NUMERIC_FIELDS or conversion is not None or '{' in spec:
+        return text
+    return prefix, field, spec, suffix
+
+
+def _bins(thresholds, values):
+    """
+    Interval index per value: 2i below thresholds[i], 2i+1 exactly on it,
+    the last bin for NaN (FarmingRules._cell_index does the same for one value)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    edges = np.asarray(thresholds, dtype=np.float64)
+    index = np.searchsorted(edges, values, side='left')
+    on_edge = (index < len(edges)) & (edges[np.minimum(index, len(edges) - 1)] == values)
+    bins = 2 * index + on_edge
+    bins[np.isnan(values)] = 2 * len(edges) + 1
+    return bins
+
+
+def _representatives(thresholds):
+    """One value inside every interval of _bins, in bin order"""
+    values = []
+    for i, threshold in enumerate(thresholds):
+        values.append(threshold - 1 if i == 0 else (thresholds[i - 1] + threshold) / 2)
+        values.append(threshold)
+    values.append(thresholds[-1] + 1 if thresholds else 0.0)
+    values.append(float('nan'))
+    return values
+
+
+class FarmingRules:
+    """
+    A compiled rule file
+    - metrics(observation) / advice(observation, ruleset) for one weather dict
+    - metric_codes(...) / advice_codes(...) for columns of observations
+    """
+
+    def __init__(self, spec, source=None):
+        if not isinstance(spec, dict) or not isinstance(spec.get('metrics'), dict):
+            raise RuleError("rule file needs a 'metrics' object")
+        self.source = source
+        self.version = spec.get('version')
+
+        self._metrics = {}
+        for name, ladder_spec in spec['metrics'].items():
+            self._metrics[name] = _Ladder(name, ladder_spec, dict(self._metrics), is_metric=True)
+        self._rulesets = {}
+        for ruleset, ladders in spec.get('advice', {}).items():
+            self._rulesets[ruleset] = [
+                _Ladder(f"{ruleset}/{ladder_spec.get('name', i)}", ladder_spec, self._metrics, is_metric=False)
+                for i, ladder_spec in enumerate(ladders)
+            ]
+
+        ladders = list(self._metrics.values()) + [l for ls in self._rulesets.values() for l in ls]
+        self._thresholds = {}
+        for field in NUMERIC_FIELDS:
+            thresholds = {clause[3] for ladder in ladders for clauses in _all_clauses(ladder)
+                          for clause in clauses if clause[0] == 'number' and clause[1] == field}
+            if thresholds:
+                self._thresholds[field] = sorted(thresholds)
+        keyword_sets = sorted({keywords for ladder in ladders for keywords in ladder.keyword_sets})
+        self._keywords = {keywords: re.compile('|'.join(map(re.escape, keywords))) for keywords in keyword_sets}
+
+        for ladder in ladders:
+            self._compile(ladder)
+        self._cell_dims = list(self._thresholds) + list(self._keywords)
+        # Single observations use one integer per cell: fields in _cell_dims
+        # order, row-major over the interval counts of _bins and the flags
+        self._cell_sizes = [2 * len(thresholds) + 2 for thresholds in self._thresholds.values()] + \
+            [2] * len(self._keywords)
+        strides = []
+        cells = 1
+        for size in reversed(self._cell_sizes):
+            strides.insert(0, cells)
+            cells *= size
+        self._scalar_fields = tuple(
+            (field, FIELD_DEFAULTS.get(field), {}, tuple(thresholds), stride, (2 * len(thresholds) + 1) * stride)
+            for (field, thresholds), stride in zip(self._thresholds.items(), strides))
+        self._keyword_strides = tuple(zip(self._keywords.values(), strides[len(self._thresholds):]))
+        self._description_offsets = {}
+        # Per cell, an index into the distinct metric results and advice of each ruleset
+        cell_bins = dict(zip(self._cell_dims, np.indices(self._cell_sizes).reshape(len(self._cell_sizes), cells)))
+        self._scalar_metrics = self._combinations(list(self._metrics.values()), cell_bins, cells, self._metric_result)
+        self._scalar_advice = {ruleset: self._combinations(ladders, cell_bins, cells, self._advice_result)
+                               for ruleset, ladders in self._rulesets.items()}
+
+    @classmethod
+    def from_file(cls, path=FARMING_RULES_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), source=path)
+
+    # Compilation
+
+    def _dimensions(self, ladder):
+        """Fields and keyword sets a ladder depends on, including via referenced metrics"""
+        fields, keyword_sets = set(ladder.numeric_fields), set(ladder.keyword_sets)
+        for name in ladder.metric_refs:
+            ref_fields, ref_keywords = self._dimensions(self._metrics[name])
+            fields.update(ref_fields)
+            keyword_sets.update(ref_keywords)
+        return fields, keyword_sets
+
+    def _compile(self, ladder):
+        fields, keyword_sets = self._dimensions(ladder)
+        dims = [field for field in NUMERIC_FIELDS if field in fields] + sorted(keyword_sets)
+        axes = [_representatives(self._thresholds[dim]) if dim in self._thresholds else [False, True]
+                for dim in dims]
+        shape = tuple(len(axis) for axis in axes)
+
+        table = np.empty(shape, dtype=np.int16)
+        for cell in np.ndindex(shape):
+            values = {dim: axis[i] for dim, axis, i in zip(dims, axes, cell)}
+            table[cell] = self._match(ladder, values)
+
+        ladder.dims = dims
+        ladder.strides = [stride // table.itemsize for stride in table.strides]
+        ladder.table = table.ravel()
+        # Outputs as codes: level index for metrics, -1 for "no advice" in advice ladders
+        if ladder.levels is not None:
+            codes = [ladder.levels.index(output) for output in ladder.outputs]
+        else:
+            codes = [-1 if output is None else i for i, output in enumerate(ladder.outputs)]
+        ladder.codes = np.array(codes, dtype=np.int16)
+
+    def _combinations(self, ladders, cell_bins, cells, result):
+        """
+        (list of a combination index per cell, list of results): the ladders'
+        rule indices are worked out for every cell at once, and each distinct
+        combination of them becomes one result
+        """
+        if not ladders:
+            return [0] * cells, [result(ladders, ())]
+        # Rule indices packed into one integer per cell, mixed radix by ladder length
+        packed = np.zeros(cells, dtype=np.int64)
+        for ladder in ladders:
+            index = sum((cell_bins[dim] * stride for dim, stride in zip(ladder.dims, ladder.strides)),
+                        np.zeros(cells, dtype=np.int64))
+            packed = packed * len(ladder.outputs) + ladder.table[index]
+        combinations, inverse = np.unique(packed, return_inverse=True)
+        results = []
+        for combination in combinations.tolist():
+            indices = []
+            for ladder in reversed(ladders):
+                combination, i = divmod(combination, len(ladder.outputs))
+                indices.append(i)
+            results.append(result(ladders, indices[::-1]))
+        return inverse.reshape(-1).tolist(), results
+
+    @staticmethod
+    def _metric_result(ladders, indices):
+        return {ladder.name: ladder.outputs[i] for ladder, i in zip(ladders, indices)}
+
+    @staticmethod
+    def _advice_result(ladders, indices):
+        """Entries to copy, then (entry position, key, template) to fill in"""
+        outputs, templates = [], []
+        for ladder, i in zip(ladders, indices):
+            if ladder.outputs[i] is not None:
+                templates += [(len(outputs), key, _split_template(ladder.outputs[i][key])) for key in ladder.templated[i]]
+                outputs.append(ladder.outputs[i])
+        return tuple(outputs), tuple(templates)
+
+    def _match(self, ladder, values):
+        """Reference interpreter: index of the first matching rule, or of the default"""
+        for index, (clauses, groups) in enumerate(ladder.rules):
+            if all(self._holds(clause, values) for clause in clauses) and (
+                    not groups or any(all(self._holds(clause, values) for clause in group) for group in groups)):
+                return index
+        return len(ladder.rules)
+
+    def _holds(self, clause, values):
+        kind = clause[0]
+        if kind == 'number':
+            _, field, op, threshold = clause
+            return _OPERATORS[op](values[field], threshold)
+        if kind == 'keywords':
+            return values[clause[1]] == clause[2]
+        metric = self._metrics[clause[1]]
+        return metric.outputs[self._match(metric, values)] == clause[2]
+
+    # Single observation
+
+    def _cell_index(self, observation):
+        """The observation's cell: interval index per numeric field (as _bins), then keyword flags"""
+        index = 0
+        for field, default, offsets, thresholds, stride, nan_offset in self._scalar_fields:
+            value = observation[field] if default is None else observation.get(field, default)
+            offset = offsets.get(value)
+            if offset is None:
+                if value is None or value != value:
+                    offset = nan_offset
+                else:
+                    # 2i between thresholds i-1 and i, 2i+1 exactly on threshold i
+                    offset = (bisect.bisect_left(thresholds, value) + bisect.bisect_right(thresholds, value)) * stride
+                # Readings repeat (one decimal, integer humidity); cap the memo anyway
+                if len(offsets) < MAX_MEMO_VALUES:
+                    offsets[value] = offset
+            index += offset
+
+        description = observation.get('description', FIELD_DEFAULTS['description'])
+        offset = self._description_offsets.get(description)
+        if offset is None:
+            lowered = description.lower()
+            offset = sum(stride for pattern, stride in self._keyword_strides if pattern.search(lowered))
+            # Weather descriptions come from a small vocabulary; cap the memo anyway
+            if len(self._description_offsets) < MAX_MEMO_DESCRIPTIONS:
+                self._description_offsets[description] = offset
+        return index + offset
+
+    def metrics(self, observation):
+        """Metric name -> level for one weather dict"""
+        cells, results = self._scalar_metrics
+        return results[cells[self._cell_index(observation)]].copy()
+
+    def advice(self, observation, ruleset):
+        """Advice entries for one weather dict, with the observation's values filled in"""
+        cells, results = self._scalar_advice[ruleset]
+        outputs, templates = results[cells[self._cell_index(observation)]]
+        entries = [output.copy() for output in outputs]
+        for position, key, template in templates:
+            if isinstance(template, tuple):
+                prefix, field, spec, suffix = template
+                text = prefix + format(observation.get(field, FIELD_DEFAULTS.get(field)), spec) + suffix
+            else:
+                text = template.format_map({field: observation.get(field, FIELD_DEFAULTS.get(field))
+                                            for field in NUMERIC_FIELDS})
+            entries[position][key] = text
+        return entries
+
+    # Columns of observations
+
+    def _cells(self, temperature, humidity, wind_speed, description):
+        numeric = [np.asarray(value, dtype=np.float64) for value in (temperature, humidity, wind_speed)]
+        if not isinstance(description, str):
+            description = np.asarray(description, dtype=object)
+        # Any of the four may be the column that sets the shape, descriptions included
+        shape = np.broadcast_shapes(*(value.shape for value in numeric), np.shape(description))
+        columns = {field: np.broadcast_to(value, shape) for field, value in zip(NUMERIC_FIELDS, numeric)}
+        cells = {field: _bins(thresholds, columns[field]) for field, thresholds in self._thresholds.items()}
+
+        if isinstance(description, str):
+            lowered = description.lower()
+            for keywords, pattern in self._keywords.items():
+                cells[keywords] = np.full(shape, pattern.search(lowered) is not None)
+        else:
+            import pandas as pd
+            missing = pd.isna(description)
+            if missing.any():
+                # A missing description is dry, like the scalar default; this also
+                # keeps factorize from giving NaN the -1 sentinel on any pandas version
+                description = np.where(missing, '', description)
+            # Descriptions repeat heavily, so each distinct string is matched once
+            codes, uniques = pd.factorize(description.ravel())
+            codes = codes.reshape(description.shape)
+            for keywords, pattern in self._keywords.items():
+                flags = np.array([pattern.search(str(value).lower()) is not None for value in uniques], dtype=bool)
+                cells[keywords] = np.broadcast_to(flags[codes], shape)
+        return cells, shape
+
+    @staticmethod
+    def _lookup_many(ladder, cells, shape):
+        index = np.zeros(shape, dtype=np.int64)
+        for dim, stride in zip(ladder.dims, ladder.strides):
+            index += cells[dim] * stride
+        return ladder.codes[ladder.table[index]]
+
+    def metric_codes(self, temperature, humidity, wind_speed=0.0, description=''):
+        """Metric name -> int8 codes into levels(name), for broadcastable columns"""
+        cells, shape = self._cells(temperature, humidity, wind_speed, description)
+        return {name: self._lookup_many(ladder, cells, shape).astype(np.int8)
+                for name, ladder in self._metrics.items()}
+
+    def advice_codes(self, ruleset, temperature, humidity, wind_speed=0.0, description=''):
+        """(ladders, rows) array of rule indices into each advice ladder, -1 where it gives no advice"""
+        cells, shape = self._cells(temperature, humidity, wind_speed, description)
+        return np.stack([self._lookup_many(ladder, cells, shape) for ladder in self._rulesets[ruleset]])
+
+    def advice_entry(self, ruleset, ladder_index, code, **values):
+        """Formatted advice for a code returned by advice_codes (None for -1)"""
+        if code < 0:
+            return None
+        output = self._rulesets[ruleset][ladder_index].outputs[code]
+        return {key: str(text).format(**values) for key, text in output.items()}
+
+    # Introspection
+
+    def levels(self, metric):
+        return list(self._metrics[metric].levels)
+
+    def metric_names(self):
+        return list(self._metrics)
+
+    def rulesets(self):
+        return list(self._rulesets)
+
+
+def _all_clauses(ladder):
+    for clauses, groups in ladder.rules:
+        yield clauses
+        yield from groups
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def get_farming_rules(path=FARMING_RULES_PATH):
+    """
+    Compiled rules for a file, recompiled when the file changes on disk
+    An edit that fails to parse or validate is reported and the last good
+    rules stay in use, so a typo never takes the dashboard down
+    """
+    stat_key = file_stat_key(path)
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+        try:
+            rules = FarmingRules.from_file(path)
+        except (OSError, ValueError) as e:
+            if cached is None:
+                raise
+            print(f"Could not reload farming rules from {path}: {e} (keeping version {cached[1].version})")
+            _loaded[path] = (stat_key, cached[1])
+            return cached[1]
+        print(f"Loaded farming rules version {rules.version} from {path}")
+        _loaded[path] = (stat_key, rules)
+        return rules
@@ -0,0 +1,134 @@
+"""
+Inference backends for the crop disease CNN
+Every backend exposes predict_on_batch(batch) taking a (N, 224, 224, 3)
+float32 array in [0, 1] and returning (N, num_classes) probabilities, so the
+predictor can switch between the full Keras model and lightweight runtimes:
+
+    keras        models/crop_disease_model.h5 through TensorFlow/Keras
+    tflite       float32 TFLite flatbuffer (export_model.py)
+    tflite-int8  post-training int8 quantized TFLite flatbuffer
+    onnx         ONNX graph served by onnxruntime
+
+Select one with CropDiseasePredictor(backend=...) or SMART_FARMING_BACKEND.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_BACKEND = os.environ.get('SMART_FARMING_BACKEND', 'keras')
+
+BACKEND_PATHS = {
+    'keras': 'models/crop_disease_model.h5',
+    'tflite': 'models/crop_disease_model.tflite',
+    'tflite-int8': 'models/crop_disease_model_int8.tflite',
+    'onnx': 'models/crop_disease_model.onnx',
+}
+
+
+class KerasBackend:
+    """Full TensorFlow/Keras model"""
+
+    name = 'keras'
+
+    def __init__(self, path):
+        import tensorflow as tf
+        self.path = path
+        self.model = tf.keras.models.load_model(path)
+
+    def predict_on_batch(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+def _load_tflite_interpreter(path, num_threads):
+    """Prefer the standalone LiteRT/tflite runtimes; fall back to TensorFlow's interpreter"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path, num_threads=num_threads)
+
+
+class TFLiteBackend:
+    """
+    TFLite flatbuffer (float32 or int8 quantized weights)
+    The interpreter is not thread-safe, so calls are serialised; the input
+    tensor is resized only when the batch size changes
+    """
+
+    name = 'tflite'
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.interpreter = _load_tflite_interpreter(path, num_threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()
+
+    def _quantize_input(self, batch):
+        scale, zero_point = self._input['quantization']
+        if self._input['dtype'] == np.float32 or not scale:
+            return batch.astype(np.float32, copy=False)
+        return np.round(batch / scale + zero_point).astype(self._input['dtype'])
+
+    def _dequantize_output(self, output):
+        scale, zero_point = self._output['quantization']
+        if self._output['dtype'] == np.float32 or not scale:
+            return output
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self._input['index'], self._quantize_input(batch))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+        return self._dequantize_output(output)
+
+
+class OnnxBackend:
+    """ONNX graph served by onnxruntime on CPU"""
+
+    name = 'onnx'
+
+    def __init__(self, path):
+        import onnxruntime
+        self.path = path
+        self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict_on_batch(self, batch):
+        feed = {self._input_name: np.asarray(batch, dtype=np.float32)}
+        return self.session.run(None, feed)[0]
+
+
+def backend_path(backend):
+    """Model file served by a backend"""
+    if backend not in BACKEND_PATHS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from: {', '.join(BACKEND_PATHS)}")
+    return BACKEND_PATHS[backend]
+
+
+def load_backend(backend=DEFAULT_BACKEND, path=None):
+    """Load the model for a backend from its default (or the given) path"""
+    path = path or backend_path(backend)
+    if backend == 'keras':
+        return KerasBackend(path)
+    if backend in ('tflite', 'tflite-int8'):
+        return TFLiteBackend(path)
+    if backend == 'onnx':
+        return OnnxBackend(path)
+    raise ValueError(f"Unknown backend '{backend}'")
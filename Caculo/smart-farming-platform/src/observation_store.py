@@ -0,0 +1,329 @@
+"""
+Persistent local store for parsed weather observations
+Append-only sqlite table clustered on (location, time), so a range query for
+one location reads a contiguous slice of the B-tree. Writes are buffered and
+committed in batches by a background thread, which keeps ingest cheap at
+thousands of observations per minute. Raw rows older than the retention
+period are rolled up into daily aggregates and then deleted.
+"""
+
+import sqlite3
+import threading
+import time
+
+from weather_providers import location_key
+
+OBSERVATION_FIELDS = ('temperature', 'feels_like', 'humidity', 'pressure', 'wind_speed',
+                      'wind_direction', 'visibility', 'precipitation')
+DAY_SECONDS = 24 * 3600
+
+# Aggregates kept per location and day, both for downsampled queries and for
+# rows that retention compaction has rolled up
+_DAILY_AGGREGATES = """
+    COUNT(*) AS observations,
+    MIN(temperature) AS temperature_min,
+    MAX(temperature) AS temperature_max,
+    AVG(temperature) AS temperature_mean,
+    AVG(humidity) AS humidity_mean,
+    MAX(humidity) AS humidity_max,
+    AVG(wind_speed) AS wind_speed_mean,
+    SUM(COALESCE(precipitation, 0)) AS precipitation_total,
+    COUNT(temperature) AS temperature_count,
+    COUNT(humidity) AS humidity_count,
+    COUNT(wind_speed) AS wind_speed_count
+"""
+DAILY_COLUMNS = ['observations', 'temperature_min', 'temperature_max', 'temperature_mean',
+                 'humidity_mean', 'humidity_max', 'wind_speed_mean', 'precipitation_total']
+# AVG skips NULLs, so each mean is merged by the number of readings behind it,
+# not by the day's observation count; stored but not returned by daily()
+MEAN_COUNTS = {'temperature_mean': 'temperature_count', 'humidity_mean': 'humidity_count',
+               'wind_speed_mean': 'wind_speed_count'}
+STORED_DAILY_COLUMNS = DAILY_COLUMNS + list(MEAN_COUNTS.values())
+
+
+
+def _merged_extreme(function, column):
+    # Two-argument MIN/MAX are NULL if either side is; keep the other side instead
+    return f"{column} = {function}(COALESCE({column}, excluded.{column}), COALESCE(excluded.{column}, {column}))"
+
+
+def _merged_mean(mean, count):
+    return (f"{mean} = (COALESCE({mean} * {count}, 0) + COALESCE(excluded.{mean} * excluded.{count}, 0))"
+            f" / NULLIF({count} + excluded.{count}, 0)")
+
+
+# Merge a newly compacted day into an existing daily row (SET clause)
+_DAILY_UPSERT = ', '.join(
+    [_merged_extreme('MIN', 'temperature_min'), _merged_extreme('MAX', 'temperature_max'),
+     _merged_extreme('MAX', 'humidity_max')]
+    + [_merged_mean(mean, count) for mean, count in MEAN_COUNTS.items()]
+    + [f"{column} = {column} + excluded.{column}"
+       for column in ['precipitation_total', 'observations'] + list(MEAN_COUNTS.values())]
+)
+
+
+def location_id(location):
+    """Stable text key for a city name or (lat, lon) pair, matching the weather cache"""
+    kind, *parts = location_key(location)
+    return f"{kind}:{','.join(str(part) for part in parts)}"
+
+
+class ObservationStore:
+    """
+    Append-only weather observation store
+    - add()/add_many() buffer rows; a writer thread commits them every
+      flush_interval seconds or as soon as batch_size rows are waiting
+    - query() and daily() return pandas DataFrames for a location and time range
+    - compact() rolls raw rows older than retention_days into the daily table
+    Timestamps are Unix epoch seconds (UTC).
+    """
+
+    def __init__(self, path, batch_size=1000, flush_interval=1.0, retention_days=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Condition()
+        self._closed = False
+        self._stats = {'written': 0, 'duplicates': 0, 'flushes': 0, 'compacted': 0}
+        self._open()
+
+        self._writer = threading.Thread(target=self._write_loop, name='observation-writer', daemon=True)
+        self._writer.start()
+
+    def _open(self):
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: durable across crashes of this process, one fsync per checkpoint
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            columns = ', '.join(f"{name} REAL" for name in OBSERVATION_FIELDS)
+            self._db.execute(f"""
+                CREATE TABLE IF NOT EXISTS observations (
+                    location TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    {columns},
+                    description TEXT,
+                    PRIMARY KEY (location, ts)
+                ) WITHOUT ROWID
+            """)
+            # No separate ts index: the planner would pick it over the (location, ts)
+            # key for bounded range queries; compaction is rare and can scan
+            daily_columns = ', '.join([f"{name} REAL" for name in DAILY_COLUMNS]
+                                      + [f"{name} INTEGER" for name in MEAN_COUNTS.values()])
+            self._db.execute(f"""
+                CREATE TABLE IF NOT EXISTS daily_observations (
+                    location TEXT NOT NULL,
+                    day INTEGER NOT NULL,
+                    {daily_columns},
+                    PRIMARY KEY (location, day)
+                ) WITHOUT ROWID
+            """)
+            existing = {row[1] for row in self._db.execute("PRAGMA table_info(daily_observations)")}
+            for mean, count in MEAN_COUNTS.items():
+                if count not in existing:
+                    # Stores from before the counts: the best estimate is every observation
+                    self._db.execute(f"ALTER TABLE daily_observations ADD COLUMN {count} INTEGER")
+                    self._db.execute(f"UPDATE daily_observations SET {count} = "
+                                     f"CASE WHEN {mean} IS NULL THEN 0 ELSE observations END")
+            self._db.commit()
+
+    # Writes
+
+    def add(self, location, observation, timestamp=None):
+        """Queue one parsed observation (a WeatherService weather dict or similar)"""
+        self.add_many([(location, observation, timestamp)])
+
+    def add_many(self, rows):
+        """Queue (location, observation, timestamp-or-None) tuples"""
+        now = int(time.time())
+        prepared = [
+            (location_id(location), int(timestamp if timestamp is not None else now))
+            + tuple(observation.get(name) for name in OBSERVATION_FIELDS)
+            + (observation.get('description'),)
+            for location, observation, timestamp in rows
+        ]
+        with self._pending_lock:
+            if self._closed:
+                raise RuntimeError("ObservationStore is closed")
+            self._pending.extend(prepared)
+            if len(self._pending) >= self.batch_size:
+                self._pending_lock.notify()
+
+    def flush(self):
+        """Commit everything queued so far"""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+
+        placeholders = ', '.join('?' * (len(OBSERVATION_FIELDS) + 3))
+        with self._db_lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                f"INSERT OR IGNORE INTO observations VALUES ({placeholders})", rows
+            )
+            self._db.commit()
+            written = self._db.total_changes - before
+            self._stats['written'] += written
+            self._stats['duplicates'] += len(rows) - written
+            self._stats['flushes'] += 1
+        return written
+
+    def _write_loop(self):
+        last_compaction = time.monotonic()
+        while True:
+            with self._pending_lock:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._pending_lock.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+                if self.retention_days and time.monotonic() - last_compaction > 3600:
+                    self.compact()
+                    last_compaction = time.monotonic()
+            except sqlite3.Error as e:
+                print(f"Observation store write error: {e}")
+            if closed:
+                return
+
+    # Reads
+
+    def query(self, location, start=None, end=None, columns=None):
+        """
+        Raw observations for one location with start <= ts < end, oldest first
+        Returns a DataFrame indexed by UTC timestamp
+        """
+        import pandas as pd
+
+        self.flush()
+        columns = list(columns or OBSERVATION_FIELDS + ('description',))
+        sql = (f"SELECT ts, {', '.join(columns)} FROM observations "
+               f"WHERE location = ? AND ts >= ? AND ts < ? ORDER BY ts")
+        with self._db_lock:
+            rows = self._db.execute(sql, (location_id(location), *self._range(start, end))).fetchall()
+
+        frame = pd.DataFrame(rows, columns=['ts'] + columns)
+        frame.index = pd.to_datetime(frame.pop('ts'), unit='s', utc=True)
+        return frame
+
+    def daily(self, location, start=None, end=None):
+        """
+        Daily aggregates for one location: rolled-up history from compaction
+        plus days computed on the fly from raw rows
+        """
+        import pandas as pd
+
+        self.flush()
+        key = location_id(location)
+        start, end = self._range(start, end)
+        with self._db_lock:
+            raw = self._db.execute(f"""
+                SELECT (ts / {DAY_SECONDS}) * {DAY_SECONDS} AS day, {_DAILY_AGGREGATES}
+                FROM observations WHERE location = ? AND ts >= ? AND ts < ?
+                GROUP BY day
+            """, (key, start, end)).fetchall()
+            rolled = self._db.execute(f"""
+                SELECT day, {', '.join(STORED_DAILY_COLUMNS)} FROM daily_observations
+                WHERE location = ? AND day >= ? AND day < ?
+            """, (key, start // DAY_SECONDS * DAY_SECONDS, end)).fetchall()
+
+        frame = pd.DataFrame(rolled + raw, columns=['day'] + STORED_DAILY_COLUMNS)
+        if frame['day'].duplicated().any():
+            # Late rows for an already compacted day: merge the two parts
+            frame = _merge_daily(frame)
+        frame = frame.sort_values('day').set_index('day')[DAILY_COLUMNS]
+        frame.index = pd.to_datetime(frame.index, unit='s', utc=True)
+        frame.index.name = 'day'
+        frame['observations'] = frame['observations'].astype(int)
+        return frame
+
+    def locations(self):
+        """Location ids with raw or rolled-up observations"""
+        self.flush()
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT location FROM observations UNION SELECT DISTINCT location FROM daily_observations"
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    @staticmethod
+    def _range(start, end):
+        return (int(start) if start is not None else 0,
+                int(end) if end is not None else 2 ** 62)
+
+    # Retention
+
+    def compact(self, retention_days=None, now=None):
+        """
+        Roll raw rows older than the retention period into daily aggregates,
+        delete them, and return how many raw rows were removed
+        """
+        retention_days = retention_days or self.retention_days
+        if not retention_days:
+            return 0
+        self.flush()
+        # Only whole days are rolled up, so a day is never split by the cutoff
+        cutoff = (int(now or time.time()) - retention_days * DAY_SECONDS) // DAY_SECONDS * DAY_SECONDS
+
+        with self._db_lock:
+            self._db.execute(f"""
+                INSERT INTO daily_observations (location, day, {', '.join(STORED_DAILY_COLUMNS)})
+                SELECT location, (ts / {DAY_SECONDS}) * {DAY_SECONDS} AS day, {_DAILY_AGGREGATES}
+                FROM observations WHERE ts < ?
+                GROUP BY location, day
+                ON CONFLICT(location, day) DO UPDATE SET {_DAILY_UPSERT}
+            """, (cutoff,))
+            removed = self._db.execute("DELETE FROM observations WHERE ts < ?", (cutoff,)).rowcount
+            self._db.commit()
+            self._stats['compacted'] += removed
+        return removed
+
+    # Lifecycle
+
+    def get_stats(self):
+        """Write counters plus row counts"""
+        with self._pending_lock:
+            pending = len(self._pending)
+        with self._db_lock:
+            stats = dict(self._stats)
+            stats['rows'] = self._db.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+            stats['daily_rows'] = self._db.execute("SELECT COUNT(*) FROM daily_observations").fetchone()[0]
+        stats['pending'] = pending
+        return stats
+
+    def close(self):
+        """Flush queued rows and stop the writer thread"""
+        with self._pending_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending_lock.notify()
+        self._writer.join()
+        with self._db_lock:
+            self._db.close()
+
+
+def _merge_daily(frame):
+    """Combine daily aggregate rows for the same day (means weighted by their reading counts)"""
+    frame = frame.assign(**{mean: frame[mean] * frame[count] for mean, count in MEAN_COUNTS.items()})
+    merged = frame.groupby('day').agg(
+        observations=('observations', 'sum'),
+        temperature_min=('temperature_min', 'min'),
+        temperature_max=('temperature_max', 'max'),
+        temperature_mean=('temperature_mean', 'sum'),
+        humidity_mean=('humidity_mean', 'sum'),
+        humidity_max=('humidity_max', 'max'),
+        wind_speed_mean=('wind_speed_mean', 'sum'),
+        precipitation_total=('precipitation_total', 'sum'),
+        temperature_count=('temperature_count', 'sum'),
+        humidity_count=('humidity_count', 'sum'),
+        wind_speed_count=('wind_speed_count', 'sum')
+    )
+    for mean, count in MEAN_COUNTS.items():
+        # No readings on either side: NaN, not 0
+        merged[mean] = merged[mean] / merged[count].where(merged[count] > 0)
+    return merged.reset_index()
@@ -1,26 +1,115 @@
-import tensorflow as tf
 import numpy as np
 from PIL import Image
 import os
+import time
+
+from batching import BatcherClosedError, MicroBatcher
+from image_pipeline import BatchBuffer, preprocess_batch
+from model_backends import DEFAULT_BACKEND, backend_path, load_backend
+from prediction_cache import PredictionCache, image_cache_key
+from service_registry import LABELS_PATH, model_version
+from visual_analysis import classify_batch, classify_image
+
+# Predictions below this confidence fall back to visual analysis
+CONFIDENCE_THRESHOLD = 60.0
+
+# Label returned when an image cannot be analysed at all; never cached
+UNCERTAIN_LABEL = "Uncertain - Retake Image"
+
+
+class PredictionResult:
+    """
+    Outcome of one image analysis
+    Holds the final label and confidence, the full class distribution from
+    the forward pass (if one ran), which path produced the label and
+    per-stage timings in milliseconds. source is one of:
+    - 'cnn': confident CNN prediction
+    - 'visual_fallback': label from colour analysis (no model, low
+      confidence or inference error); probabilities kept if the CNN ran
+    - 'demo': demonstration predictor output
+    """
+
+    def __init__(self, label, confidence, probabilities=None, class_labels=(),
+                 source='cnn', timings=None, cached=False):
+        self.label = label
+        self.confidence = confidence
+        self.probabilities = probabilities
+        self.class_labels = list(class_labels)
+        self.source = source
+        self.timings = timings or {}
+        self.cached = cached
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a result from to_dict() output"""
+        distribution = data.get('all_predictions') or {}
+        probabilities = None
+        if distribution:
+            probabilities = np.array([value / 100 for value in distribution.values()], dtype='float32')
+        return cls(data['disease'], data['confidence'], probabilities, list(distribution),
+                   source=data.get('source', 'cnn'), timings=data.get('timings'))
+
+    @property
+    def distribution(self):
+        """Class name -> probability in percent; empty if no forward pass ran"""
+        if self.probabilities is None:
+            return {}
+        return {
+            class_name: float(prob) * 100
+            for class_name, prob in zip(self.class_labels, self.probabilities)
+        }
+
+    def as_tuple(self):
+        """(disease_name, confidence) as returned by predict()"""
+        return self.label, self.confidence
+
+    def to_dict(self):
+        """JSON-friendly representation"""
+        return {
+            'disease': self.label,
+            'confidence': self.confidence,
+            'all_predictions': self.distribution,
+            'source': self.source,
+            'timings': dict(self.timings),
+            'cached': self.cached
+        }
+
+    def __repr__(self):
+        return f"PredictionResult({self.label!r}, {self.confidence:.1f}, source={self.source!r})"
+
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
 
 class CropDiseasePredictor:
     """Proper CNN-based crop disease predictor"""
     
-    def __init__(self):
+    def __init__(self, backend=None):
+        self.backend = backend or DEFAULT_BACKEND
+        self.model_path = backend_path(self.backend)
         self.model = None
         self.class_labels = []
+        self._batcher = None
+        self._cache = None
+        self._input_buffer = BatchBuffer(capacity=1)
+        self.model_version = None
         self.load_model()
     
     def load_model(self):
-        """Load trained model and class labels"""
-        model_path = 'models/crop_disease_model.h5'
-        labels_path = 'models/class_labels.txt'
+        """Load trained model (through the configured backend) and class labels"""
+        model_path = self.model_path
+        labels_path = LABELS_PATH
+        self.model_version = model_version((model_path, labels_path))
         
         try:
             # Load model
             if os.path.exists(model_path):
-                self.model = tf.keras.models.load_model(model_path)
-                print("Model loaded successfully")
+                self.model = load_backend(self.backend, model_path)
+                print(f"Model loaded successfully ({self.backend} backend)")
+            elif self.backend != 'keras':
+                print(f"{self.backend} model not found. Export it first: python export_model.py")
+                return False
             else:
                 print("Model not found. Please train first: python train_model.py")
                 return False
@@ -50,138 +139,296 @@ class CropDiseasePredictor:
     def preprocess_image(self, image):
         """
         CRITICAL: Same preprocessing as training
-        - Resize to (224, 224)
+        - Convert to RGB and resize to (224, 224)
         - Normalize to [0, 1]
+        Returns a (1, 224, 224, 3) view of this thread's reusable input buffer
         """
-        # Resize image
-        image = image.resize((224, 224))
-        
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Convert to numpy array
-        image_array = np.array(image)
-        
-        # Normalize pixel values to [0, 1] - SAME AS TRAINING
-        image_array = image_array.astype('float32') / 255.0
-        
-        # Add batch dimension
-        image_array = np.expand_dims(image_array, axis=0)
-        
-        return image_array
+        return self._input_buffer.fill([image])
     
-    def predict(self, image):
+    def enable_batching(self, max_batch_size=16, max_delay_ms=10.0):
         """
-        FIXED: Predict disease using trained CNN model with proper validation
-        Returns: disease_name, confidence_score
+        Route predict() calls through a background micro-batcher
+        Concurrent callers are merged into one forward pass of up to
+        max_batch_size images, waiting at most max_delay_ms for a batch to fill
+        """
+        self.disable_batching()
+        self._batcher = MicroBatcher(
+            lambda arrays: self._run_model(np.stack(arrays)),
+            max_batch_size=max_batch_size,
+            max_delay_ms=max_delay_ms,
+            name="predictor-batcher"
+        )
+
+    def disable_batching(self):
+        """Stop the micro-batcher; predict() runs one forward pass per call again"""
+        if self._batcher is not None:
+            self._batcher.close()
+            self._batcher = None
+
+    def enable_cache(self, max_entries=1024, ttl_seconds=3600, disk_path=None):
+        """
+        Cache results by decoded-pixel hash and model version
+        Repeat uploads of the same photo skip preprocessing and inference;
+        disk_path adds a sqlite tier that survives restarts
+        """
+        self.disable_cache()
+        self._cache = PredictionCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            disk_path=disk_path,
+            watch_paths=(self.model_path, LABELS_PATH),
+            version=self.model_version
+        )
+
+    def disable_cache(self):
+        """Stop caching predictions"""
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def get_cache_stats(self):
+        """Prediction cache counters, or None when caching is disabled"""
+        return self._cache.get_stats() if self._cache is not None else None
+
+    def close(self):
+        """Release background resources held by the predictor"""
+        self.disable_batching()
+        self.disable_cache()
+
+    def get_batching_stats(self):
+        """Micro-batcher counters, or None when batching is disabled"""
+        return self._batcher.get_stats() if self._batcher is not None else None
+
+    def _run_model(self, batch):
+        """Single forward pass over a (N, 224, 224, 3) float32 batch"""
+        return np.asarray(self.model.predict_on_batch(batch))
+
+    def _forward(self, processed_image):
+        """Class probabilities for one preprocessed image, batched with concurrent callers if enabled"""
+        batcher = self._batcher
+        if batcher is not None:
+            try:
+                return batcher.submit(processed_image[0]).result()
+            except BatcherClosedError:
+                # Batching was switched off (or this predictor retired) mid-call
+                pass
+        return self._run_model(processed_image)[0]
+
+    def _fallback_result(self, image, probabilities=None, timings=None):
+        """Result labelled by visual analysis, keeping any CNN distribution"""
+        start = time.perf_counter()
+        disease_name, confidence = self._fallback_visual_analysis(image)
+        timings = dict(timings or {})
+        timings['fallback_ms'] = _elapsed_ms(start)
+        return PredictionResult(disease_name, confidence, probabilities, self.class_labels,
+                                source='visual_fallback', timings=timings)
+
+    def _build_result(self, probabilities, image, timings):
+        """Turn one row of class probabilities into a PredictionResult"""
+        # Get predicted class index using np.argmax
+        predicted_class_idx = int(np.argmax(probabilities))
+        confidence = float(probabilities[predicted_class_idx]) * 100
+
+        print(f"DEBUG: Predicted class index: {predicted_class_idx}, Confidence: {confidence:.2f}%")
+
+        # FIXED: Confidence threshold validation
+        if confidence < CONFIDENCE_THRESHOLD:
+            print(f"DEBUG: Low confidence ({confidence:.2f}%), using visual analysis fallback")
+            return self._fallback_result(image, probabilities, timings)
+
+        # Get disease name from class labels
+        disease_name = self.class_labels[predicted_class_idx]
+        print(f"DEBUG: Final prediction: {disease_name} ({confidence:.2f}%)")
+
+        return PredictionResult(disease_name, confidence, probabilities, self.class_labels,
+                                source='cnn', timings=timings)
+
+    def _cache_lookup(self, image):
+        """(cache_key, cached PredictionResult or None); key is None when caching is off"""
+        if self._cache is None:
+            return None, None
+
+        start = time.perf_counter()
+        try:
+            cache_key = image_cache_key(image, self.model_version)
+        except Exception as e:
+            print(f"DEBUG: Could not hash image for cache: {e}")
+            return None, None
+
+        cached = self._cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+
+        result = PredictionResult.from_dict(cached)
+        result.cached = True
+        result.timings = {'cache_ms': _elapsed_ms(start), 'total_ms': _elapsed_ms(start)}
+        return cache_key, result
+
+    def _cache_store(self, cache_key, result):
+        if cache_key is not None and result.label != UNCERTAIN_LABEL:
+            self._cache.put(cache_key, result.to_dict())
+
+    def analyze(self, image):
+        """
+        Full analysis from a single preprocess and a single forward pass
+        Returns: PredictionResult with label, confidence and distribution
         """
+        cache_key, cached = self._cache_lookup(image)
+        if cached is not None:
+            return cached
+
+        result = self._analyze_uncached(image)
+        self._cache_store(cache_key, result)
+        return result
+
+    def _analyze_uncached(self, image):
+        start = time.perf_counter()
+
         # DEBUG: Check if model is loaded
         if self.model is None:
             print("DEBUG: Model not loaded, using fallback analysis")
-            return self._fallback_visual_analysis(image)
-        
+            result = self._fallback_result(image)
+            result.timings['total_ms'] = _elapsed_ms(start)
+            return result
+
+        timings = {}
         try:
             # CRITICAL: Use IDENTICAL preprocessing as training
             processed_image = self.preprocess_image(image)
-            print(f"DEBUG: Image preprocessed to shape: {processed_image.shape}")
-            
-            # Get CNN model predictions
-            predictions = self.model.predict(processed_image, verbose=0)
-            print(f"DEBUG: Raw predictions: {predictions[0]}")
-            
-            # Get predicted class index using np.argmax
-            predicted_class_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_class_idx]) * 100
-            
-            print(f"DEBUG: Predicted class index: {predicted_class_idx}, Confidence: {confidence:.2f}%")
-            
-            # FIXED: Confidence threshold validation
-            if confidence < 60.0:
-                print(f"DEBUG: Low confidence ({confidence:.2f}%), using visual analysis fallback")
-                return self._fallback_visual_analysis(image)
-            
-            # Get disease name from class labels
-            disease_name = self.class_labels[predicted_class_idx]
-            print(f"DEBUG: Final prediction: {disease_name} ({confidence:.2f}%)")
-            
-            return disease_name, confidence
-            
+            timings['preprocess_ms'] = _elapsed_ms(start)
+
+            stage = time.perf_counter()
+            probabilities = self._forward(processed_image)
+            timings['inference_ms'] = _elapsed_ms(stage)
+
+            result = self._build_result(probabilities, image, timings)
+
         except Exception as e:
             print(f"DEBUG: CNN prediction failed: {e}, using fallback")
-            return self._fallback_visual_analysis(image)
+            result = self._fallback_result(image, timings=timings)
+
+        result.timings['total_ms'] = _elapsed_ms(start)
+        return result
+
+    def analyze_batch(self, images):
+        """
+        Analyze a list of images with one forward pass
+        Cached images are answered directly; only the misses are batched
+        Returns: list of PredictionResult, in input order
+        """
+        images = list(images)
+        results = [None] * len(images)
+        cache_keys = [None] * len(images)
+
+        for i, image in enumerate(images):
+            cache_keys[i], results[i] = self._cache_lookup(image)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        for i, result in zip(pending, self._analyze_batch_uncached([images[i] for i in pending])):
+            results[i] = result
+            self._cache_store(cache_keys[i], result)
+
+        return results
+
+    def _analyze_batch_uncached(self, images):
+        if not images:
+            return []
+
+        if self.model is None:
+            return [self._fallback_result(image) for image in images]
+
+        start = time.perf_counter()
+        try:
+            # Written in place into one (N, 224, 224, 3) buffer
+            batch = preprocess_batch(images)
+            preprocess_ms = _elapsed_ms(start)
+
+            stage = time.perf_counter()
+            predictions = self._run_model(batch)
+            inference_ms = _elapsed_ms(stage)
+        except Exception as e:
+            print(f"DEBUG: Batch CNN prediction failed: {e}, using fallback")
+            return [self._fallback_result(image) for image in images]
+
+        # Per-image share of the batched stages
+        timings = {
+            'preprocess_ms': preprocess_ms / len(images),
+            'inference_ms': inference_ms / len(images),
+            'batch_size': len(images)
+        }
+        return [self._build_result(row, image, dict(timings))
+                for row, image in zip(predictions, images)]
+
+    def analyze_pixels(self, pixels):
+        """
+        Analyze a (N, 224, 224, 3) uint8 batch that is already decoded and resized
+        Used by bulk tools that decode in worker processes; low-confidence
+        rows fall back to the vectorized visual analysis on the same pixels
+        Returns: list of PredictionResult, in input order
+        """
+        pixels = np.asarray(pixels, dtype=np.uint8)
+        if len(pixels) == 0:
+            return []
+
+        if self.model is None:
+            labels, confidences = classify_batch(pixels)
+            return [PredictionResult(label, float(confidence), None, self.class_labels,
+                                     source='visual_fallback')
+                    for label, confidence in zip(labels, confidences)]
+
+        start = time.perf_counter()
+        batch = np.divide(pixels, np.float32(255.0), dtype=np.float32)
+        predictions = self._run_model(batch)
+        timings = {'inference_ms': _elapsed_ms(start) / len(pixels), 'batch_size': len(pixels)}
+
+        top = predictions.argmax(axis=1)
+        confidences = predictions[np.arange(len(predictions)), top] * 100
+        low_confidence = confidences < CONFIDENCE_THRESHOLD
+        fallback_labels, fallback_confidences = None, None
+        if low_confidence.any():
+            fallback_labels, fallback_confidences = classify_batch(pixels[low_confidence])
+
+        results = []
+        fallback_index = 0
+        for i, row in enumerate(predictions):
+            if low_confidence[i]:
+                label = fallback_labels[fallback_index]
+                confidence = float(fallback_confidences[fallback_index])
+                fallback_index += 1
+                source = 'visual_fallback'
+            else:
+                label, confidence, source = self.class_labels[top[i]], float(confidences[i]), 'cnn'
+            results.append(PredictionResult(label, confidence, row, self.class_labels,
+                                            source=source, timings=dict(timings)))
+        return results
+
+    def predict(self, image):
+        """
+        FIXED: Predict disease using trained CNN model with proper validation
+        Returns: disease_name, confidence_score
+        """
+        return self.analyze(image).as_tuple()
+
+    def predict_batch(self, images):
+        """
+        Predict diseases for a list of images with one forward pass
+        Returns: list of (disease_name, confidence_score), in input order
+        """
+        return [result.as_tuple() for result in self.analyze_batch(images)]
     
     def _fallback_visual_analysis(self, image):
         """
         FIXED: Fallback visual analysis with scientifically correct thresholds
         """
         try:
-            image_array = np.array(image.resize((224, 224)))
-            
-            if len(image_array.shape) == 3:
-                # Extract color statistics
-                red = np.mean(image_array[:, :, 0])
-                green = np.mean(image_array[:, :, 1])
-                blue = np.mean(image_array[:, :, 2])
-                brightness = np.mean(image_array)
-                
-                print(f"DEBUG: Color analysis - R:{red:.1f}, G:{green:.1f}, B:{blue:.1f}, Brightness:{brightness:.1f}")
-                
-                # FIXED: Scientifically accurate disease detection
-                
-                # Healthy: Dominant green, good brightness
-                if green > red + 15 and green > blue + 10 and brightness > 100:
-                    return "Healthy", 85.0
-                
-                # Powdery Mildew: High brightness (white patches)
-                elif brightness > 180 or (red > 200 and green > 200 and blue > 200):
-                    return "Powdery Mildew", 82.0
-                
-                # Rust Disease: High red, low green (orange/brown)
-                elif red > green + 25 and red > 130:
-                    return "Rust Disease", 80.0
-                
-                # Leaf Blight: Low brightness (dark spots)
-                elif brightness < 80 or (red < 90 and green < 90 and blue < 90):
-                    return "Leaf Blight", 78.0
-                
-                # Bacterial Spot: Moderate values with some contrast
-                elif 90 < brightness < 150 and abs(red - green) > 10:
-                    return "Bacterial Spot", 75.0
-                
-                # Mosaic Virus: High variance in green channel
-                else:
-                    return "Mosaic Virus", 72.0
-                    
-            else:
-                # Grayscale analysis
-                brightness = np.mean(image_array)
-                if brightness > 180:
-                    return "Powdery Mildew", 70.0
-                elif brightness < 80:
-                    return "Leaf Blight", 70.0
-                else:
-                    return "Healthy", 65.0
+            disease_name, confidence = classify_image(image)
+            print(f"DEBUG: Visual analysis: {disease_name} ({confidence:.1f}%)")
+            return disease_name, confidence
                     
         except Exception as e:
             print(f"DEBUG: Visual analysis failed: {e}")
-            return "Uncertain - Retake Image", 0.0
+            return UNCERTAIN_LABEL, 0.0
     
     def get_all_predictions(self, image):
         """Get all class probabilities"""
-        if self.model is None:
-            return {}
-        
-        try:
-            processed_image = self.preprocess_image(image)
-            predictions = self.model.predict(processed_image, verbose=0)
-            
-            result = {}
-            for i, class_name in enumerate(self.class_labels):
-                result[class_name] = float(predictions[0][i]) * 100
-            
-            return result
-            
-        except Exception as e:
-            print(f"Error getting all predictions: {e}")
-            return {}
+        return self.analyze(image).distribution
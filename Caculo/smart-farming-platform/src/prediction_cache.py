@@ -0,0 +1,198 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from service_registry import file_digest, file_stat_key
+
+# Expired and overflow rows are pruned from sqlite every this many writes
+DISK_PRUNE_INTERVAL = 256
+
+
+def image_cache_key(image, model_version):
+    """
+    Content address for a decoded image under a given model version
+    Hashes the pixel bytes plus mode and size, so the same photo re-uploaded
+    under a different file name or container still maps to the same entry
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return f"{model_version}:{digest.hexdigest()}"
+
+
+class PredictionCache:
+    """
+    Two-tier prediction cache
+    - In-memory LRU tier bounded by max_entries and ttl_seconds
+    - Optional sqlite tier at disk_path that survives restarts
+    Entries are JSON-friendly dicts. The whole cache is dropped when any
+    watched file (model weights, class labels) changes on disk, and disk
+    rows written under another model version are purged on startup.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, disk_path=None,
+                 disk_max_entries=100000, watch_paths=(), version=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.watch_paths = tuple(watch_paths)
+        self.version = version
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._disk_writes = 0
+        self._stat_keys = self._current_stat_keys()
+        self._digests = self._current_digests()
+        self._stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+        self._db = None
+        if disk_path:
+            self._open_disk_tier()
+
+    def _current_stat_keys(self):
+        return tuple(file_stat_key(path) for path in self.watch_paths)
+
+    def _current_digests(self):
+        return tuple(file_digest(path) for path in self.watch_paths)
+
+    def _open_disk_tier(self):
+        self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                key TEXT PRIMARY KEY,
+                version TEXT,
+                created REAL,
+                payload TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions(created)")
+        if self.version is not None:
+            # Results from other model versions can never be hit again
+            self._db.execute("DELETE FROM predictions WHERE version != ?", (self.version,))
+        self._db.commit()
+
+    def _check_watched_files(self):
+        """Drop everything if the model or labels changed since the last check (lock held)"""
+        stat_keys = self._current_stat_keys()
+        if stat_keys == self._stat_keys:
+            return
+        self._stat_keys = stat_keys
+
+        # Only a content change invalidates; a bare mtime bump does not
+        digests = self._current_digests()
+        if digests == self._digests:
+            return
+        self._digests = digests
+
+        self._entries.clear()
+        self._stats['invalidations'] += 1
+        if self._db is not None:
+            self._db.execute("DELETE FROM predictions")
+            self._db.commit()
+        print("Model files changed, prediction cache invalidated")
+
+    def get(self, key):
+        """Cached value for key, or None"""
+        now = time.time()
+        with self._lock:
+            self._check_watched_files()
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, payload FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[0] <= self.ttl_seconds:
+                    value = json.loads(row[1])
+                    # Promote to the memory tier, keeping the original age
+                    self._store(key, value, row[0])
+                    self._stats['disk_hits'] += 1
+                    return value
+
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        """Store a JSON-friendly value in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._check_watched_files()
+            self._store(key, value, now)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, version, created, payload) VALUES (?, ?, ?, ?)",
+                    (key, self.version, now, json.dumps(value))
+                )
+                self._db.commit()
+                self._disk_writes += 1
+                if self._disk_writes % DISK_PRUNE_INTERVAL == 0:
+                    self._prune_disk(now)
+
+    def _store(self, key, value, created):
+        """Insert into the LRU tier and evict the oldest entries (lock held)"""
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _prune_disk(self, now):
+        """Remove expired rows and keep the disk tier under disk_max_entries (lock held)"""
+        self._db.execute("DELETE FROM predictions WHERE created < ?", (now - self.ttl_seconds,))
+        count = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        if count > self.disk_max_entries:
+            self._db.execute(
+                "DELETE FROM predictions WHERE key IN "
+                "(SELECT key FROM predictions ORDER BY created LIMIT ?)",
+                (count - self.disk_max_entries,)
+            )
+            self._stats['evictions'] += count - self.disk_max_entries
+        self._db.commit()
+
+    def clear(self):
+        """Drop all entries from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def close(self):
+        """Close the disk tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self):
+        """Hit, miss and eviction counters plus current sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            if self._db is not None:
+                stats['disk_entries'] = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,283 @@
+import hashlib
+import os
+import threading
+import time
+
+from model_backends import DEFAULT_BACKEND, backend_path
+
+MODEL_PATH = 'models/crop_disease_model.h5'
+LABELS_PATH = 'models/class_labels.txt'
+
+# Micro-batching defaults for the shared predictor
+PREDICT_BATCH_SIZE = 16
+PREDICT_BATCH_DELAY_MS = 10.0
+
+# Prediction cache for the shared predictor; set SMART_FARMING_CACHE_DB to a
+# file path to keep cached results across restarts
+PREDICTION_CACHE_SIZE = 1024
+PREDICTION_CACHE_TTL = 24 * 3600
+PREDICTION_CACHE_DB = os.environ.get('SMART_FARMING_CACHE_DB')
+
+# Set SMART_FARMING_WEATHER_DB to a file path to keep every fetched weather
+# observation for trend queries (raw rows older than the retention are rolled
+# up into daily aggregates)
+WEATHER_OBSERVATIONS_DB = os.environ.get('SMART_FARMING_WEATHER_DB')
+WEATHER_RETENTION_DAYS = 90
+
+# How often the shared treatment advisor checks data/treatments.json for edits
+TREATMENTS_POLL_SECONDS = 2.0
+
+# A replaced instance is closed this long after the swap, so calls that
+# fetched it just before a reload can finish with it
+RETIRED_SERVICE_GRACE_SECONDS = 60.0
+
+# File digests remembered (each model or label edit adds a key)
+MAX_DIGEST_MEMO = 64
+
+
+def file_stat_key(path):
+    """Cheap change marker for a file: (mtime_ns, size), or None if missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+_digest_memo = {}
+_digest_memo_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    SHA-256 of a file's contents, or None if the file is missing
+    Results are memoized per (path, mtime, size), so the registry and the
+    prediction cache can both ask for the model digest without rehashing
+    """
+    stat_key = file_stat_key(path)
+    if stat_key is None:
+        return None
+
+    memo_key = (os.path.abspath(path), stat_key)
+    with _digest_memo_lock:
+        if memo_key in _digest_memo:
+            return _digest_memo[memo_key]
+
+    try:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+
+    with _digest_memo_lock:
+        _digest_memo[memo_key] = digest.hexdigest()
+        while len(_digest_memo) > MAX_DIGEST_MEMO:
+            # Oldest first: superseded versions of edited files
+            del _digest_memo[next(iter(_digest_memo))]
+    return digest.hexdigest()
+
+
+def model_version(paths=(MODEL_PATH, LABELS_PATH)):
+    """Short identifier for the current contents of the model and label files"""
+    return '-'.join((file_digest(path) or 'missing')[:12] for path in paths)
+
+
+class _ServiceEntry:
+    """Bookkeeping for one registered service"""
+
+    def __init__(self, name, factory, watch_paths):
+        self.name = name
+        self.factory = factory
+        self.watch_paths = tuple(watch_paths)
+        self.lock = threading.Lock()
+        self.instance = None
+        self.loaded = False
+        self.stat_keys = {}
+        self.digests = {}
+        # Hits are counted outside the load lock, from any thread
+        self.metrics_lock = threading.Lock()
+        self.metrics = {
+            'loads': 0,
+            'reloads': 0,
+            'hits': 0,
+            'misses': 0,
+            'last_load_seconds': None,
+            'total_load_seconds': 0.0,
+            'last_loaded_at': None,
+        }
+
+    def count(self, name):
+        with self.metrics_lock:
+            self.metrics[name] += 1
+
+
+class ServiceRegistry:
+    """
+    Process-wide registry of lazily constructed, shared services
+    Each service is built once on first use and reused by every caller
+    (Streamlit reruns, HTTP handlers, CLI tools) until one of its watched
+    files changes or reload() is called explicitly
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def register(self, name, factory, watch_paths=()):
+        """Register a zero-argument factory under a service name"""
+        with self._lock:
+            self._entries[name] = _ServiceEntry(name, factory, watch_paths)
+
+    def names(self):
+        """Names of all registered services"""
+        with self._lock:
+            return list(self._entries)
+
+    def _entry(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown service: {name}")
+        return entry
+
+    def get(self, name):
+        """Return the shared instance, building or rebuilding it if needed"""
+        entry = self._entry(name)
+
+        # Fast path: already loaded and nothing on disk has changed
+        if entry.loaded and not self._files_changed(entry):
+            entry.count('hits')
+            return entry.instance
+
+        with entry.lock:
+            # Another thread may have finished the load while we waited
+            if entry.loaded and not self._files_changed(entry):
+                entry.count('hits')
+                return entry.instance
+
+            entry.count('misses')
+            if entry.loaded:
+                print(f"Watched files changed, reloading service '{name}'")
+                entry.count('reloads')
+            self._load(entry)
+            return entry.instance
+
+    def reload(self, name):
+        """Force a rebuild of a service regardless of file state"""
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.loaded:
+                entry.count('reloads')
+            self._load(entry)
+            return entry.instance
+
+    def warm_up(self, names=None):
+        """Build services ahead of the first request; already loaded ones are skipped"""
+        for name in names or self.names():
+            entry = self._entry(name)
+            with entry.lock:
+                if not entry.loaded:
+                    self._load(entry)
+
+    def is_loaded(self, name):
+        """True if the service has been constructed"""
+        return self._entry(name).loaded
+
+    def get_metrics(self):
+        """Snapshot of load time and hit counters for every service"""
+        with self._lock:
+            entries = list(self._entries.values())
+        metrics = {}
+        for entry in entries:
+            with entry.metrics_lock:
+                metrics[entry.name] = dict(entry.metrics, loaded=entry.loaded)
+        return metrics
+
+    def _load(self, entry):
+        start = time.perf_counter()
+        instance = entry.factory()
+        elapsed = time.perf_counter() - start
+
+        entry.stat_keys = {path: file_stat_key(path) for path in entry.watch_paths}
+        entry.digests = {path: file_digest(path) for path in entry.watch_paths}
+        previous, entry.instance = entry.instance, instance
+        if previous is not None and hasattr(previous, 'close'):
+            # Release background workers held by the replaced instance, once
+            # calls that got it before the swap have had time to finish
+            retire = threading.Timer(RETIRED_SERVICE_GRACE_SECONDS, previous.close)
+            retire.daemon = True
+            retire.start()
+        entry.loaded = True
+
+        with entry.metrics_lock:
+            entry.metrics['loads'] += 1
+            entry.metrics['last_load_seconds'] = elapsed
+            entry.metrics['total_load_seconds'] += elapsed
+            entry.metrics['last_loaded_at'] = time.time()
+        print(f"Service '{entry.name}' loaded in {elapsed:.3f}s")
+
+    def _files_changed(self, entry):
+        """
+        Compare watched files against the state seen at load time
+        mtime/size is checked on every call; the content hash is only
+        recomputed when that cheap marker moves, so a plain `touch`
+        does not trigger a model reload
+        """
+        changed = False
+        for path in entry.watch_paths:
+            stat_key = file_stat_key(path)
+            if stat_key == entry.stat_keys.get(path):
+                continue
+            digest = file_digest(path)
+            if digest != entry.digests.get(path):
+                changed = True
+            else:
+                entry.stat_keys[path] = stat_key
+        return changed
+
+
+def _create_predictor():
+    from predict import CropDiseasePredictor
+    predictor = CropDiseasePredictor()
+    # Concurrent sessions share the predictor, so merge their forward passes
+    predictor.enable_batching(PREDICT_BATCH_SIZE, PREDICT_BATCH_DELAY_MS)
+    # Re-uploads and client retries of the same photo skip inference
+    predictor.enable_cache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, PREDICTION_CACHE_DB)
+    return predictor
+
+
+def _create_weather_service():
+    from weather_service import WeatherService
+    store = None
+    if WEATHER_OBSERVATIONS_DB:
+        from observation_store import ObservationStore
+        store = ObservationStore(WEATHER_OBSERVATIONS_DB, retention_days=WEATHER_RETENTION_DAYS)
+    return WeatherService(observation_store=store)
+
+
+def _create_treatment_advisor():
+    from treatment_advisor import TreatmentAdvisor
+    # Edits are swapped in by the advisor's own watcher, keeping its last good
+    # version on errors, so the registry does not watch the file itself
+    return TreatmentAdvisor(watch_interval=TREATMENTS_POLL_SECONDS)
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide registry with the platform services registered"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                registry = ServiceRegistry()
+                registry.register('predictor', _create_predictor,
+                                  watch_paths=(backend_path(DEFAULT_BACKEND), LABELS_PATH))
+                registry.register('weather_service', _create_weather_service)
+                registry.register('treatment_advisor', _create_treatment_advisor)
+                _default_registry = registry
+    return _default_registry
@@ -1,5 +1,76 @@
-import json
 import os
+from types import MappingProxyType
+
+from treatment_catalogue import COST_ESTIMATES, UNKNOWN_COST_ESTIMATE, treatment_id
+from treatment_database import TreatmentDatabase
+
+TREATMENTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'treatments.json')
+
+# Returned for diseases the catalogue has no entries for
+GENERIC_TREATMENT = MappingProxyType({
+    "name": "Organic Consultation",
+    "type": "Professional Advice",
+    "method": "Expert consultation",
+    "eco_rating": 5,
+    "cost": "Medium",
+    "ingredients": ("Professional assessment",),
+    "application": "Consult with organic farming specialist",
+    "effectiveness": "Variable"
+})
+
+PREVENTION_TIPS = MappingProxyType({
+    "Leaf Blight": (
+        "Ensure good air circulation between plants",
+        "Avoid overhead watering",
+        "Remove plant debris regularly",
+        "Rotate crops annually",
+        "Use disease-resistant varieties"
+    ),
+    "Powdery Mildew": (
+        "Maintain proper plant spacing",
+        "Reduce humidity around plants",
+        "Avoid overhead irrigation",
+        "Prune for better air flow",
+        "Apply preventive organic sprays"
+    ),
+    "Rust Disease": (
+        "Water at soil level, not on leaves",
+        "Remove infected plant material",
+        "Improve soil drainage",
+        "Use resistant plant varieties",
+        "Apply mulch to prevent soil splash"
+    ),
+    "Bacterial Spot": (
+        "Use drip irrigation instead of sprinklers",
+        "Disinfect tools between plants",
+        "Avoid working with wet plants",
+        "Remove and destroy infected plants",
+        "Practice crop rotation"
+    ),
+    "Mosaic Virus": (
+        "Control aphid and thrips populations",
+        "Remove weeds that harbor viruses",
+        "Use virus-free planting material",
+        "Install physical barriers",
+        "Practice good sanitation"
+    )
+})
+
+GENERAL_PREVENTION_TIPS = (
+    "Maintain healthy soil with organic matter",
+    "Practice integrated pest management",
+    "Monitor plants regularly for early detection",
+    "Use certified disease-free seeds",
+    "Maintain proper plant nutrition"
+)
+
+TREATMENT_TIMELINE = MappingProxyType({
+    "immediate": "Apply first treatment within 24 hours",
+    "short_term": "Monitor progress for 3-7 days",
+    "follow_up": "Apply second treatment if needed after 1 week",
+    "prevention": "Implement prevention measures ongoing"
+})
+
 
 class TreatmentAdvisor:
     """
@@ -7,24 +78,37 @@ class TreatmentAdvisor:
     Provides eco-friendly alternatives to chemical treatments
     """
     
-    def __init__(self):
-        self.treatments_db = self._load_treatments_database()
+    def __init__(self, data_path=TREATMENTS_PATH, watch_interval=None):
+        # Validated once; the built-in defaults are used if the file is missing or invalid
+        self.database = TreatmentDatabase(data_path, default_data=self._get_default_treatments())
+        if watch_interval:
+            self.database.start_watching(watch_interval)
     
-    def _load_treatments_database(self):
-        """
-        Load treatment database from JSON file or create default
-        """
-        try:
-            # Try to load from data directory
-            data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'treatments.json')
-            if os.path.exists(data_path):
-                with open(data_path, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        
-        # Return default treatments database
-        return self._get_default_treatments()
+    @property
+    def catalogue(self):
+        return self.database.snapshot.catalogue
+    
+    @property
+    def optimizer(self):
+        # Pareto fronts and query tables are built per disease on first use
+        return self.database.snapshot.optimizer
+    
+    @property
+    def version(self):
+        """Treatment database version; changes whenever a new file is loaded"""
+        return self.database.version
+    
+    @property
+    def treatments_db(self):
+        """Read-only disease -> treatments mapping, in file order"""
+        return self.catalogue.by_disease
+    
+    def reload(self):
+        """Pick up an edited treatments file now instead of at the next poll"""
+        return self.database.check_for_changes()
+    
+    def close(self):
+        self.database.close()
     
     def _get_default_treatments(self):
         """
@@ -205,79 +289,41 @@ class TreatmentAdvisor:
             ]
         }
     
-    def get_recommendations(self, disease_name):
+    def get_recommendations(self, disease_name, sort_by='recommended', **filters):
         """
         Get sustainable treatment recommendations for detected disease
+        Returns a shared, precomputed tuple of read-only treatment mappings,
+        by default greenest first, then most effective. Filters (crop,
+        certification, min_eco, ...) narrow the list through the search index;
+        the disease is always disease_name, so a 'disease' filter is ignored.
         """
-        treatments = self.treatments_db.get(disease_name, [])
+        filters.pop('disease', None)
+        if filters:
+            index = self.database.snapshot.index
+            treatments = index.search(disease=disease_name, sort_by=sort_by, limit=len(index),
+                                      **filters)['treatments']
+        else:
+            treatments = self.catalogue.treatments(disease_name, sort_by)
         
         if not treatments:
             # Return generic eco-friendly advice for unknown diseases
-            return [{
-                "name": "Organic Consultation",
-                "type": "Professional Advice",
-                "method": "Expert consultation",
-                "eco_rating": 5,
-                "cost": "Medium",
-                "ingredients": ["Professional assessment"],
-                "application": "Consult with organic farming specialist",
-                "effectiveness": "Variable"
-            }]
-        
-        # Sort by eco-rating (highest first) and effectiveness
-        treatments.sort(key=lambda x: (x['eco_rating'], int(x['effectiveness'].rstrip('%'))), reverse=True)
+            return (GENERIC_TREATMENT,)
         
         return treatments
     
+    def search_treatments(self, **query):
+        """Indexed search across all diseases; see TreatmentIndex.search"""
+        return self.database.snapshot.index.search(**query)
+    
+    def suggest(self, field, prefix, limit=10):
+        """Autocomplete for crop, disease, ingredient, type and certification values"""
+        return self.database.snapshot.index.suggest(field, prefix, limit)
+    
     def get_prevention_tips(self, disease_name):
         """
         Get prevention tips for specific diseases
         """
-        prevention_tips = {
-            "Leaf Blight": [
-                "Ensure good air circulation between plants",
-                "Avoid overhead watering",
-                "Remove plant debris regularly",
-                "Rotate crops annually",
-                "Use disease-resistant varieties"
-            ],
-            "Powdery Mildew": [
-                "Maintain proper plant spacing",
-                "Reduce humidity around plants",
-                "Avoid overhead irrigation",
-                "Prune for better air flow",
-                "Apply preventive organic sprays"
-            ],
-            "Rust Disease": [
-                "Water at soil level, not on leaves",
-                "Remove infected plant material",
-                "Improve soil drainage",
-                "Use resistant plant varieties",
-                "Apply mulch to prevent soil splash"
-            ],
-            "Bacterial Spot": [
-                "Use drip irrigation instead of sprinklers",
-                "Disinfect tools between plants",
-                "Avoid working with wet plants",
-                "Remove and destroy infected plants",
-                "Practice crop rotation"
-            ],
-            "Mosaic Virus": [
-                "Control aphid and thrips populations",
-                "Remove weeds that harbor viruses",
-                "Use virus-free planting material",
-                "Install physical barriers",
-                "Practice good sanitation"
-            ]
-        }
-        
-        return prevention_tips.get(disease_name, [
-            "Maintain healthy soil with organic matter",
-            "Practice integrated pest management",
-            "Monitor plants regularly for early detection",
-            "Use certified disease-free seeds",
-            "Maintain proper plant nutrition"
-        ])
+        return PREVENTION_TIPS.get(disease_name, GENERAL_PREVENTION_TIPS)
     
     def get_sustainability_score(self, treatments):
         """
@@ -291,39 +337,66 @@ class TreatmentAdvisor:
         
         return round(avg_score, 1)
     
-    def generate_treatment_plan(self, disease_name, severity="medium"):
+    def generate_treatment_plan(self, disease_name, severity="medium", budget=None, min_eco=None):
         """
         Generate comprehensive treatment plan based on disease and severity
+        With a budget and/or minimum eco score, the most effective treatment
+        set meeting them is picked from the optimizer's Pareto front instead
         """
-        treatments = self.get_recommendations(disease_name)
+        # One snapshot for the whole plan, even if a reload lands meanwhile
+        snapshot = self.database.snapshot
+        treatments = snapshot.catalogue.treatments(disease_name) or (GENERIC_TREATMENT,)
         prevention_tips = self.get_prevention_tips(disease_name)
+        max_treatments = 1 if severity.lower() == "low" else 2
         
-        # Select treatments based on severity
-        if severity.lower() == "high":
-            selected_treatments = treatments[:2]  # Use top 2 treatments
-        elif severity.lower() == "low":
-            selected_treatments = treatments[:1]  # Use only the most eco-friendly
+        if budget is None and min_eco is None:
+            # Select treatments based on severity
+            if severity.lower() == "high":
+                selected_treatments = treatments[:2]  # Use top 2 treatments
+            elif severity.lower() == "low":
+                selected_treatments = treatments[:1]  # Use only the most eco-friendly
+            else:
+                selected_treatments = treatments[:2]  # Default to top 2
+            option = None
         else:
-            selected_treatments = treatments[:2]  # Default to top 2
+            option = snapshot.optimizer.best_plan(
+                disease_name,
+                budget=float('inf') if budget is None else budget,
+                min_eco=0.0 if min_eco is None else min_eco,
+                max_treatments=max_treatments
+            )
+            selected_treatments = list(option.treatments) if option else []
         
         plan = {
             "disease": disease_name,
             "severity": severity,
+            "treatments_version": snapshot.version,
             "immediate_actions": selected_treatments,
             "prevention_tips": prevention_tips,
             "sustainability_score": self.get_sustainability_score(selected_treatments),
             "estimated_cost": self._estimate_total_cost(selected_treatments),
             "timeline": self._generate_timeline(selected_treatments)
         }
+        if budget is not None or min_eco is not None:
+            plan["constraints"] = {"budget": budget, "min_eco": min_eco}
+            plan["expected_effectiveness"] = option.effectiveness if option else None
         
         return plan
     
+    def plan_farm(self, plots, total_budget, min_eco=0.0):
+        """
+        Treatment sets for many plots (one disease name per plot) sharing one budget
+        """
+        snapshot = self.database.snapshot
+        result = snapshot.optimizer.plan_farm(plots, total_budget, min_eco)
+        result['treatments_version'] = snapshot.version
+        return result
+    
     def _estimate_total_cost(self, treatments):
         """
         Estimate total cost for treatment plan
         """
-        cost_mapping = {"Very Low": 5, "Low": 15, "Medium": 35, "High": 75}
-        total_cost = sum(cost_mapping.get(treatment['cost'], 25) for treatment in treatments)
+        total_cost = sum(COST_ESTIMATES.get(treatment['cost'], UNKNOWN_COST_ESTIMATE) for treatment in treatments)
         
         if total_cost < 20:
             return "Very Low ($5-20)"
@@ -338,9 +411,4 @@ class TreatmentAdvisor:
         """
         Generate treatment timeline
         """
-        return {
-            "immediate": "Apply first treatment within 24 hours",
-            "short_term": "Monitor progress for 3-7 days",
-            "follow_up": "Apply second treatment if needed after 1 week",
-            "prevention": "Implement prevention measures ongoing"
-        }
\ No newline at end of file
+        return TREATMENT_TIMELINE
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Immutable treatment catalogue
+data/treatments.json is parsed and validated once into slotted records with
+effectiveness, cost tier and eco rating already converted to numbers. Each
+disease's treatments are ranked up front for every sort key, so a lookup is
+one dict access that returns a shared tuple of read-only views (mappings with
+the same keys as the JSON entries). Nothing handed out can be mutated, so
+concurrent sessions can share one catalogue safely.
+"""
+
+import collections
+import json
+import re
+from types import MappingProxyType
+
+COST_TIERS = ('Very Low', 'Low', 'Medium', 'High')
+# Rough cost per treatment by tier, in dollars
+COST_ESTIMATES = {"Very Low": 5, "Low": 15, "Medium": 35, "High": 75}
+UNKNOWN_COST_ESTIMATE = 25
+
+# Ranking orders; 'recommended' is the advisor's default (greener first, then more effective)
+SORT_KEYS = {
+    'recommended': lambda t: (t.eco_rating, t.effectiveness_rank),
+    'eco_rating': lambda t: t.eco_rating,
+    'effectiveness': lambda t: t.effectiveness_rank,
+    'cost': lambda t: -t.cost_rank,
+}
+
+REQUIRED_FIELDS = ('name', 'type', 'method', 'eco_rating', 'cost', 'effectiveness')
+TEXT_FIELDS = ('name', 'type', 'method', 'application', 'frequency')
+# Optional lists of strings; crops and certifications (e.g. "OMRI Approved") are searchable keys
+LIST_FIELDS = ('ingredients', 'crops', 'certifications')
+UNSTATED_EFFECTIVENESS = ('Variable',)
+
+
+def treatment_id(treatment):
+    """Stable identifier for a treatment, derived from its name"""
+    return re.sub(r'[^a-z0-9]+', '-', treatment['name'].lower()).strip('-')
+
+
+def parse_effectiveness(value):
+    """'85%' -> 85; None for values such as 'Variable'"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*%?\s*', str(value))
+    return int(float(match.group(1))) if match else None
+
+
+class Treatment:
+    """One catalogue entry: parsed fields plus a read-only view of the original record"""
+
+    __slots__ = ('id', 'disease', 'name', 'eco_rating', 'cost', 'cost_rank', 'cost_estimate',
+                 'effectiveness', 'effectiveness_rank', 'view')
+
+    def __init__(self, disease, record):
+        if not isinstance(record, dict):
+            raise ValueError(f"{disease}: each treatment must be an object")
+        missing = [field for field in REQUIRED_FIELDS if field not in record]
+        if missing:
+            raise ValueError(f"{disease}: treatment {record.get('name', '?')!r} is missing {', '.join(missing)}")
+        for field in TEXT_FIELDS:
+            if field in record and (not isinstance(record[field], str) or not record[field].strip()):
+                raise ValueError(f"{disease}: {record['name']!r} {field} must be a non-empty string")
+        eco_rating = record['eco_rating']
+        if isinstance(eco_rating, bool) or not isinstance(eco_rating, int) or not 1 <= eco_rating <= 5:
+            raise ValueError(f"{disease}: {record['name']!r} eco_rating must be an integer from 1 to 5")
+        if record['cost'] not in COST_TIERS:
+            raise ValueError(f"{disease}: {record['name']!r} cost must be one of {', '.join(COST_TIERS)}")
+        effectiveness = parse_effectiveness(record['effectiveness'])
+        if (effectiveness is None and record['effectiveness'] not in UNSTATED_EFFECTIVENESS
+                or effectiveness is not None and not 0 <= effectiveness <= 100):
+            raise ValueError(f"{disease}: {record['name']!r} effectiveness must be a percentage or 'Variable'")
+        for field in LIST_FIELDS:
+            values = record.get(field, [])
+            if not isinstance(values, list) or not all(isinstance(item, str) for item in values):
+                raise ValueError(f"{disease}: {record['name']!r} {field} must be a list of strings")
+
+        self.disease = disease
+        self.name = record['name']
+        self.id = treatment_id(record)
+        self.eco_rating = eco_rating
+        self.cost = record['cost']
+        self.cost_rank = COST_TIERS.index(self.cost)
+        self.cost_estimate = COST_ESTIMATES[self.cost]
+        self.effectiveness = effectiveness
+        # Unparseable effectiveness ranks below any stated percentage
+        self.effectiveness_rank = -1 if self.effectiveness is None else self.effectiveness
+        self.view = MappingProxyType({
+            key: tuple(value) if isinstance(value, list) else value for key, value in record.items()
+        })
+
+    def __repr__(self):
+        return f"Treatment({self.id!r}, disease={self.disease!r})"
+
+
+class TreatmentCatalogue:
+    """
+    Treatments by disease with precomputed rankings
+    - treatments(disease, sort_by) -> tuple of read-only views, O(1)
+    - get(treatment_id) -> Treatment record
+    """
+
+    def __init__(self, data):
+        if not isinstance(data, dict):
+            raise ValueError("treatment database must map disease names to treatment lists")
+
+        records = {}
+        by_id = {}
+        for disease, entries in data.items():
+            if not isinstance(disease, str) or not disease.strip():
+                raise ValueError("disease names must be non-empty strings")
+            if not isinstance(entries, list):
+                raise ValueError(f"{disease}: treatments must be a list")
+            records[disease] = tuple(Treatment(disease, entry) for entry in entries)
+            ids = collections.Counter(record.id for record in records[disease])
+            duplicates = sorted(i for i, count in ids.items() if count > 1)
+            if duplicates:
+                raise ValueError(f"{disease}: duplicate treatments {', '.join(duplicates)}")
+            for record in records[disease]:
+                by_id.setdefault(record.id, record)
+
+        self._records = records
+        self._by_id = by_id
+        # Stable sorts, so ties keep file order exactly as list.sort(reverse=True) did
+        self._rankings = {
+            (disease, sort_by): tuple(t.view for t in sorted(treatments, key=key, reverse=True))
+            for disease, treatments in records.items()
+            for sort_by, key in SORT_KEYS.items()
+        }
+        self.by_disease = MappingProxyType({
+            disease: tuple(t.view for t in treatments) for disease, treatments in records.items()
+        })
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __contains__(self, disease):
+        return disease in self._records
+
+    def __len__(self):
+        return sum(len(treatments) for treatments in self._records.values())
+
+    def diseases(self):
+        return tuple(self._records)
+
+    def treatments(self, disease, sort_by='recommended'):
+        """Ranked read-only treatment views for a disease (empty tuple if unknown)"""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {sort_by!r}; expected one of {', '.join(SORT_KEYS)}")
+        return self._rankings.get((disease, sort_by), ())
+
+    def records(self, disease):
+        """Parsed Treatment records for a disease, in file order"""
+        return self._records.get(disease, ())
+
+    def get(self, treatment_id):
+        return self._by_id.get(treatment_id)
@@ -0,0 +1,138 @@
+"""
+Versioned, hot-reloadable treatment database
+data/treatments.json is parsed and validated into an immutable snapshot (the
+catalogue plus its search index and optimizer). Readers take the current
+snapshot with one attribute read, so a request never sees half of an old
+file and half of a new one. check_for_changes() - called by the optional polling watcher, or
+directly - loads a changed file and swaps the snapshot in one assignment.
+Each successful swap bumps the version number, which downstream caches can
+use as part of their key. A file that fails to parse or validate is
+reported and the last good snapshot stays in service.
+"""
+
+import threading
+import time
+
+from service_registry import file_digest, file_stat_key
+from treatment_catalogue import TreatmentCatalogue
+from treatment_index import TreatmentIndex
+from treatment_optimizer import TreatmentOptimizer
+
+
+class TreatmentSnapshot:
+    """One loaded version of the treatment database"""
+
+    __slots__ = ('version', 'catalogue', 'index', 'optimizer', 'source', 'digest', 'loaded_at')
+
+    def __init__(self, version, catalogue, source, digest=None):
+        self.version = version
+        self.catalogue = catalogue
+        # Built here, off the request path: reloads run on the watcher thread
+        self.index = TreatmentIndex(catalogue)
+        # Pareto tables belong to the data they were built from, so they are swapped with it
+        self.optimizer = TreatmentOptimizer(catalogue)
+        self.source = source  # file path, or 'built-in' for the fallback data
+        self.digest = digest
+        self.loaded_at = time.time()
+
+    def __repr__(self):
+        return f"TreatmentSnapshot(version={self.version}, source={self.source!r}, treatments={len(self.catalogue)})"
+
+
+class TreatmentDatabase:
+    """
+    Current treatment snapshot for a file, reloaded when the file changes
+    - snapshot / version: what readers should use right now
+    - check_for_changes(): reload if the file's contents changed
+    - start_watching(interval) / close(): background polling thread
+    """
+
+    def __init__(self, path, default_data=None):
+        self.path = path
+        self.default_data = default_data
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self.stats = {'reloads': 0, 'failed_reloads': 0, 'checks': 0, 'last_error': None}
+
+        self._stat_key = file_stat_key(path)
+        try:
+            self.snapshot = self._load(1)
+        except (OSError, ValueError) as e:
+            if default_data is None:
+                raise
+            print(f"Invalid treatment database {path}: {e}; using built-in treatments")
+            self.stats['last_error'] = str(e)
+            self.snapshot = TreatmentSnapshot(1, TreatmentCatalogue(default_data), 'built-in')
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def _load(self, version):
+        digest = file_digest(self.path)
+        if digest is None:
+            raise OSError(f"{self.path} does not exist")
+        return TreatmentSnapshot(version, TreatmentCatalogue.from_file(self.path), self.path, digest)
+
+    def check_for_changes(self):
+        """
+        Reload if the file changed since the last check; True if a new
+        snapshot was installed. Only a content change (not a bare touch)
+        produces a new version.
+        """
+        stat_key = file_stat_key(self.path)
+        if stat_key == self._stat_key:
+            return False
+
+        with self._lock:
+            if stat_key == self._stat_key:
+                return False
+            self.stats['checks'] += 1
+            self._stat_key = stat_key
+            current = self.snapshot
+            if stat_key is not None and file_digest(self.path) == current.digest:
+                return False
+            try:
+                snapshot = self._load(current.version + 1)
+            except (OSError, ValueError) as e:
+                self.stats['failed_reloads'] += 1
+                self.stats['last_error'] = str(e)
+                print(f"Could not reload treatment database from {self.path}: {e} "
+                      f"(keeping version {current.version})")
+                return False
+            self.snapshot = snapshot
+            self.stats['reloads'] += 1
+            self.stats['last_error'] = None
+            print(f"Loaded treatment database version {snapshot.version} from {self.path}")
+            return True
+
+    def start_watching(self, interval=2.0):
+        """Poll the file every interval seconds on a daemon thread"""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                         name='treatment-db-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                print(f"Treatment database watcher error: {e}")
+
+    def close(self):
+        """Stop the watcher thread, if any"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def get_stats(self):
+        snapshot = self.snapshot
+        return dict(self.stats, version=snapshot.version, source=snapshot.source,
+                    treatments=len(snapshot.catalogue), loaded_at=snapshot.loaded_at,
+                    watching=self._watcher is not None)
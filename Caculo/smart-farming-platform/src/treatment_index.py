@@ -0,0 +1,223 @@
+"""
+In-memory inverted index over a treatment catalogue
+Built once per catalogue snapshot, so it never needs updating in place.
+
+Records are numbered in the catalogue's 'recommended' order. Each key
+(crop, disease, ingredient, type, certification) and each full-text token
+maps to a sorted int32 array of record numbers. Text tokens are stored
+CSR-style: a sorted vocabulary with one contiguous postings array, so a
+prefix covers a contiguous slice found with two bisects.
+
+A query starts from its smallest term and narrows that candidate list by
+each other term (binary search into a sorted postings array, or a boolean
+mask when the term is large or spans several values). Matches come out in
+record order, which is already the default ranking. For other sort keys a
+small match set is ranked with argpartition; a large one is read off a
+precomputed ordering until the page is full.
+"""
+
+import bisect
+import re
+
+import numpy as np
+
+from treatment_catalogue import COST_TIERS, SORT_KEYS
+
+KEY_FIELDS = {
+    'crop': 'crops',
+    'disease': None,  # the record's disease, not a field of the entry
+    'ingredient': 'ingredients',
+    'type': 'type',
+    'certification': 'certifications',
+}
+TEXT_FIELDS = ('name', 'type', 'method', 'application', 'ingredients')
+DEFAULT_LIMIT = 20
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalize(value):
+    """Key form of a value: case-folded, whitespace collapsed"""
+    return ' '.join(str(value).casefold().split())
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).casefold())
+
+
+def _add(groups, key, i):
+    ids = groups.get(key)
+    if ids is None:
+        groups[key] = [i]
+    elif ids[-1] != i:  # records are visited in order, so lists stay sorted and unique
+        ids.append(i)
+
+
+class TreatmentIndex:
+    """
+    Filtered, ranked treatment search
+    - search(text=..., crop=..., disease=..., ingredient=..., type=...,
+      certification=..., min_eco=..., max_cost=..., sort_by=..., limit=...)
+    - suggest(field, prefix): known key values starting with prefix
+    """
+
+    def __init__(self, catalogue):
+        file_order = [record for disease in catalogue.diseases() for record in catalogue.records(disease)]
+        # Stable sorts with reverse=True keep file order among ties, as the catalogue does
+        records = sorted(file_order, key=SORT_KEYS['recommended'], reverse=True)
+        number = {id(record): i for i, record in enumerate(records)}
+        self.records = tuple(records)
+        self.views = tuple(record.view for record in records)
+        count = len(records)
+        self.all_ids = np.arange(count, dtype=np.int32)
+
+        # orders[sort_by]: record numbers best first; ranks[sort_by]: position of each record
+        self.orders, self.ranks = {}, {}
+        for sort_by, key in SORT_KEYS.items():
+            order = np.array([number[id(r)] for r in sorted(file_order, key=key, reverse=True)], dtype=np.int32)
+            rank = np.empty(count, dtype=np.int32)
+            rank[order] = self.all_ids
+            self.orders[sort_by], self.ranks[sort_by] = order, rank
+
+        self.eco_ratings = np.array([r.eco_rating for r in records], dtype=np.int8)
+        self.cost_ranks = np.array([r.cost_rank for r in records], dtype=np.int8)
+        self.effectiveness = np.array([r.effectiveness_rank for r in records], dtype=np.int16)
+
+        keys = {name: {} for name in KEY_FIELDS}
+        tokens = {}
+        for i, record in enumerate(records):
+            view = record.view
+            for name, field in KEY_FIELDS.items():
+                values = (record.disease,) if field is None else view.get(field, ())
+                for value in (values,) if isinstance(values, str) else values:
+                    _add(keys[name], normalize(value), i)
+            for field in TEXT_FIELDS:
+                values = view.get(field, ())
+                for value in (values,) if isinstance(values, str) else values:
+                    for token in _TOKEN.findall(value.casefold()):
+                        _add(tokens, token, i)
+
+        self.keys = {name: {value: np.array(ids, dtype=np.int32) for value, ids in groups.items()}
+                     for name, groups in keys.items()}
+        self.key_vocabulary = {name: sorted(groups) for name, groups in keys.items()}
+
+        self.vocabulary = sorted(tokens)
+        lengths = np.fromiter((len(tokens[token]) for token in self.vocabulary), dtype=np.int64,
+                              count=len(self.vocabulary))
+        self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        self.postings = np.fromiter((i for token in self.vocabulary for i in tokens[token]),
+                                    dtype=np.int32, count=int(self.offsets[-1]))
+
+    def __len__(self):
+        return len(self.records)
+
+    def _token_term(self, token, prefix=False):
+        """(postings, exact): exact postings are sorted and unique"""
+        lo = bisect.bisect_left(self.vocabulary, token)
+        if prefix:
+            hi = bisect.bisect_left(self.vocabulary, token + '\uffff')
+        else:
+            hi = lo + 1 if lo < len(self.vocabulary) and self.vocabulary[lo] == token else lo
+        return self.postings[self.offsets[lo]:self.offsets[hi]], hi - lo <= 1
+
+    def _key_term(self, name, value):
+        values = [value] if isinstance(value, str) else list(value)
+        postings = [p for p in (self.keys[name].get(normalize(v)) for v in values) if p is not None]
+        if len(postings) == 1:
+            return postings[0], True
+        return (np.concatenate(postings) if postings else np.empty(0, dtype=np.int32)), not postings
+
+    def _mask(self, postings):
+        mask = np.zeros(len(self.records), dtype=bool)
+        mask[postings] = True
+        return mask
+
+    def _narrow(self, matches, postings, exact):
+        """Candidates (sorted record numbers) that also appear in a term"""
+        if not len(postings):
+            return postings
+        if exact and len(matches) * 16 < len(postings):
+            found = np.searchsorted(postings, matches)
+            return matches[postings[np.minimum(found, len(postings) - 1)] == matches]
+        return matches[self._mask(postings)[matches]]
+
+    def search(self, text=None, prefix=False, min_eco=None, max_cost=None, min_effectiveness=None,
+               sort_by='recommended', limit=DEFAULT_LIMIT, offset=0, **keys):
+        """
+        Treatments matching every given term, best first
+        Key filters (crop, disease, ingredient, type, certification) match
+        whole values, ignoring case; a list matches any of its values.
+        text matches words anywhere in the name, type, method, application
+        or ingredients; with prefix=True the last word may be incomplete.
+        Text without any word characters matches nothing.
+        Returns {'total': matches, 'treatments': page of views}.
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {sort_by!r}; expected one of {', '.join(SORT_KEYS)}")
+        unknown = set(keys) - set(KEY_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown search keys {', '.join(sorted(unknown))}; expected {', '.join(KEY_FIELDS)}")
+        if max_cost is not None and max_cost not in COST_TIERS:
+            raise ValueError(f"max_cost must be one of {', '.join(COST_TIERS)}")
+
+        terms = [self._key_term(name, value) for name, value in keys.items() if value is not None]
+        if text:
+            words = tokenize(text)
+            if not words:
+                # Nothing searchable (only punctuation): match nothing, not everything
+                terms.append((np.empty(0, dtype=np.int32), True))
+            # Only the last word is completed, so "neem o" finds "neem oil"
+            terms.extend(self._token_term(word, prefix and position == len(words) - 1)
+                         for position, word in enumerate(words))
+
+        if terms:
+            terms.sort(key=lambda term: len(term[0]))
+            postings, exact = terms[0]
+            matches = postings if exact else np.flatnonzero(self._mask(postings)).astype(np.int32)
+            for postings, exact in terms[1:]:
+                if not len(matches):
+                    break
+                matches = self._narrow(matches, postings, exact)
+        else:
+            matches = self.all_ids
+        if min_eco is not None:
+            matches = matches[self.eco_ratings[matches] >= min_eco]
+        if max_cost is not None:
+            matches = matches[self.cost_ranks[matches] <= COST_TIERS.index(max_cost)]
+        if min_effectiveness is not None:
+            matches = matches[self.effectiveness[matches] >= min_effectiveness]
+
+        total, end = len(matches), offset + limit
+        if sort_by == 'recommended' or end <= 0:
+            page = matches[offset:end]
+        elif total == len(self.records):
+            page = self.orders[sort_by][offset:end]
+        elif total * 8 > len(self.records):
+            # Dense: walk the precomputed order until the page is covered
+            member = self._mask(matches)
+            order = self.orders[sort_by]
+            size = max(end * len(self.records) // max(total, 1) * 2, 256)
+            while True:
+                head = order[:size]
+                hits = head[member[head]]
+                if len(hits) >= end or size >= len(order):
+                    break
+                size *= 4
+            page = hits[offset:end]
+        else:
+            ranks = self.ranks[sort_by][matches]
+            if end < total:
+                keep = np.argpartition(ranks, end)[:end]
+                matches, ranks = matches[keep], ranks[keep]
+            page = matches[np.argsort(ranks)][offset:end]
+        return {'total': total, 'treatments': tuple(self.views[i] for i in page.tolist())}
+
+    def suggest(self, field, prefix, limit=DEFAULT_LIMIT):
+        """Key values (normalized) of a field starting with prefix, alphabetically"""
+        if field not in KEY_FIELDS:
+            raise ValueError(f"Unknown key {field!r}; expected one of {', '.join(KEY_FIELDS)}")
+        vocabulary = self.key_vocabulary[field]
+        prefix = normalize(prefix)
+        start = bisect.bisect_left(vocabulary, prefix)
+        stop = bisect.bisect_left(vocabulary, prefix + '\uffff')
+        return vocabulary[start:min(stop, start + limit)]
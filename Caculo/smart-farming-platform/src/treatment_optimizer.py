@@ -0,0 +1,247 @@
+"""
+Multi-objective treatment optimizer
+Every set of up to max_treatments treatments for a disease is scored on
+three objectives:
+
+    cost            sum of the tier cost estimates (lower is better)
+    eco_score       mean eco rating, as in the advisor's sustainability score
+    effectiveness   chance at least one treatment works, 1 - prod(1 - e)
+
+Only Pareto-optimal sets are kept. From that front, two query tables are
+built once per disease and cached:
+
+- best[eco_level, cost_level]: index of the most effective set within a
+  per-plot budget and eco floor. A batch of plots then costs two
+  searchsorted calls and a gather per disease.
+- per eco level, the upper convex hull of (cost, effectiveness) starting
+  from "no treatment". A farm-wide budget is spent greedily on hull steps,
+  best effectiveness per dollar first. This is optimal for the relaxed
+  problem, up to the one step the budget only partly covers.
+"""
+
+import itertools
+import math
+import threading
+
+import numpy as np
+
+MAX_TREATMENTS = 2   # plans use at most two treatments at once
+_ECO_EPSILON = 1e-9  # mean eco scores are floats; 4.5 must satisfy min_eco=4.5
+
+
+class TreatmentSet:
+    """One candidate plan for a disease"""
+
+    __slots__ = ('disease', 'treatment_ids', 'treatments', 'cost', 'eco_score', 'effectiveness')
+
+    def __init__(self, disease, records):
+        self.disease = disease
+        self.treatment_ids = tuple(record.id for record in records)
+        self.treatments = tuple(record.view for record in records)
+        self.cost = sum(record.cost_estimate for record in records)
+        self.eco_score = round(sum(record.eco_rating for record in records) / len(records), 2)
+        # Unstated effectiveness ("Variable") counts as no protection
+        failure = math.prod(1 - (record.effectiveness or 0) / 100 for record in records)
+        self.effectiveness = round(1 - failure, 4)
+
+    def dominates(self, other):
+        return (self.cost <= other.cost and self.eco_score >= other.eco_score
+                and self.effectiveness >= other.effectiveness
+                and (self.cost, self.eco_score, self.effectiveness)
+                != (other.cost, other.eco_score, other.effectiveness))
+
+    def to_dict(self):
+        return {
+            'disease': self.disease,
+            'treatment_ids': list(self.treatment_ids),
+            'treatments': [treatment['name'] for treatment in self.treatments],
+            'cost': self.cost,
+            'eco_score': self.eco_score,
+            'effectiveness': self.effectiveness
+        }
+
+    def __repr__(self):
+        return (f"TreatmentSet({'+'.join(self.treatment_ids)}, cost={self.cost}, "
+                f"eco={self.eco_score}, effectiveness={self.effectiveness})")
+
+
+class _DiseaseTables:
+    """Pareto front and query tables for one disease"""
+
+    def __init__(self, disease, records, max_treatments):
+        candidates = [TreatmentSet(disease, combo)
+                      for size in range(1, min(max_treatments, len(records)) + 1)
+                      for combo in itertools.combinations(records, size)]
+        front = [c for c in candidates if not any(other.dominates(c) for other in candidates)]
+        # Identical scores: keep the smaller (earlier) set
+        unique = {}
+        for option in front:
+            unique.setdefault((option.cost, option.eco_score, option.effectiveness), option)
+        self.front = tuple(sorted(unique.values(), key=lambda o: (o.cost, -o.effectiveness, -o.eco_score)))
+
+        self.costs = np.array([o.cost for o in self.front], dtype=np.float64)
+        self.eco_scores = np.array([o.eco_score for o in self.front], dtype=np.float64)
+        self.effectiveness = np.array([o.effectiveness for o in self.front], dtype=np.float64)
+        self.eco_levels = np.unique(self.eco_scores)
+        self.cost_levels = np.unique(self.costs)
+
+        # best[e, c]: most effective option with eco >= eco_levels[e] and cost <= cost_levels[c]
+        self.best = np.full((len(self.eco_levels), len(self.cost_levels)), -1, dtype=np.int32)
+        self.hulls = []
+        for e, level in enumerate(self.eco_levels):
+            allowed = [i for i in range(len(self.front)) if self.eco_scores[i] >= level]
+            best, position = -1, 0
+            for c, cost in enumerate(self.cost_levels):
+                while position < len(allowed) and self.costs[allowed[position]] <= cost:
+                    i = allowed[position]
+                    if best < 0 or self.effectiveness[i] > self.effectiveness[best]:
+                        best = i
+                    position += 1
+                self.best[e, c] = best
+            self.hulls.append(self._hull(allowed))
+
+    def _hull(self, allowed):
+        """Upper concave hull from (0, 0) as [(option index, cost, effectiveness)]"""
+        hull = [(-1, 0.0, 0.0)]
+        for i in sorted(allowed, key=lambda i: (self.costs[i], -self.effectiveness[i])):
+            cost, effect = self.costs[i], self.effectiveness[i]
+            if effect <= hull[-1][2]:
+                continue  # costs more without doing better
+            while len(hull) >= 2:
+                (_, c1, e1), (_, c2, e2) = hull[-2], hull[-1]
+                # Drop the middle point if it lies on or below the line to the new point
+                if (e2 - e1) * (cost - c1) <= (effect - e1) * (c2 - c1):
+                    hull.pop()
+                else:
+                    break
+            hull.append((i, cost, effect))
+        return hull
+
+    def eco_index(self, min_eco):
+        """Row of best/hulls for an eco floor (len(eco_levels) if nothing qualifies)"""
+        return np.searchsorted(self.eco_levels, np.asarray(min_eco, dtype=np.float64) - _ECO_EPSILON, side='left')
+
+
+class TreatmentOptimizer:
+    """
+    Pareto-optimal treatment sets per disease, with batched plan queries
+    - pareto_front(disease)
+    - best_plans(diseases, budget, min_eco): per-plot budget and eco floor
+    - plan_farm(diseases, total_budget, min_eco): one budget shared by all plots
+    """
+
+    def __init__(self, catalogue, max_treatments=MAX_TREATMENTS):
+        self.catalogue = catalogue
+        self.max_treatments = max_treatments
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _disease_tables(self, disease, max_treatments=None):
+        key = (disease, max_treatments or self.max_treatments)
+        tables = self._tables.get(key)
+        if tables is None and disease in self.catalogue:
+            with self._lock:
+                tables = self._tables.get(key)
+                if tables is None:
+                    tables = _DiseaseTables(disease, self.catalogue.records(disease), key[1])
+                    self._tables[key] = tables
+        return tables
+
+    def pareto_front(self, disease, max_treatments=None):
+        """Non-dominated treatment sets, cheapest first (empty for unknown diseases)"""
+        tables = self._disease_tables(disease, max_treatments)
+        return tables.front if tables else ()
+
+    @staticmethod
+    def _groups(diseases):
+        """disease -> indices of the plots that have it, in input order"""
+        groups = {}
+        for index, disease in enumerate(diseases):
+            groups.setdefault(disease, []).append(index)
+        return {disease: np.array(indices) for disease, indices in groups.items()}
+
+    def best_plans(self, diseases, budget=math.inf, min_eco=0.0, max_treatments=None):
+        """
+        Most effective affordable set per plot; budget and min_eco are scalars
+        or per-plot arrays. Plots with no feasible set (or an unknown disease)
+        get None.
+        """
+        count = len(diseases)
+        budget = np.broadcast_to(np.asarray(budget, dtype=np.float64), (count,))
+        min_eco = np.broadcast_to(np.asarray(min_eco, dtype=np.float64), (count,))
+        plans = [None] * count
+
+        for disease, indices in self._groups(diseases).items():
+            tables = self._disease_tables(disease, max_treatments)
+            if tables is None or not tables.front:
+                continue
+            eco = tables.eco_index(min_eco[indices])
+            cost = np.searchsorted(tables.cost_levels, budget[indices], side='right') - 1
+            feasible = (eco < len(tables.eco_levels)) & (cost >= 0)
+            choice = np.full(len(indices), -1, dtype=np.int32)
+            choice[feasible] = tables.best[eco[feasible], cost[feasible]]
+            for index, option in zip(indices.tolist(), choice.tolist()):
+                if option >= 0:
+                    plans[index] = tables.front[option]
+        return plans
+
+    def best_plan(self, disease, budget=math.inf, min_eco=0.0, max_treatments=None):
+        return self.best_plans([disease], budget, min_eco, max_treatments)[0]
+
+    def plan_farm(self, diseases, total_budget, min_eco=0.0, max_treatments=None):
+        """
+        Share one budget across plots to maximise total expected effectiveness
+        Every plot starts untreated; hull upgrades are bought in order of
+        effectiveness gained per dollar. Plots of the same disease are
+        interchangeable, so each upgrade is bought for as many of them as the
+        budget allows, and later upgrades only for plots that already have
+        the earlier ones.
+        """
+        groups = self._groups(diseases)
+        steps = []
+        hulls = {}
+        for disease, indices in groups.items():
+            tables = self._disease_tables(disease, max_treatments)
+            if tables is None or not tables.front:
+                continue
+            eco = int(tables.eco_index(min_eco))
+            if eco >= len(tables.eco_levels):
+                continue
+            hull = tables.hulls[eco]
+            hulls[disease] = (tables, hull, [0] * (len(hull) - 1))
+            for k in range(1, len(hull)):
+                extra_cost = hull[k][1] - hull[k - 1][1]
+                gain = hull[k][2] - hull[k - 1][2]
+                steps.append((gain / extra_cost if extra_cost else math.inf, disease, k, extra_cost))
+
+        remaining = float(total_budget)
+        # Per disease, hull slopes decrease, so this order respects step order
+        for _, disease, k, extra_cost in sorted(steps, key=lambda s: (-s[0], s[2])):
+            tables, hull, bought = hulls[disease]
+            eligible = bought[k - 2] if k > 1 else len(groups[disease])
+            take = eligible if extra_cost == 0 else min(eligible, int(remaining // extra_cost))
+            bought[k - 1] = take
+            remaining -= take * extra_cost
+
+        plans = [None] * len(diseases)
+        total_cost = 0.0
+        total_effectiveness = 0.0
+        for disease, (tables, hull, bought) in hulls.items():
+            for position, index in enumerate(groups[disease].tolist()):
+                level = sum(1 for count in bought if count > position)
+                if level:
+                    option = tables.front[hull[level][0]]
+                    plans[index] = option
+                    total_cost += option.cost
+                    total_effectiveness += option.effectiveness
+
+        treated = sum(plan is not None for plan in plans)
+        return {
+            'plans': plans,
+            'total_cost': total_cost,
+            'budget': float(total_budget),
+            'min_eco': float(min_eco),
+            'treated_plots': treated,
+            'untreated_plots': len(plans) - treated,
+            'mean_effectiveness': round(total_effectiveness / len(plans), 4) if plans else 0.0
+        }
@@ -0,0 +1,169 @@
+"""
+Vectorized colour-statistics engine for visual disease analysis
+Shared by the CNN predictor's fallback, the deployment (visual-only)
+predictor and the demo detector. All functions work on whole batches of
+uint8 pixels stacked as (N, H, W, C) colour or (N, H, W) grayscale arrays.
+"""
+
+import numpy as np
+
+IMAGE_SIZE = (224, 224)
+
+# Fallback heuristic outcomes, in rule order (last entry is the default)
+FALLBACK_LABELS = np.array([
+    'Healthy',
+    'Powdery Mildew',
+    'Rust Disease',
+    'Leaf Blight',
+    'Bacterial Spot',
+    'Mosaic Virus'
+], dtype=object)
+FALLBACK_CONFIDENCES = np.array([85.0, 82.0, 80.0, 78.0, 75.0, 72.0])
+
+GRAYSCALE_LABELS = np.array(['Powdery Mildew', 'Leaf Blight', 'Healthy'], dtype=object)
+GRAYSCALE_CONFIDENCES = np.array([70.0, 70.0, 65.0])
+
+# Demo detector class order and its per-rule distributions (last row is the default)
+DEMO_CLASSES = [
+    "Healthy",
+    "Leaf Blight",
+    "Powdery Mildew",
+    "Rust Disease",
+    "Bacterial Spot",
+    "Mosaic Virus"
+]
+DEMO_DISTRIBUTIONS = np.array([
+    [0.90, 0.03, 0.02, 0.02, 0.02, 0.01],  # Healthy: bright green
+    [0.05, 0.10, 0.05, 0.70, 0.08, 0.02],  # Rust Disease: reddish-brown spots
+    [0.08, 0.05, 0.75, 0.05, 0.05, 0.02],  # Powdery Mildew: white powdery patches
+    [0.05, 0.80, 0.05, 0.05, 0.03, 0.02],  # Leaf Blight: dark brown/black spots
+    [0.05, 0.08, 0.05, 0.10, 0.70, 0.02],  # Bacterial Spot: dark spots with yellow halos
+    [0.05, 0.05, 0.05, 0.05, 0.05, 0.75],  # Mosaic Virus: mottled yellow-green pattern
+    [0.20, 0.25, 0.20, 0.15, 0.15, 0.05],  # Default moderate disease
+])
+
+
+def image_to_array(image, size=IMAGE_SIZE):
+    """Resize a PIL image and return its uint8 pixels ((H, W, C) or (H, W))"""
+    return np.asarray(image.resize(size))
+
+
+def stack_images(images, size=IMAGE_SIZE):
+    """Resize PIL images into one (N, H, W, C) uint8 batch; all must share a mode"""
+    return np.stack([image_to_array(image, size) for image in images])
+
+
+def _channel_sums(batch):
+    """
+    Per-image, per-channel pixel sums in one reduction over the uint8 view
+    Rows are summed first as contiguous (H, W*C) vectors, which keeps the
+    inner loop SIMD-friendly, then the W pixels of each row total are folded
+    """
+    n, height, width, channels = batch.shape
+    # 255 * height must fit the accumulator for the row reduction
+    row_dtype = np.uint16 if height * 255 <= np.iinfo(np.uint16).max else np.uint32
+    row_totals = np.add.reduce(batch.reshape(n, height, width * channels), axis=1, dtype=row_dtype)
+    return row_totals.reshape(n, width, channels).sum(axis=1, dtype=np.uint64)
+
+
+def color_statistics(batch, with_contrast=False):
+    """
+    Colour statistics for a (N, H, W, C) uint8 batch
+    Returns a dict of (N,) float arrays: red, green, blue, brightness and,
+    if requested, contrast (standard deviation over all pixels and channels)
+    """
+    batch = np.ascontiguousarray(batch, dtype=np.uint8)
+    n = batch.shape[0]
+    count = batch.shape[1] * batch.shape[2]
+
+    sums = _channel_sums(batch)
+    means = sums / count
+    total_values = count * batch.shape[3]
+    brightness = sums.sum(axis=1) / total_values
+
+    stats = {
+        'red': means[:, 0],
+        'green': means[:, 1],
+        'blue': means[:, 2],
+        'brightness': brightness
+    }
+
+    if with_contrast:
+        flat = batch.reshape(n, -1)
+        squares = np.einsum('ij,ij->i', flat, flat, dtype=np.uint64)
+        variance = np.maximum(squares / total_values - brightness ** 2, 0.0)
+        stats['contrast'] = np.sqrt(variance)
+
+    return stats
+
+
+def grayscale_brightness(batch):
+    """Mean brightness for a (N, H, W) uint8 batch"""
+    batch = np.ascontiguousarray(batch, dtype=np.uint8)
+    return _channel_sums(batch[..., np.newaxis])[:, 0] / (batch.shape[1] * batch.shape[2])
+
+
+def classify_batch(batch):
+    """
+    Fallback visual analysis for a whole batch
+    Returns (labels, confidences) arrays of length N
+    """
+    batch = np.asarray(batch)
+    if batch.ndim == 3:
+        return _classify_grayscale(batch)
+
+    stats = color_statistics(batch)
+    red, green, blue = stats['red'], stats['green'], stats['blue']
+    brightness = stats['brightness']
+
+    rule = np.select([
+        # Healthy: Dominant green, good brightness
+        (green > red + 15) & (green > blue + 10) & (brightness > 100),
+        # Powdery Mildew: High brightness (white patches)
+        (brightness > 180) | ((red > 200) & (green > 200) & (blue > 200)),
+        # Rust Disease: High red, low green (orange/brown)
+        (red > green + 25) & (red > 130),
+        # Leaf Blight: Low brightness (dark spots)
+        (brightness < 80) | ((red < 90) & (green < 90) & (blue < 90)),
+        # Bacterial Spot: Moderate values with some contrast
+        (brightness > 90) & (brightness < 150) & (np.abs(red - green) > 10),
+    ], [0, 1, 2, 3, 4], default=5)
+
+    return FALLBACK_LABELS[rule], FALLBACK_CONFIDENCES[rule]
+
+
+def _classify_grayscale(batch):
+    brightness = grayscale_brightness(batch)
+    rule = np.select([brightness > 180, brightness < 80], [0, 1], default=2)
+    return GRAYSCALE_LABELS[rule], GRAYSCALE_CONFIDENCES[rule]
+
+
+def demo_distributions(batch):
+    """
+    Demo detector class distributions for a whole batch
+    Returns a (N, len(DEMO_CLASSES)) probability array in DEMO_CLASSES order
+    """
+    batch = np.asarray(batch)
+    if batch.ndim == 3:
+        return np.repeat(DEMO_DISTRIBUTIONS[-1:], batch.shape[0], axis=0)
+
+    stats = color_statistics(batch, with_contrast=True)
+    red, green = stats['red'], stats['green']
+    brightness, contrast = stats['brightness'], stats['contrast']
+
+    rule = np.select([
+        (green > 140) & (brightness > 120),
+        (red > 120) & (green < 100),
+        (brightness > 150) & (contrast > 60),
+        (green < 90) & (brightness < 100),
+        (red > 100) & (contrast > 50),
+        contrast > 70,
+    ], [0, 1, 2, 3, 4, 5], default=6)
+
+    return DEMO_DISTRIBUTIONS[rule]
+
+
+def classify_image(image):
+    """Fallback visual analysis for one PIL image: (disease_name, confidence)"""
+    labels, confidences = classify_batch(image_to_array(image)[np.newaxis])
+    return labels[0], float(confidences[0])
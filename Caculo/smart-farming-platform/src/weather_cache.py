@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class WeatherCache:
+    """
+    TTL cache with stale-while-revalidate and request coalescing
+    - Fresh entries (younger than ttl_seconds) are returned directly
+    - Stale entries (up to ttl_seconds + stale_seconds old) are returned at
+      once while a single background refresh fetches a new value
+    - Concurrent misses for the same key share one in-flight load
+    Failed loads are never cached: the loader's exception is raised to every
+    waiting caller, and a failed refresh keeps serving the stale value.
+    """
+
+    def __init__(self, ttl_seconds=600, stale_seconds=3600, max_entries=512, refresh_workers=2):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._in_flight = {}           # key -> Future shared by waiting callers
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers,
+                                             thread_name_prefix='weather-refresh')
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'errors': 0,
+            'evictions': 0
+        }
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() at most once across concurrent callers"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[1]
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    if key not in self._in_flight:
+                        future = Future()
+                        try:
+                            self._refresher.submit(self._load, key, loader, future)
+                        except RuntimeError:
+                            # Refresher shut down (cache closed): keep serving the stale
+                            # value without leaving a future no worker will complete
+                            return entry[1]
+                        # The refresh cannot finish before this: it needs the lock
+                        self._in_flight[key] = future
+                        self._stats['refreshes'] += 1
+                    return entry[1]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+                owner = False
+            else:
+                self._stats['misses'] += 1
+                future = self._in_flight[key] = Future()
+                owner = True
+
+        if owner:
+            self._load(key, loader, future)
+        return future.result()
+
+    def _load(self, key, loader, future):
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += 1
+                # Keep serving the stale value rather than dropping it
+                entry = self._entries.get(key)
+                del self._in_flight[key]
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds + self.stale_seconds:
+                future.set_result(entry[1])
+            else:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+            del self._in_flight[key]
+        future.set_result(value)
+
+    def clear(self):
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        """Stop background refreshes"""
+        self._refresher.shutdown(wait=False)
+
+    def get_stats(self):
+        """Hit, stale-hit, miss and coalescing counters plus current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['in_flight'] = len(self._in_flight)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
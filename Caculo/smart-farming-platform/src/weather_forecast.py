@@ -0,0 +1,359 @@
+"""
+Hourly weather series and rolling-window crop metrics
+Fungal disease pressure depends on how many hours leaves stay humid or wet
+over the coming days, not on one snapshot. HourlySeries keeps hourly
+observations/forecasts in compact growable arrays, and RollingWeatherWindow
+updates windowed metrics in O(1) per new hour instead of re-scanning the
+window:
+
+    humid_hours     hours with relative humidity above 80%
+    wet_hours       leaf-wetness proxy: RH >= 90% or measurable rain
+    degree_days     growing degree-days above BASE_TEMPERATURE
+    spray_hours     hours that meet the spraying rule (RH < 75%, wind < 8 m/s, no rain)
+    disease_risk    Low / Moderate / High from humid hours and mean temperature
+"""
+
+import math
+import zlib
+
+import numpy as np
+
+from weather_providers import location_key
+
+DEFAULT_WINDOW_HOURS = 48
+HOUR = 3600
+BASE_TEMPERATURE = 10.0       # °C, growing degree-day base
+HUMID_RH = 80.0
+WET_RH = 90.0
+MIN_SPRAY_WINDOW_HOURS = 3    # shortest useful spraying slot
+
+# Humid hours in the window that raise fungal risk, when the mean temperature
+# is in the 15-30 °C band where most foliar fungi thrive
+HIGH_RISK_HUMID_HOURS = 24
+MODERATE_RISK_HUMID_HOURS = 12
+
+RISK_LEVELS = ['Low', 'Moderate', 'High']
+SERIES_FIELDS = ('temperature', 'humidity', 'wind_speed', 'precipitation')
+
+
+class HourlySeries:
+    """
+    Hourly series stored as float32 columns plus int64 epoch seconds
+    Capacity grows geometrically, so ingesting hour by hour stays amortised O(1).
+    Hours at or before the last stored hour are ignored on append;
+    drop_before() discards old hours from the front and drop_from() cuts the
+    tail so a refreshed forecast can be appended in its place.
+    """
+
+    def __init__(self, capacity=168):
+        self._size = 0
+        self._time = np.empty(capacity, dtype=np.int64)
+        self._columns = {name: np.empty(capacity, dtype=np.float32) for name in SERIES_FIELDS}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def time(self):
+        return self._time[:self._size]
+
+    @property
+    def temperature(self):
+        return self._columns['temperature'][:self._size]
+
+    @property
+    def humidity(self):
+        return self._columns['humidity'][:self._size]
+
+    @property
+    def wind_speed(self):
+        return self._columns['wind_speed'][:self._size]
+
+    @property
+    def precipitation(self):
+        return self._columns['precipitation'][:self._size]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= len(self._time):
+            return
+        capacity = max(needed, 2 * len(self._time))
+        self._time = np.resize(self._time, capacity)
+        for name, column in self._columns.items():
+            self._columns[name] = np.resize(column, capacity)
+
+    def append(self, time, temperature, humidity, wind_speed=0.0, precipitation=0.0):
+        """
+        Append hourly arrays (or scalars); returns the slice of rows actually added
+        """
+        time = np.atleast_1d(np.asarray(time, dtype=np.int64))
+        values = np.broadcast_arrays(time, *(np.asarray(v, dtype=np.float32)
+                                             for v in (temperature, humidity, wind_speed, precipitation)))[1:]
+        if self._size:
+            keep = time > self._time[self._size - 1]
+            time = time[keep]
+            values = [value[keep] for value in values]
+
+        start = self._size
+        self._reserve(len(time))
+        end = start + len(time)
+        self._time[start:end] = time
+        for name, value in zip(SERIES_FIELDS, values):
+            self._columns[name][start:end] = value
+        self._size = end
+        return slice(start, end)
+
+    def drop_before(self, time):
+        """Discard hours before time (epoch seconds); returns how many were dropped"""
+        count = int(np.searchsorted(self.time, time))
+        if count:
+            remaining = self._size - count
+            self._time[:remaining] = self._time[count:self._size]
+            for column in self._columns.values():
+                column[:remaining] = column[count:self._size]
+            self._size = remaining
+        return count
+
+    def drop_from(self, time):
+        """Discard hours at or after time (epoch seconds); returns how many were dropped"""
+        count = self._size - int(np.searchsorted(self.time, time))
+        self._size -= count
+        return count
+
+    def rows_between(self, first, last):
+        """Slice of the rows with first <= time <= last"""
+        return slice(int(np.searchsorted(self.time, first)), int(np.searchsorted(self.time, last, side='right')))
+
+    def copy(self, rows=slice(None)):
+        series = HourlySeries(capacity=max(len(self.time[rows]), 1))
+        series.append(self.time[rows], self.temperature[rows], self.humidity[rows],
+                      self.wind_speed[rows], self.precipitation[rows])
+        return series
+
+    def to_frame(self):
+        import pandas as pd
+        data = {name: getattr(self, name) for name in SERIES_FIELDS}
+        return pd.DataFrame(data, index=pd.to_datetime(self.time, unit='s', utc=True))
+
+
+class RollingWeatherWindow:
+    """
+    Windowed crop metrics maintained incrementally
+    Each pushed hour adds its contribution to running totals and the hour
+    leaving the window subtracts its own, so updates never re-scan the window
+    """
+
+    def __init__(self, window_hours=DEFAULT_WINDOW_HOURS, base_temperature=BASE_TEMPERATURE):
+        self.window_hours = window_hours
+        self.base_temperature = base_temperature
+        # Ring buffer of per-hour contributions: humid, wet, degree-days, spray, temperature
+        self._ring = [(0, 0, 0.0, 0, 0.0)] * window_hours
+        self._totals = [0, 0, 0.0, 0, 0.0]
+        self._count = 0
+        self._spray_run = 0   # consecutive sprayable hours ending at the latest hour
+
+    def push(self, temperature, humidity, wind_speed=0.0, precipitation=0.0):
+        """Add one hour and return the window metrics after it"""
+        raining = precipitation > 0
+        sprayable = humidity < 75 and wind_speed < 8 and not raining
+        contribution = (
+            int(humidity > HUMID_RH),
+            int(humidity >= WET_RH or raining),
+            max(temperature - self.base_temperature, 0.0) / 24.0,
+            int(sprayable),
+            float(temperature)
+        )
+
+        slot = self._count % self.window_hours
+        leaving = self._ring[slot]
+        totals = self._totals
+        for i in range(5):
+            totals[i] += contribution[i] - leaving[i]
+        self._ring[slot] = contribution
+        self._count += 1
+        self._spray_run = self._spray_run + 1 if sprayable else 0
+        return self.metrics()
+
+    def restore_spray_run(self, hours):
+        """Set the sprayable run ending at the latest hour, after replaying only part of it"""
+        self._spray_run = hours
+
+    def metrics(self):
+        hours = min(self._count, self.window_hours)
+        humid, wet, degree_days, spray, temperature_sum = self._totals
+        mean_temperature = temperature_sum / hours if hours else math.nan
+        return {
+            'window_hours': hours,
+            'humid_hours': humid,
+            'wet_hours': wet,
+            'degree_days': round(degree_days, 2),
+            'spray_hours': spray,
+            'spray_run_hours': self._spray_run,
+            'mean_temperature': round(mean_temperature, 1) if hours else None,
+            'disease_risk': RISK_LEVELS[self._risk_level(humid, mean_temperature)]
+        }
+
+    @staticmethod
+    def _risk_level(humid_hours, mean_temperature):
+        if not 15 <= mean_temperature <= 30:
+            return 0
+        if humid_hours >= HIGH_RISK_HUMID_HOURS:
+            return 2
+        if humid_hours >= MODERATE_RISK_HUMID_HOURS:
+            return 1
+        return 0
+
+
+def rolling_metrics(series, window_hours=DEFAULT_WINDOW_HOURS, window=None, rows=slice(None)):
+    """
+    Per-hour window metrics for a series, as arrays keyed by metric name
+    Pass an existing window (and the rows it has not seen yet) to continue
+    from previously ingested hours
+    """
+    window = window or RollingWeatherWindow(window_hours)
+    rows = [window.push(*values) for values in zip(
+        series.temperature[rows].tolist(), series.humidity[rows].tolist(),
+        series.wind_speed[rows].tolist(), series.precipitation[rows].tolist()
+    )]
+    keys = rows[0].keys() if rows else []
+    return {key: np.array([row[key] for row in rows]) for key in keys}
+
+
+def spray_windows(series, min_hours=MIN_SPRAY_WINDOW_HOURS):
+    """[(start_epoch, hours)] for runs of consecutive sprayable hours"""
+    ok = ((series.humidity < 75) & (series.wind_speed < 8) & (series.precipitation <= 0)).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], ok, [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return [(int(series.time[s]), int(e - s)) for s, e in zip(starts, ends) if e - s >= min_hours]
+
+
+def synthetic_hourly_forecast(location, start, hours=120, base_temperature=None, base_humidity=None):
+    """
+    Deterministic demo forecast: the same location and start hour always give
+    the same series. Diurnal temperature/humidity cycles around the given (or
+    a location-derived) climate, plus seeded multi-hour rain spells.
+    """
+    start = int(start) // 3600 * 3600
+    location_seed = zlib.crc32(repr(location_key(location)).encode())
+    rng = np.random.default_rng([location_seed, start // 3600])
+    climate = np.random.default_rng(location_seed)
+
+    base_temperature = climate.uniform(12, 32) if base_temperature is None else base_temperature
+    base_humidity = climate.uniform(45, 85) if base_humidity is None else base_humidity
+    time = start + 3600 * np.arange(hours, dtype=np.int64)
+    hour_of_day = (time // 3600) % 24
+    diurnal = np.sin((hour_of_day - 9) / 24 * 2 * np.pi)  # warmest mid-afternoon
+
+    # Mean-reverting day-to-day drift so long horizons stay near the climate
+    noise = rng.normal(0, 0.5, hours)
+    drift = np.empty(hours)
+    level = 0.0
+    for i in range(hours):
+        level = 0.97 * level + noise[i]
+        drift[i] = level
+    temperature = base_temperature + 6 * diurnal + drift
+    humidity = base_humidity - 15 * diurnal - 0.8 * drift + rng.normal(0, 3, hours)
+
+    precipitation = np.zeros(hours)
+    for _ in range(rng.poisson(hours / 48)):
+        begin = rng.integers(0, hours)
+        length = rng.integers(2, 10)
+        precipitation[begin:begin + length] = rng.uniform(0.2, 4.0)
+    humidity = np.where(precipitation > 0, np.maximum(humidity, 92), humidity)
+
+    return {
+        'time': time,
+        'temperature': np.round(temperature, 1),
+        'humidity': np.clip(np.round(humidity), 15, 100),
+        'wind_speed': np.round(np.abs(3 + 2 * diurnal + rng.normal(0, 1.5, hours)), 1),
+        'precipitation': np.round(precipitation, 1)
+    }
+
+
+class WeatherForecast:
+    """
+    Hourly series for one location plus its incrementally maintained window
+    Only the hours of the latest fetch and the window's worth before them are
+    held, so a long-lived forecast does not grow with the life of the process.
+    """
+
+    def __init__(self, location, window_hours=DEFAULT_WINDOW_HOURS):
+        self.location = location
+        self.window_hours = window_hours
+        self.reset()
+
+    def reset(self):
+        self.series = HourlySeries()
+        self.window = RollingWeatherWindow(self.window_hours)
+        self.hourly_metrics = {}
+
+    def ingest(self, hourly):
+        """
+        Add hours (dict of arrays with 'time' and SERIES_FIELDS); returns how
+        many were fed to the rolling window.
+        A refreshed forecast replaces the held hours from its first hour on,
+        and the window is recomputed from there, so revised hours are not
+        stuck at their first fetched values. Hours that do not continue the
+        held series (a gap, or starting before it) replace it, so rolling
+        totals never span missing hours.
+        """
+        time = np.atleast_1d(np.asarray(hourly['time'], dtype=np.int64))
+        if len(self.series) and len(time):
+            if not self.series.time[0] <= time[0] <= self.series.time[-1] + HOUR:
+                self.reset()
+            elif time[0] <= self.series.time[-1]:
+                self._rewind(int(np.searchsorted(self.series.time, time[0])))
+        added = self.series.append(time, hourly['temperature'], hourly['humidity'],
+                                   hourly.get('wind_speed', 0.0), hourly.get('precipitation', 0.0))
+        if added.stop > added.start:
+            new_metrics = rolling_metrics(self.series, window=self.window, rows=added)
+            for key, values in new_metrics.items():
+                previous = self.hourly_metrics.get(key)
+                self.hourly_metrics[key] = values if previous is None else np.concatenate((previous, values))
+        if len(time):
+            dropped = self.series.drop_before(time[0] - self.window_hours * HOUR)
+            if dropped:
+                self.hourly_metrics = {key: values[dropped:] for key, values in self.hourly_metrics.items()}
+        return added.stop - added.start
+
+    def _rewind(self, cut):
+        """Drop rows from cut on and restore the window as it was after row cut - 1"""
+        self.series.drop_from(self.series.time[cut])
+        self.hourly_metrics = {key: values[:cut] for key, values in self.hourly_metrics.items()}
+        self.window = RollingWeatherWindow(self.window_hours)
+        # The ring only needs the last window's worth of hours; the spray run
+        # can be longer, so it is taken from the recorded metrics
+        rolling_metrics(self.series, window=self.window, rows=slice(max(cut - self.window_hours, 0), cut))
+        if cut:
+            self.window.restore_spray_run(int(self.hourly_metrics['spray_run_hours'][cut - 1]))
+
+    def horizon(self, first, hours):
+        """
+        Read-only copy limited to `hours` hours from first (epoch seconds),
+        with the window metrics as they were at each of those hours
+        """
+        rows = self.series.rows_between(first, first + (hours - 1) * HOUR)
+        view = WeatherForecast(self.location, self.window_hours)
+        view.series = self.series.copy(rows)
+        view.hourly_metrics = {key: values[rows].copy() for key, values in self.hourly_metrics.items()}
+        return view
+
+    def latest_window(self):
+        """Window metrics at the last held hour"""
+        if not len(self.series) or not self.hourly_metrics:
+            return self.window.metrics()
+        return {key: values[len(self.series) - 1].item() for key, values in self.hourly_metrics.items()}
+
+    def summary(self):
+        """Headline numbers for the whole held horizon"""
+        risk = self.hourly_metrics.get('disease_risk')
+        windows = spray_windows(self.series)
+        return {
+            'location': self.location,
+            'hours': len(self.series),
+            'latest_window': self.latest_window(),
+            'peak_disease_risk': str(max(risk, key=RISK_LEVELS.index)) if risk is not None and len(risk) else None,
+            'high_risk_hours': int(np.sum(risk == 'High')) if risk is not None else 0,
+            'next_spray_window': windows[0] if windows else None,
+            'spray_windows': len(windows)
+        }
@@ -0,0 +1,180 @@
+"""
+Weather data providers
+A provider turns a location into an OpenWeatherMap-style current-weather
+payload; WeatherService parses, caches and coalesces on top of it. Swap in
+another provider (or point OpenWeatherMapProvider.base_url at a local stub
+server) without touching the service.
+
+A location is either a city name or a (latitude, longitude) pair.
+"""
+
+import random
+import re
+import threading
+import time
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+OPENWEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+OPENWEATHER_FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+FORECAST_STEP_HOURS = 3  # the free forecast endpoint returns 3-hourly steps
+COORDINATE_PRECISION = 2  # ~1 km; nearby plots share one cached lookup
+
+
+# Upstream statuses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class WeatherProviderError(Exception):
+    """
+    A provider could not return weather for a location
+    retryable is False for answers that will not change on retry (unknown
+    city, bad API key)
+    """
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def location_key(location):
+    """Cache key: normalized city name or coordinates rounded to ~1 km"""
+    if isinstance(location, str):
+        return ('city', re.sub(r'\s+', ' ', location).strip().lower())
+    latitude, longitude = location
+    return ('coord', round(float(latitude), COORDINATE_PRECISION),
+            round(float(longitude), COORDINATE_PRECISION))
+
+
+def location_label(location):
+    """Human-readable name for a location"""
+    if isinstance(location, str):
+        return location.strip()
+    return f"{float(location[0]):.{COORDINATE_PRECISION}f},{float(location[1]):.{COORDINATE_PRECISION}f}"
+
+
+class OpenWeatherMapProvider:
+    """
+    OpenWeatherMap current-weather and forecast APIs over a pooled requests.Session
+    Connections are kept alive and reused across lookups instead of opening
+    a new one per request
+    """
+
+    name = 'openweathermap'
+
+    def __init__(self, api_key, base_url=OPENWEATHER_URL, timeout=10, pool_size=16,
+                 forecast_url=OPENWEATHER_FORECAST_URL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.forecast_url = forecast_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _params(self, location):
+        params = {'appid': self.api_key, 'units': 'metric'}  # Celsius temperature
+        if isinstance(location, str):
+            params['q'] = location.strip()
+        else:
+            params['lat'], params['lon'] = location
+        return params
+
+    def fetch(self, location):
+        return self._get(self.base_url, self._params(location))
+
+    def fetch_forecast(self, location, hours=120, start=None):
+        """
+        Hourly series (dict of arrays) from the 3-hourly forecast endpoint
+        Each step is held for its three hours; rain totals are spread evenly
+        """
+        steps = self._get(self.forecast_url, self._params(location)).get('list', [])
+        if not steps:
+            raise WeatherProviderError("Weather API Error: empty forecast", retryable=False)
+
+        offsets = np.arange(FORECAST_STEP_HOURS, dtype=np.int64) * 3600
+        repeat = lambda values: np.repeat(np.asarray(values, dtype=np.float64), FORECAST_STEP_HOURS)[:hours]
+        try:
+            return {
+                'time': (np.array([step['dt'] for step in steps], dtype=np.int64)[:, None]
+                         + offsets).ravel()[:hours],
+                'temperature': repeat([step['main']['temp'] for step in steps]),
+                'humidity': repeat([step['main']['humidity'] for step in steps]),
+                'wind_speed': repeat([step.get('wind', {}).get('speed', 0.0) for step in steps]),
+                'precipitation': repeat([step.get('rain', {}).get('3h', 0.0) / FORECAST_STEP_HOURS
+                                         for step in steps])
+            }
+        except KeyError as e:
+            raise WeatherProviderError(f"Forecast parsing error: {e}", retryable=False)
+
+    def _get(self, url, params):
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise WeatherProviderError(f"Weather API Request Error: {e}")
+
+        if response.status_code != 200:
+            raise WeatherProviderError(f"Weather API Error: {response.status_code}",
+                                       retryable=response.status_code in RETRYABLE_STATUSES)
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+class DemoWeatherProvider:
+    """Realistic demo weather when no API key is available"""
+
+    name = 'demo'
+
+    # Demo weather scenarios based on city patterns
+    CITY_WEATHER = {
+        'new york': {'temp': 22, 'humidity': 68, 'desc': 'partly cloudy', 'wind': 5.2},
+        'london': {'temp': 18, 'humidity': 75, 'desc': 'light rain', 'wind': 8.1},
+        'mumbai': {'temp': 32, 'humidity': 85, 'desc': 'humid', 'wind': 3.8},
+        'delhi': {'temp': 35, 'humidity': 45, 'desc': 'clear sky', 'wind': 4.5},
+        'tokyo': {'temp': 25, 'humidity': 70, 'desc': 'scattered clouds', 'wind': 6.5},
+        'sydney': {'temp': 28, 'humidity': 60, 'desc': 'sunny', 'wind': 7.2}
+    }
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch(self, location):
+        kind, *key = location_key(location)
+        with self._lock:
+            rng = self._random
+            # Get city-specific weather or a random realistic scenario
+            scenario = self.CITY_WEATHER.get(key[0]) if kind == 'city' else None
+            scenario = scenario or rng.choice(list(self.CITY_WEATHER.values()))
+            return {
+                'name': location_label(location),
+                'sys': {'country': 'Demo'},
+                'main': {
+                    'temp': scenario['temp'] + rng.uniform(-3, 3),
+                    'feels_like': scenario['temp'] + rng.uniform(-2, 4),
+                    'humidity': max(20, min(95, scenario['humidity'] + rng.randint(-10, 10))),
+                    'pressure': rng.randint(1010, 1025)
+                },
+                'weather': [{'description': scenario['desc'], 'main': scenario['desc'].split()[0].title()}],
+                'wind': {'speed': scenario['wind'] + rng.uniform(-2, 2), 'deg': rng.randint(0, 360)},
+                'visibility': rng.uniform(8, 15) * 1000
+            }
+
+    def fetch_forecast(self, location, hours=120, start=None):
+        """Deterministic synthetic hourly forecast (same location and hour, same series)"""
+        from weather_forecast import synthetic_hourly_forecast
+        kind, *key = location_key(location)
+        scenario = self.CITY_WEATHER.get(key[0]) if kind == 'city' else None
+        return synthetic_hourly_forecast(
+            location, time.time() if start is None else start, hours,
+            base_temperature=scenario['temp'] if scenario else None,
+            base_humidity=scenario['humidity'] if scenario else None
+        )
+
+    def close(self):
+        pass
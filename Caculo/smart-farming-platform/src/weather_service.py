@@ -1,50 +1,179 @@
-import requests
-import json
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from farming_rules import get_farming_rules
+from weather_cache import WeatherCache
+from weather_forecast import DEFAULT_WINDOW_HOURS, WeatherForecast
+from weather_providers import (DemoWeatherProvider, OpenWeatherMapProvider, WeatherProviderError,
+                               location_key, location_label)
+
+# Current conditions are reused for this long, then served stale while a
+# background refresh runs
+WEATHER_CACHE_TTL = 600
+WEATHER_STALE_TTL = 3600
+
+# Forecasts change slowly; refetch at most hourly
+FORECAST_CACHE_TTL = 3600
+FORECAST_HOURS = 120
+
+# Columns of a parsed weather record, in table order
+WEATHER_FIELDS = [
+    'city', 'country', 'temperature', 'feels_like', 'humidity', 'pressure', 'description',
+    'main_weather', 'wind_speed', 'wind_direction', 'visibility', 'timestamp',
+    'heat_stress', 'irrigation_need', 'disease_risk', 'optimal_for_spraying'
+]
+
+# Bulk fetch defaults: parallel provider calls and retry policy
+BULK_MAX_CONCURRENCY = 8
+BULK_RETRIES = 3
+BULK_BACKOFF_SECONDS = 0.5
+BULK_MAX_BACKOFF_SECONDS = 8.0
+
 class WeatherService:
     """
     Weather API integration for climate-aware farming decisions
     Uses OpenWeatherMap API for real-time weather data
     """
     
-    def __init__(self):
+    def __init__(self, provider=None, cache_ttl=WEATHER_CACHE_TTL, stale_ttl=WEATHER_STALE_TTL,
+                 observation_store=None):
         # Replace with your actual API key from OpenWeatherMap
         self.api_key = "YOUR_API_KEY"  # Get free key from openweathermap.org
         self.base_url = "http://api.openweathermap.org/data/2.5/weather"
         
         # Demo mode flag (set to False when you have API key)
         self.demo_mode = True
+        
+        # Pluggable data source: pass a provider (e.g. one pointed at a stub server) to override
+        if provider is None:
+            if self.demo_mode or self.api_key == "YOUR_API_KEY":
+                provider = DemoWeatherProvider()
+            else:
+                provider = OpenWeatherMapProvider(self.api_key, self.base_url)
+        self.provider = provider
+        self.cache = WeatherCache(ttl_seconds=cache_ttl, stale_seconds=stale_ttl)
+        self.forecast_cache = WeatherCache(ttl_seconds=FORECAST_CACHE_TTL, stale_seconds=stale_ttl)
+        self._forecasts = {}
+        self._forecasts_lock = threading.Lock()
+        
+        # Optional ObservationStore: every fetched observation is kept for trends
+        self.observation_store = observation_store
     
     def get_weather_data(self, city_name):
         """
-        Fetch current weather data for specified city
+        Fetch current weather data for specified city (or (lat, lon) pair)
         Returns weather information relevant for farming
+        Repeat lookups are served from the cache; concurrent lookups for the
+        same place share one provider call
         """
-        if self.demo_mode or self.api_key == "YOUR_API_KEY":
-            return self._get_demo_weather_data(city_name)
-        
         try:
-            # Construct API request
-            params = {
-                'q': city_name,
-                'appid': self.api_key,
-                'units': 'metric'  # Celsius temperature
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_weather_data(data)
-            else:
-                print(f"Weather API Error: {response.status_code}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Weather API Request Error: {e}")
+            return self.cache.get(location_key(city_name), lambda: self._fetch_weather_data(city_name))
+        except WeatherProviderError as e:
+            print(e)
             return None
     
+    async def get_weather_data_async(self, city_name):
+        """
+        Async variant of get_weather_data for event-loop callers
+        Shares the same cache and in-flight lookups as the blocking API
+        """
+        return await asyncio.to_thread(self.get_weather_data, city_name)
+    
+    def get_forecast(self, city_name, hours=FORECAST_HOURS, window_hours=DEFAULT_WINDOW_HOURS, start=None):
+        """
+        Forecast mode: hourly series plus rolling disease-risk, degree-day and
+        spray-window metrics for a city or (lat, lon) pair
+        The series for each location is kept between calls; a refreshed
+        forecast replaces the hours it overlaps and the rolling window is
+        recomputed from its first hour.
+        Returns a WeatherForecast snapshot of the requested hours, or None if
+        the provider failed.
+        """
+        key = location_key(city_name)
+        try:
+            hourly = self.forecast_cache.get(
+                (key, hours, start),
+                lambda: self.provider.fetch_forecast(city_name, hours=hours, start=start)
+            )
+        except WeatherProviderError as e:
+            print(e)
+            return None
+
+        with self._forecasts_lock:
+            forecast = self._forecasts.get((key, window_hours))
+            if forecast is None:
+                forecast = self._forecasts[(key, window_hours)] = WeatherForecast(
+                    location_label(city_name), window_hours)
+            forecast.ingest(hourly)
+            if not len(hourly['time']):
+                return forecast.horizon(0, 0)
+            return forecast.horizon(int(hourly['time'][0]), len(hourly['time']))
+    
+    def get_weather_bulk(self, locations, max_concurrency=BULK_MAX_CONCURRENCY, retries=BULK_RETRIES,
+                         backoff=BULK_BACKOFF_SECONDS):
+        """
+        Fetch weather for many cities and/or (lat, lon) pairs at once
+        Locations are deduplicated (same normalization as the cache), fetched
+        with at most max_concurrency provider calls in flight, and transient
+        failures are retried with jittered exponential backoff. Returns a
+        pandas DataFrame with one row per unique location, in first-seen
+        order; failed locations get an 'error' message instead of failing
+        the whole batch.
+        """
+        import pandas as pd
+
+        unique = {}
+        for location in locations:
+            unique.setdefault(location_key(location), location)
+
+        def lookup(key, location):
+            try:
+                data = self.cache.get(key, lambda: self._fetch_with_retries(location, retries, backoff))
+                return dict(data, location=location_label(location), error=None)
+            except WeatherProviderError as e:
+                return {'location': location_label(location), 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(unique)))) as executor:
+            rows = list(executor.map(lambda item: lookup(*item), unique.items()))
+
+        return pd.DataFrame(rows, columns=['location'] + WEATHER_FIELDS + ['error'])
+    
+    def _fetch_with_retries(self, location, retries, backoff):
+        """Provider call with full-jitter exponential backoff on retryable errors"""
+        for attempt in range(retries + 1):
+            try:
+                return self._fetch_weather_data(location)
+            except WeatherProviderError as e:
+                if not e.retryable or attempt == retries:
+                    raise
+                delay = min(BULK_MAX_BACKOFF_SECONDS, backoff * 2 ** attempt)
+                time.sleep(random.uniform(0, delay))
+    
+    def _fetch_weather_data(self, city_name):
+        """Uncached provider call; raises WeatherProviderError on failure"""
+        weather_data = self._parse_weather_data(self.provider.fetch(city_name))
+        if weather_data is None:
+            raise WeatherProviderError("Weather data parsing error", retryable=False)
+        if self.observation_store is not None:
+            self.observation_store.add(city_name, weather_data)
+        return weather_data
+    
+    def get_cache_stats(self):
+        """Weather cache counters"""
+        return self.cache.get_stats()
+    
+    def close(self):
+        """Release pooled connections and the refresh threads"""
+        self.cache.close()
+        self.forecast_cache.close()
+        if self.observation_store is not None:
+            self.observation_store.close()
+        self.provider.close()
+    
     def _parse_weather_data(self, api_data):
         """
         Parse API response into farming-relevant weather data
@@ -76,169 +205,23 @@ class WeatherService:
     
     def _calculate_farming_metrics(self, weather_data):
         """
-        FIXED: Calculate farming-specific metrics with scientifically correct thresholds
+        Heat stress, irrigation need, disease risk and spraying suitability,
+        from the compiled rules in data/farming_rules.json
         """
         temp = weather_data['temperature']
         humidity = weather_data['humidity']
         
         print(f"DEBUG: Weather metrics - Temp: {temp}°C, Humidity: {humidity}%")
         
-        # FIXED: Scientifically accurate heat stress thresholds
-        if temp > 32:  # Crops start stress above 32°C
-            heat_stress = "High"
-        elif temp > 28:  # Moderate stress 28-32°C
-            heat_stress = "Moderate" 
-        elif temp < 10:  # Cold stress below 10°C
-            heat_stress = "Cold Stress"
-        else:
-            heat_stress = "Low"
-        
-        # FIXED: Irrigation needs based on crop science
-        if 'rain' in weather_data['description'].lower():
-            irrigation_need = "Low"  # Rain provides water
-        elif humidity < 40 and temp > 25:  # Hot and dry
-            irrigation_need = "High"
-        elif humidity < 60 and temp > 30:  # Very hot
-            irrigation_need = "High" 
-        elif humidity > 80:  # High humidity, less evaporation
-            irrigation_need = "Low"
-        else:
-            irrigation_need = "Moderate"
-        
-        # FIXED: Disease risk based on fungal disease conditions
-        if humidity > 80 and 15 < temp < 30:  # Optimal fungal conditions
-            disease_risk = "High"
-        elif humidity > 70 and 20 < temp < 28:  # Moderate fungal risk
-            disease_risk = "Moderate"
-        elif humidity < 50 or temp > 35 or temp < 10:  # Unfavorable for fungi
-            disease_risk = "Low"
-        else:
-            disease_risk = "Moderate"
-        
-        # FIXED: Spraying conditions (low humidity, low wind)
-        wind_speed = weather_data.get('wind_speed', 0)
-        optimal_spraying = (humidity < 75 and wind_speed < 8 and 
-                          'rain' not in weather_data['description'].lower())
-        
-        print(f"DEBUG: Calculated metrics - Heat: {heat_stress}, Irrigation: {irrigation_need}, Disease: {disease_risk}, Spray: {optimal_spraying}")
-        
-        return {
-            'heat_stress': heat_stress,
-            'irrigation_need': irrigation_need, 
-            'disease_risk': disease_risk,
-            'optimal_for_spraying': optimal_spraying
-        }
-    
-    def _get_demo_weather_data(self, city_name):
-        """
-        Generate realistic demo weather data when API key is not available
-        """
-        import random
-        from datetime import datetime
-        
-        # Demo weather scenarios based on city patterns
-        city_weather = {
-            'new york': {'temp': 22, 'humidity': 68, 'desc': 'partly cloudy', 'wind': 5.2},
-            'london': {'temp': 18, 'humidity': 75, 'desc': 'light rain', 'wind': 8.1},
-            'mumbai': {'temp': 32, 'humidity': 85, 'desc': 'humid', 'wind': 3.8},
-            'delhi': {'temp': 35, 'humidity': 45, 'desc': 'clear sky', 'wind': 4.5},
-            'tokyo': {'temp': 25, 'humidity': 70, 'desc': 'scattered clouds', 'wind': 6.5},
-            'sydney': {'temp': 28, 'humidity': 60, 'desc': 'sunny', 'wind': 7.2}
-        }
-        
-        # Get city-specific weather or use default
-        city_key = city_name.lower()
-        if city_key in city_weather:
-            scenario = city_weather[city_key]
-        else:
-            # Random realistic scenario for unknown cities
-            scenarios = list(city_weather.values())
-            scenario = random.choice(scenarios)
-        
-        weather_data = {
-            'city': city_name,
-            'country': 'Demo',
-            'temperature': scenario['temp'] + random.uniform(-3, 3),
-            'feels_like': scenario['temp'] + random.uniform(-2, 4),
-            'humidity': max(20, min(95, scenario['humidity'] + random.randint(-10, 10))),
-            'pressure': random.randint(1010, 1025),
-            'description': scenario['desc'],
-            'main_weather': scenario['desc'].split()[0].title(),
-            'wind_speed': scenario['wind'] + random.uniform(-2, 2),
-            'wind_direction': random.randint(0, 360),
-            'visibility': random.uniform(8, 15),
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        metrics = get_farming_rules().metrics(weather_data)
         
-        # Add farming metrics
-        weather_data.update(self._calculate_farming_metrics(weather_data))
+        print(f"DEBUG: Calculated metrics - Heat: {metrics['heat_stress']}, Irrigation: {metrics['irrigation_need']}, Disease: {metrics['disease_risk']}, Spray: {metrics['optimal_for_spraying']}")
         
-        return weather_data
+        return metrics
     
     def get_farming_advice(self, weather_data):
         """
         Generate specific farming advice based on weather conditions
+        (the 'service' advice rules in data/farming_rules.json)
         """
-        advice = []
-        
-        temp = weather_data['temperature']
-        humidity = weather_data['humidity']
-        description = weather_data['description'].lower()
-        
-        # Temperature-based advice
-        if temp > 35:
-            advice.append({
-                'category': 'Temperature',
-                'priority': 'High',
-                'message': 'Extreme heat warning! Provide shade and increase irrigation frequency.'
-            })
-        elif temp > 30:
-            advice.append({
-                'category': 'Temperature',
-                'priority': 'Medium',
-                'message': 'Hot weather detected. Monitor crops for heat stress and ensure adequate water.'
-            })
-        elif temp < 5:
-            advice.append({
-                'category': 'Temperature',
-                'priority': 'High',
-                'message': 'Frost risk! Protect sensitive crops and consider greenhouse cultivation.'
-            })
-        
-        # Humidity and disease risk
-        if weather_data['disease_risk'] == 'High':
-            advice.append({
-                'category': 'Disease Prevention',
-                'priority': 'High',
-                'message': 'High disease risk due to humidity and temperature. Improve air circulation.'
-            })
-        
-        # Irrigation advice
-        if weather_data['irrigation_need'] == 'High':
-            advice.append({
-                'category': 'Irrigation',
-                'priority': 'Medium',
-                'message': 'Low humidity and warm temperature. Increase watering frequency.'
-            })
-        elif 'rain' in description:
-            advice.append({
-                'category': 'Irrigation',
-                'priority': 'Low',
-                'message': 'Rain expected. Reduce or skip irrigation to prevent waterlogging.'
-            })
-        
-        # Spraying conditions
-        if weather_data['optimal_for_spraying']:
-            advice.append({
-                'category': 'Spraying',
-                'priority': 'Low',
-                'message': 'Good conditions for pesticide/fertilizer application.'
-            })
-        else:
-            advice.append({
-                'category': 'Spraying',
-                'priority': 'Medium',
-                'message': 'Avoid spraying due to high humidity or wind conditions.'
-            })
-        
-        return advice
\ No newline at end of file
+        return get_farming_rules().advice(weather_data, 'service')
\ No newline at end of file
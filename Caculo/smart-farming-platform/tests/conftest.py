@@ -0,0 +1,8 @@
+"""Make src/ and the frozen reference rules importable, as the root scripts do"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
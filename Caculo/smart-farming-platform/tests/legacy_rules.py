@@ -0,0 +1,129 @@
+"""
+Frozen copies of the hand-written if/elif ladders the rule engine replaced
+(WeatherService._calculate_farming_metrics minus its debug prints,
+WeatherService.get_farming_advice and the dashboard advice in src/app.py).
+They are the reference the vectorized and compiled rules are tested
+against: do not edit them to match a rule change.
+"""
+
+
+def legacy_metrics(weather_data):
+    temp = weather_data['temperature']
+    humidity = weather_data['humidity']
+
+    if temp > 32:
+        heat_stress = "High"
+    elif temp > 28:
+        heat_stress = "Moderate"
+    elif temp < 10:
+        heat_stress = "Cold Stress"
+    else:
+        heat_stress = "Low"
+
+    if 'rain' in weather_data['description'].lower():
+        irrigation_need = "Low"
+    elif humidity < 40 and temp > 25:
+        irrigation_need = "High"
+    elif humidity < 60 and temp > 30:
+        irrigation_need = "High"
+    elif humidity > 80:
+        irrigation_need = "Low"
+    else:
+        irrigation_need = "Moderate"
+
+    if humidity > 80 and 15 < temp < 30:
+        disease_risk = "High"
+    elif humidity > 70 and 20 < temp < 28:
+        disease_risk = "Moderate"
+    elif humidity < 50 or temp > 35 or temp < 10:
+        disease_risk = "Low"
+    else:
+        disease_risk = "Moderate"
+
+    wind_speed = weather_data.get('wind_speed', 0)
+    optimal_spraying = (humidity < 75 and wind_speed < 8 and
+                        'rain' not in weather_data['description'].lower())
+
+    return {
+        'heat_stress': heat_stress,
+        'irrigation_need': irrigation_need,
+        'disease_risk': disease_risk,
+        'optimal_for_spraying': optimal_spraying
+    }
+
+
+def legacy_dashboard_advice(weather_data):
+    advice = []
+    temp = weather_data['temperature']
+    humidity = weather_data['humidity']
+    description = weather_data['description'].lower()
+    wind_speed = weather_data.get('wind_speed', 0)
+
+    if temp > 35:
+        advice.append({'type': 'critical', 'advice': f'EXTREME HEAT ({temp:.1f}°C)! Crops under severe stress. Provide shade, increase irrigation 3x.'})
+    elif temp > 32:
+        advice.append({'type': 'warning', 'advice': f'HIGH HEAT ({temp:.1f}°C). Crops stressed. Water early morning/evening, provide shade.'})
+    elif temp > 28:
+        advice.append({'type': 'warning', 'advice': f'Warm temperature ({temp:.1f}°C). Monitor for heat stress, ensure adequate water.'})
+    elif temp < 5:
+        advice.append({'type': 'critical', 'advice': f'FROST RISK ({temp:.1f}°C)! Cover crops, use frost protection, harvest immediately.'})
+    elif temp < 10:
+        advice.append({'type': 'warning', 'advice': f'COLD STRESS ({temp:.1f}°C). Protect tender plants, delay planting, use row covers.'})
+    elif 18 <= temp <= 28:
+        advice.append({'type': 'positive', 'advice': f'OPTIMAL temperature ({temp:.1f}°C) for most crops. Perfect growing conditions.'})
+    else:
+        advice.append({'type': 'info', 'advice': f'Moderate temperature ({temp:.1f}°C). Suitable for most farming activities.'})
+
+    if humidity > 85:
+        advice.append({'type': 'critical', 'advice': f'VERY HIGH humidity ({humidity}%). CRITICAL disease risk! Improve ventilation, reduce watering.'})
+    elif humidity > 75:
+        advice.append({'type': 'warning', 'advice': f'High humidity ({humidity}%). HIGH fungal disease risk. Ensure air circulation.'})
+    elif humidity < 30:
+        advice.append({'type': 'warning', 'advice': f'Very low humidity ({humidity}%). Plants may wilt. Increase irrigation, consider misting.'})
+    elif 50 <= humidity <= 70:
+        advice.append({'type': 'positive', 'advice': f'Good humidity level ({humidity}%) for healthy plant growth.'})
+
+    if 'rain' in description or 'drizzle' in description:
+        advice.append({'type': 'info', 'advice': 'RAIN detected. STOP irrigation, check drainage, harvest ripe crops before damage.'})
+    elif 'storm' in description or 'thunder' in description:
+        advice.append({'type': 'critical', 'advice': 'STORM WARNING! Secure equipment, harvest what you can, avoid fieldwork.'})
+
+    if wind_speed > 12:
+        advice.append({'type': 'critical', 'advice': f'STRONG WINDS ({wind_speed:.1f} m/s). DO NOT SPRAY - drift risk. Secure plants.'})
+    elif wind_speed > 8:
+        advice.append({'type': 'warning', 'advice': f'Moderate winds ({wind_speed:.1f} m/s). Avoid spraying, check plant support.'})
+    elif wind_speed < 3 and humidity < 75:
+        advice.append({'type': 'positive', 'advice': f'PERFECT spraying conditions. Low wind ({wind_speed:.1f} m/s), good humidity.'})
+    return advice
+
+
+def legacy_service_advice(weather_data):
+    advice = []
+    temp = weather_data['temperature']
+    description = weather_data['description'].lower()
+
+    if temp > 35:
+        advice.append({'category': 'Temperature', 'priority': 'High', 'message': 'Extreme heat warning! Provide shade and increase irrigation frequency.'})
+    elif temp > 30:
+        advice.append({'category': 'Temperature', 'priority': 'Medium', 'message': 'Hot weather detected. Monitor crops for heat stress and ensure adequate water.'})
+    elif temp < 5:
+        advice.append({'category': 'Temperature', 'priority': 'High', 'message': 'Frost risk! Protect sensitive crops and consider greenhouse cultivation.'})
+
+    if weather_data['disease_risk'] == 'High':
+        advice.append({'category': 'Disease Prevention', 'priority': 'High', 'message': 'High disease risk due to humidity and temperature. Improve air circulation.'})
+
+    if weather_data['irrigation_need'] == 'High':
+        advice.append({'category': 'Irrigation', 'priority': 'Medium', 'message': 'Low humidity and warm temperature. Increase watering frequency.'})
+    elif 'rain' in description:
+        advice.append({'category': 'Irrigation', 'priority': 'Low', 'message': 'Rain expected. Reduce or skip irrigation to prevent waterlogging.'})
+
+    if weather_data['optimal_for_spraying']:
+        advice.append({'category': 'Spraying', 'priority': 'Low', 'message': 'Good conditions for pesticide/fertilizer application.'})
+    else:
+        advice.append({'category': 'Spraying', 'priority': 'Medium', 'message': 'Avoid spraying due to high humidity or wind conditions.'})
+    return advice
+
+
+def legacy_all(observation):
+    observation = dict(observation, **legacy_metrics(observation))
+    return legacy_metrics(observation), legacy_dashboard_advice(observation), legacy_service_advice(observation)
@@ -0,0 +1,88 @@
+"""Micro-batcher grouping, deadline and shutdown"""
+
+import threading
+import time
+
+import pytest
+
+from batching import BatcherClosedError, MicroBatcher
+
+
+def doubler(items):
+    return [2 * item for item in items]
+
+
+def test_concurrent_items_share_a_batch():
+    release = threading.Event()
+    sizes = []
+
+    def batch_fn(items):
+        release.wait(5)
+        sizes.append(len(items))
+        return doubler(items)
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_delay_ms=200)
+    futures = [batcher.submit(i) for i in range(6)]
+    release.set()
+    assert [f.result(5) for f in futures] == [0, 2, 4, 6, 8, 10]
+    batcher.close()
+    assert sizes == [4, 2]
+    assert batcher.get_stats()['largest_batch'] == 4
+
+
+def test_lone_item_runs_after_the_deadline():
+    batcher = MicroBatcher(doubler, max_batch_size=16, max_delay_ms=50)
+    start = time.monotonic()
+    assert batcher.submit(21).result(5) == 42
+    assert 0.04 <= time.monotonic() - start < 2
+    batcher.close()
+
+
+def test_batch_errors_reach_every_caller():
+    def failing(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(failing, max_batch_size=4, max_delay_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(5)
+    batcher.close()
+    assert batcher.get_stats()['errors'] >= 1
+
+
+def test_close_finishes_queued_items_then_rejects_new_ones():
+    batcher = MicroBatcher(doubler, max_batch_size=2, max_delay_ms=100)
+    futures = [batcher.submit(i) for i in range(5)]
+    batcher.close()
+    assert [f.result(0) for f in futures] == [0, 2, 4, 6, 8]
+    with pytest.raises(BatcherClosedError):
+        batcher.submit(1)
+
+
+def test_submit_racing_close_never_hangs():
+    for _ in range(20):
+        batcher = MicroBatcher(doubler, max_batch_size=8, max_delay_ms=1)
+        futures, stop = [], threading.Event()
+
+        def submitter():
+            while not stop.is_set():
+                try:
+                    futures.append(batcher.submit(1))
+                except BatcherClosedError:
+                    return
+
+        threads = [threading.Thread(target=submitter) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.005)
+        batcher.close()
+        stop.set()
+        for thread in threads:
+            thread.join(5)
+        # Every accepted item completes, with a result or a closed error
+        for future in futures:
+            try:
+                assert future.result(5) == 2
+            except BatcherClosedError:
+                pass
@@ -0,0 +1,74 @@
+"""Vectorized farming metrics against the frozen scalar ladders"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from farming_metrics import METRIC_COLUMNS, add_farming_metrics, calculate_farming_metrics
+from legacy_rules import legacy_metrics
+
+DESCRIPTIONS = ['clear sky', 'light rain', 'Heavy Rain', 'overcast clouds', 'humid',
+                'thunderstorm with rain', 'mist', 'Drizzle', 'sunny', 'RAIN', '']
+# Every threshold in the ladders, so boundaries are hit exactly
+TEMPERATURE_EDGES = [10, 15, 20, 25, 28, 30, 32, 35]
+HUMIDITY_EDGES = [40, 50, 60, 70, 75, 80]
+WIND_EDGES = [8]
+
+
+def random_observations(rows, seed):
+    """Observations where a third of values sit on or next to a threshold"""
+    rng = np.random.default_rng(seed)
+
+    def column(low, high, edges, decimals):
+        values = np.round(rng.uniform(low, high, rows), decimals)
+        on_edge = rng.random(rows) < 0.33
+        nudged = rng.choice(edges, rows) + rng.choice([-0.1, 0.0, 0.0, 0.1], rows)
+        return np.where(on_edge, nudged, values)
+
+    return pd.DataFrame({
+        'temperature': column(-10, 45, TEMPERATURE_EDGES, 1),
+        'humidity': column(5, 100, HUMIDITY_EDGES, 0),
+        'wind_speed': column(0, 20, WIND_EDGES, 1),
+        'description': rng.choice(DESCRIPTIONS, rows)
+    })
+
+
+def assert_matches_ladders(frame, metrics):
+    for name in METRIC_COLUMNS:
+        expected = [legacy_metrics(record)[name] for record in frame.to_dict('records')]
+        actual = metrics[name].astype(object).tolist()
+        mismatch = [i for i, (a, b) in enumerate(zip(actual, expected)) if a != b]
+        assert not mismatch, (f"{name} differs for {frame.iloc[mismatch[0]].to_dict()}: "
+                              f"ladder={expected[mismatch[0]]!r} vectorized={actual[mismatch[0]]!r}")
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_observations_match_ladders(seed):
+    frame = random_observations(20_000, seed)
+    assert_matches_ladders(frame, add_farming_metrics(frame))
+
+
+def test_categorical_descriptions_match_ladders():
+    frame = random_observations(5_000, seed=10)
+    frame['description'] = frame['description'].astype('category')
+    assert_matches_ladders(frame.astype({'description': object}), add_farming_metrics(frame))
+
+
+def test_missing_columns_default_to_calm_and_dry():
+    frame = random_observations(2_000, seed=11)[['temperature', 'humidity']]
+    metrics = add_farming_metrics(frame)
+    assert_matches_ladders(frame.assign(wind_speed=0.0, description=''), metrics)
+
+
+def test_scalars_broadcast():
+    temperature = np.array([5.0, 22.0, 31.0, 36.0])
+    metrics = calculate_farming_metrics(temperature, 85, 2.0, 'light rain')
+    frame = pd.DataFrame({'temperature': temperature, 'humidity': 85, 'wind_speed': 2.0,
+                          'description': 'light rain'})
+    assert_matches_ladders(frame, metrics)
+
+
+def test_missing_descriptions_count_as_dry():
+    metrics = calculate_farming_metrics([20.0, 20.0, 20.0], [60, 60, 60], 2.0, ['rain', None, np.nan])
+    assert metrics['irrigation_need'].tolist() == ['Low', 'Moderate', 'Moderate']
+    assert metrics['optimal_for_spraying'].tolist() == [False, True, True]
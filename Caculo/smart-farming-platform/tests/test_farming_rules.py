@@ -0,0 +1,90 @@
+"""Compiled farming rules against the frozen if/elif ladders they replaced"""
+
+import itertools
+import json
+
+import numpy as np
+import pytest
+
+from farming_rules import FARMING_RULES_PATH, FarmingRules, RuleError
+from legacy_rules import legacy_all, legacy_metrics
+
+DESCRIPTIONS = ['clear sky', 'light rain', 'Heavy Rain', 'overcast clouds', 'thunderstorm',
+                'thunderstorm with rain', 'Drizzle', 'storm', 'mist', 'RAIN']
+TEMPERATURE_EDGES = [5, 10, 15, 18, 20, 25, 28, 30, 32, 35]
+HUMIDITY_EDGES = [30, 40, 50, 60, 70, 75, 80, 85]
+WIND_EDGES = [3, 8, 12]
+
+
+@pytest.fixture(scope='module')
+def rules():
+    return FarmingRules.from_file(FARMING_RULES_PATH)
+
+
+def around(edges):
+    return sorted({value for edge in edges for value in (edge - 0.1, edge, edge + 0.1)}
+                  | {edges[0] - 20, edges[-1] + 20})
+
+
+def golden_cases():
+    """Every threshold neighbourhood of every field against every description"""
+    nan = float('nan')
+    for temperature, humidity, wind, description in itertools.product(
+            around(TEMPERATURE_EDGES) + [nan], around(HUMIDITY_EDGES) + [nan],
+            around(WIND_EDGES) + [nan], DESCRIPTIONS):
+        yield {'temperature': temperature, 'humidity': humidity, 'wind_speed': wind, 'description': description}
+    yield {'temperature': 20.0, 'humidity': 65, 'description': 'clear sky'}  # no wind reading
+
+
+def random_cases(count, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield {
+            'temperature': round(float(rng.uniform(-10, 45)), 1),
+            'humidity': int(rng.integers(5, 101)),
+            'wind_speed': round(float(rng.uniform(0, 20)), 1),
+            'description': str(rng.choice(DESCRIPTIONS))
+        }
+
+
+CASES = {'golden': lambda: golden_cases(), 'random': lambda: random_cases(20_000, seed=1)}
+
+
+@pytest.mark.parametrize('cases', CASES)
+def test_metrics_and_advice_match_ladders(rules, cases):
+    for observation in CASES[cases]():
+        expected = legacy_all(observation)
+        actual = (rules.metrics(observation), rules.advice(observation, 'dashboard'),
+                  rules.advice(observation, 'service'))
+        # repr so NaN placeholders compare equal
+        assert repr(actual) == repr(expected), f"rules differ for {observation}"
+
+
+@pytest.mark.parametrize('cases', CASES)
+def test_metric_codes_match_ladders(rules, cases):
+    cases = list(CASES[cases]())
+    columns = {key: [case.get(key, 0) for case in cases]
+               for key in ('temperature', 'humidity', 'wind_speed', 'description')}
+    for name, codes in rules.metric_codes(**columns).items():
+        levels = rules.levels(name)
+        mismatch = [case for case, code in zip(cases, codes) if legacy_metrics(case)[name] != levels[code]]
+        assert not mismatch, f"vectorized {name} differs for {mismatch[0]}"
+
+
+def test_bad_rule_file_is_rejected():
+    with open(FARMING_RULES_PATH, encoding='utf-8') as f:
+        spec = json.load(f)
+    spec['metrics']['heat_stress']['rules'][0]['when'] = {'temprature': {'>': 32}}
+    with pytest.raises(RuleError, match='temprature'):
+        FarmingRules(spec)
+
+
+def test_description_column_sets_the_shape(rules):
+    descriptions = ['clear sky', 'light rain', None, 'Drizzle']
+    codes = rules.metric_codes(31.0, 55, 2.0, descriptions)
+    for name, values in codes.items():
+        assert values.shape == (4,)
+        expected = [legacy_metrics({'temperature': 31.0, 'humidity': 55, 'wind_speed': 2.0,
+                                    'description': description or ''})[name] for description in descriptions]
+        assert [rules.levels(name)[code] for code in values] == expected
+    assert rules.advice_codes('dashboard', 20.0, 60, 2.0, np.array(descriptions, dtype=object)).shape == (4, 4)
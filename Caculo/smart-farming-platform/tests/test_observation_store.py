@@ -0,0 +1,106 @@
+"""Observation store daily aggregates across compaction and late rows"""
+
+import math
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from observation_store import DAILY_COLUMNS, DAY_SECONDS, ObservationStore
+
+DAY = 1_760_000_000 // DAY_SECONDS * DAY_SECONDS
+NOW = DAY + 30 * DAY_SECONDS
+
+
+def reading(i, temperature=True, humidity=True):
+    return {'temperature': 15.0 + i if temperature else None,
+            'humidity': 50.0 + 3 * i if humidity else None,
+            'wind_speed': 1.0 + i % 3,
+            'precipitation': 0.5 if i % 4 == 0 else None}
+
+
+def expected_day(observations):
+    frame = pd.DataFrame(observations, dtype=float)
+    return {
+        'observations': len(frame),
+        'temperature_min': frame['temperature'].min(),
+        'temperature_max': frame['temperature'].max(),
+        'temperature_mean': frame['temperature'].mean(),
+        'humidity_mean': frame['humidity'].mean(),
+        'humidity_max': frame['humidity'].max(),
+        'wind_speed_mean': frame['wind_speed'].mean(),
+        'precipitation_total': frame['precipitation'].fillna(0).sum(),
+    }
+
+
+def assert_day(row, expected):
+    for column in DAILY_COLUMNS:
+        if isinstance(expected[column], float) and math.isnan(expected[column]):
+            assert pd.isna(row[column]), column
+        else:
+            assert row[column] == pytest.approx(expected[column]), column
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ObservationStore(str(tmp_path / 'observations.db'))
+    yield store
+    store.close()
+
+
+def test_late_rows_merge_by_readings_not_observations(store):
+    early = [reading(i, temperature=i % 2 == 0) for i in range(6)]
+    late = [reading(i, temperature=i == 7, humidity=False) for i in range(6, 10)]
+    store.add_many(('Pune', o, DAY + 600 * i) for i, o in enumerate(early))
+    store.compact(retention_days=5, now=NOW)
+    store.add_many(('Pune', o, DAY + 600 * (6 + i)) for i, o in enumerate(late))
+    expected = expected_day(early + late)
+
+    # Rolled-up part merged with raw late rows on the fly
+    assert_day(store.daily('Pune').iloc[0], expected)
+    # And merged in sqlite by a second compaction
+    store.compact(retention_days=5, now=NOW)
+    assert store.get_stats()['rows'] == 0
+    assert_day(store.daily('Pune').iloc[0], expected)
+
+
+def test_a_side_without_readings_keeps_the_other_sides_values(store):
+    early = [reading(i, humidity=False) for i in range(3)]
+    late = [reading(i, temperature=False) for i in range(3, 5)]
+    store.add_many(('Pune', o, DAY + 600 * i) for i, o in enumerate(early))
+    store.compact(retention_days=5, now=NOW)
+    store.add_many(('Pune', o, DAY + 600 * (3 + i)) for i, o in enumerate(late))
+    store.compact(retention_days=5, now=NOW)
+
+    row = store.daily('Pune').iloc[0]
+    assert_day(row, expected_day(early + late))
+    assert not pd.isna(row['temperature_mean']) and not pd.isna(row['humidity_max'])
+
+
+def test_a_day_with_no_readings_of_a_field_stays_empty(store):
+    rows = [reading(i, temperature=False) for i in range(4)]
+    store.add_many(('Pune', o, DAY + 600 * i) for i, o in enumerate(rows[:2]))
+    store.compact(retention_days=5, now=NOW)
+    store.add_many(('Pune', o, DAY + 600 * (2 + i)) for i, o in enumerate(rows[2:]))
+    assert pd.isna(store.daily('Pune').iloc[0]['temperature_mean'])
+    store.compact(retention_days=5, now=NOW)
+    assert pd.isna(store.daily('Pune').iloc[0]['temperature_mean'])
+
+
+def test_daily_table_from_before_reading_counts_is_upgraded(tmp_path):
+    path = str(tmp_path / 'observations.db')
+    db = sqlite3.connect(path)
+    db.execute(f"CREATE TABLE daily_observations (location TEXT NOT NULL, day INTEGER NOT NULL, "
+               f"{', '.join(f'{name} REAL' for name in DAILY_COLUMNS)}, PRIMARY KEY (location, day)) WITHOUT ROWID")
+    db.execute("INSERT INTO daily_observations VALUES ('city:pune', ?, 4, 10, 20, 15, NULL, NULL, 2, 1)", (DAY,))
+    db.commit()
+    db.close()
+
+    store = ObservationStore(path)
+    store.add('Pune', {'temperature': 20.0, 'humidity': 80.0, 'wind_speed': 2.0}, DAY + 60)
+    store.compact(retention_days=5, now=NOW)
+    row = store.daily('Pune').iloc[0]
+    store.close()
+    assert row['observations'] == 5
+    assert row['temperature_mean'] == pytest.approx((15 * 4 + 20) / 5)
+    assert row['humidity_mean'] == pytest.approx(80.0) and row['humidity_max'] == 80.0
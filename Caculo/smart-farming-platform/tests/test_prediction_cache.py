@@ -0,0 +1,114 @@
+"""Prediction cache LRU, TTL, sqlite tier and invalidation"""
+
+import io
+import os
+
+from PIL import Image
+
+import prediction_cache
+from prediction_cache import PredictionCache, image_cache_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(prediction_cache, 'time', Clock())
+    cache = PredictionCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache, 'time', clock)
+    cache = PredictionCache(ttl_seconds=60)
+    cache.put('a', {'label': 'Rust Disease'})
+    clock.now += 60
+    assert cache.get('a') == {'label': 'Rust Disease'}
+    clock.now += 1
+    assert cache.get('a') is None
+    assert cache.get_stats()['expirations'] == 1
+
+
+def test_disk_tier_survives_restart_and_keeps_entry_age(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache, 'time', clock)
+    path = str(tmp_path / 'cache.db')
+    first = PredictionCache(ttl_seconds=60, disk_path=path, version='v1')
+    first.put('a', {'label': 'Leaf Blight', 'confidence': 91.5})
+    first.close()
+
+    second = PredictionCache(ttl_seconds=60, disk_path=path, version='v1')
+    clock.now += 30
+    assert second.get('a') == {'label': 'Leaf Blight', 'confidence': 91.5}
+    assert second.get_stats()['disk_hits'] == 1
+    # Promoted to memory with its original timestamp, so it still expires on time
+    assert second.get('a') is not None and second.get_stats()['hits'] == 1
+    clock.now += 31
+    assert second.get('a') is None
+    second.close()
+
+
+def test_rows_of_another_model_version_are_purged(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    old = PredictionCache(disk_path=path, version='v1')
+    old.put('a', 1)
+    old.close()
+
+    new = PredictionCache(disk_path=path, version='v2')
+    assert new.get_stats()['disk_entries'] == 0
+    assert new.get('a') is None
+    new.close()
+
+
+def test_disk_tier_is_pruned_to_its_bound(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache, 'time', clock)
+    monkeypatch.setattr(prediction_cache, 'DISK_PRUNE_INTERVAL', 5)
+    cache = PredictionCache(disk_path=str(tmp_path / 'cache.db'), disk_max_entries=3)
+    for i in range(5):
+        clock.now += 1
+        cache.put(f"k{i}", i)
+    assert cache.get_stats()['disk_entries'] == 3
+    cache.close()
+
+
+def test_model_content_change_invalidates_but_touch_does_not(tmp_path):
+    model = tmp_path / 'model.h5'
+    model.write_bytes(b'weights-1')
+    cache = PredictionCache(disk_path=str(tmp_path / 'cache.db'), watch_paths=[str(model)])
+    cache.put('a', 1)
+
+    stat = os.stat(model)
+    os.utime(model, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get('a') == 1
+
+    model.write_bytes(b'new weights')
+    assert cache.get('a') is None
+    stats = cache.get_stats()
+    assert stats['invalidations'] == 1 and stats['disk_entries'] == 0
+    cache.close()
+
+
+def test_image_key_depends_on_pixels_and_version_not_container():
+    image = Image.new('RGB', (8, 8), (40, 120, 30))
+    png, bmp = io.BytesIO(), io.BytesIO()
+    image.save(png, 'PNG')
+    image.save(bmp, 'BMP')
+    from_png, from_bmp = Image.open(png).convert('RGB'), Image.open(bmp).convert('RGB')
+
+    assert image_cache_key(from_png, 'v1') == image_cache_key(from_bmp, 'v1')
+    assert image_cache_key(from_png, 'v1') != image_cache_key(from_png, 'v2')
+    image.putpixel((0, 0), (41, 120, 30))
+    assert image_cache_key(image, 'v1') != image_cache_key(from_png, 'v1')
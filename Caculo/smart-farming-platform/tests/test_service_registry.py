@@ -0,0 +1,69 @@
+"""Service registry reloads, counters and digest memo"""
+
+import threading
+import time
+
+import service_registry
+from service_registry import ServiceRegistry, file_digest
+
+
+class Service:
+    def __init__(self):
+        self.closed = False
+
+    def work(self, started, release):
+        started.set()
+        release.wait(5)
+        if self.closed:
+            raise RuntimeError("used after close")
+        return 'done'
+
+    def close(self):
+        self.closed = True
+
+
+def test_replaced_instance_outlives_in_flight_calls(monkeypatch):
+    monkeypatch.setattr(service_registry, 'RETIRED_SERVICE_GRACE_SECONDS', 0.3)
+    registry = ServiceRegistry()
+    registry.register('service', Service)
+    first = registry.get('service')
+
+    started, release, results = threading.Event(), threading.Event(), []
+    caller = threading.Thread(target=lambda: results.append(first.work(started, release)))
+    caller.start()
+    started.wait(5)
+    second = registry.reload('service')
+    release.set()
+    caller.join(5)
+
+    assert results == ['done'] and second is not first
+    assert not first.closed
+    time.sleep(0.6)
+    assert first.closed and not second.closed
+
+
+def test_hit_counter_is_exact_under_concurrency():
+    registry = ServiceRegistry()
+    registry.register('service', Service)
+    registry.get('service')
+
+    def hammer():
+        for _ in range(2000):
+            registry.get('service')
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.get_metrics()['service']['hits'] == 8 * 2000
+
+
+def test_digest_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(service_registry, 'MAX_DIGEST_MEMO', 4)
+    monkeypatch.setattr(service_registry, '_digest_memo', {})
+    for i in range(10):
+        path = tmp_path / f"file{i}"
+        path.write_bytes(b'x' * i)
+        assert file_digest(str(path)) is not None
+    assert len(service_registry._digest_memo) == 4
@@ -0,0 +1,155 @@
+"""Inverted-index search and suggest against a brute-force scan"""
+
+import random
+
+import pytest
+
+from treatment_advisor import TreatmentAdvisor
+from treatment_catalogue import COST_TIERS, SORT_KEYS, TreatmentCatalogue
+from treatment_index import TEXT_FIELDS, TreatmentIndex, normalize, tokenize
+
+CROPS = ['Tomato', 'Potato', 'Wheat', 'Grape', 'Apple']
+CERTIFICATIONS = ['OMRI Approved', 'EU Organic', 'Rainforest Alliance']
+INGREDIENTS = ['Neem oil', 'Copper soap', 'Baking soda', 'Garlic extract', 'Sulfur', 'Compost tea']
+TYPES = ['Organic Spray', 'Biological Control', 'Cultural Practice']
+WORDS = ['spray', 'weekly', 'leaves', 'morning', 'neem', 'copper', 'dilute', 'soil', 'drench']
+
+
+def random_catalogue(seed=0, diseases=6, per_disease=40):
+    rng = random.Random(seed)
+    data = {}
+    for d in range(diseases):
+        data[f"Disease {d}"] = [{
+            'name': f"Treatment {d}-{i} {rng.choice(WORDS)}",
+            'type': rng.choice(TYPES),
+            'method': ' '.join(rng.sample(WORDS, 2)),
+            'eco_rating': rng.randint(1, 5),
+            'cost': rng.choice(COST_TIERS),
+            'effectiveness': rng.choice([f"{rng.randint(30, 95)}%", 'Variable']),
+            'ingredients': rng.sample(INGREDIENTS, rng.randint(0, 3)),
+            'application': ' '.join(rng.sample(WORDS, 3)),
+            'crops': rng.sample(CROPS, rng.randint(0, 3)),
+            'certifications': rng.sample(CERTIFICATIONS, rng.randint(0, 2)),
+        } for i in range(per_disease)]
+    return TreatmentCatalogue(data)
+
+
+def text_tokens(view):
+    tokens = set()
+    for field in TEXT_FIELDS:
+        values = view.get(field, ())
+        for value in (values,) if isinstance(values, str) else values:
+            tokens.update(tokenize(value))
+    return tokens
+
+
+def brute_force(catalogue, text=None, prefix=False, min_eco=None, max_cost=None, min_effectiveness=None,
+                sort_by='recommended', limit=20, offset=0, **keys):
+    fields = {'crop': 'crops', 'ingredient': 'ingredients', 'type': 'type', 'certification': 'certifications'}
+
+    def matches(record):
+        view = record.view
+        for name, wanted in keys.items():
+            wanted = {normalize(v) for v in ([wanted] if isinstance(wanted, str) else wanted)}
+            values = (record.disease,) if name == 'disease' else view.get(fields[name], ())
+            values = (values,) if isinstance(values, str) else values
+            if not wanted & {normalize(v) for v in values}:
+                return False
+        if text:
+            words, tokens = tokenize(text), text_tokens(view)
+            if not words:
+                return False
+            for position, word in enumerate(words):
+                if prefix and position == len(words) - 1:
+                    if not any(token.startswith(word) for token in tokens):
+                        return False
+                elif word not in tokens:
+                    return False
+        if min_eco is not None and record.eco_rating < min_eco:
+            return False
+        if max_cost is not None and record.cost_rank > COST_TIERS.index(max_cost):
+            return False
+        if min_effectiveness is not None and record.effectiveness_rank < min_effectiveness:
+            return False
+        return True
+
+    file_order = [r for disease in catalogue.diseases() for r in catalogue.records(disease)]
+    found = sorted((r for r in file_order if matches(r)), key=SORT_KEYS[sort_by], reverse=True)
+    return len(found), [r.view for r in found[offset:offset + limit]]
+
+
+def random_query(rng):
+    query = {}
+    if rng.random() < 0.4:
+        query['crop'] = rng.choice(CROPS) if rng.random() < 0.7 else rng.sample(CROPS, 2)
+    if rng.random() < 0.3:
+        query['disease'] = f"disease {rng.randrange(6)}"
+    if rng.random() < 0.3:
+        query['ingredient'] = rng.choice(INGREDIENTS).upper()
+    if rng.random() < 0.2:
+        query['type'] = rng.choice(TYPES)
+    if rng.random() < 0.3:
+        query['certification'] = rng.choice(CERTIFICATIONS)
+    if rng.random() < 0.5:
+        words = rng.sample(WORDS, rng.randint(1, 2))
+        query['prefix'] = rng.random() < 0.5
+        if query['prefix']:
+            words[-1] = words[-1][:rng.randint(1, len(words[-1]))]
+        query['text'] = ' '.join(words)
+    if rng.random() < 0.3:
+        query['min_eco'] = rng.randint(1, 5)
+    if rng.random() < 0.3:
+        query['max_cost'] = rng.choice(COST_TIERS)
+    if rng.random() < 0.2:
+        query['min_effectiveness'] = rng.randint(30, 95)
+    query['sort_by'] = rng.choice(list(SORT_KEYS))
+    query['limit'] = rng.choice([1, 5, 20, 500])
+    query['offset'] = rng.choice([0, 0, 3])
+    return query
+
+
+def test_search_matches_brute_force():
+    catalogue = random_catalogue()
+    index = TreatmentIndex(catalogue)
+    rng = random.Random(1)
+    for _ in range(500):
+        query = random_query(rng)
+        result = index.search(**query)
+        total, page = brute_force(catalogue, **query)
+        assert result['total'] == total, query
+        assert [id(view) for view in result['treatments']] == [id(view) for view in page], query
+
+
+@pytest.mark.parametrize('text', ['?!', '...', ' - '])
+def test_text_without_words_matches_nothing(text):
+    index = TreatmentIndex(random_catalogue())
+    assert index.search(text=text) == {'total': 0, 'treatments': ()}
+    assert index.search(text='')['total'] == len(index)
+
+
+def test_unknown_keys_and_sort_are_rejected():
+    index = TreatmentIndex(random_catalogue())
+    with pytest.raises(ValueError):
+        index.search(colour='green')
+    with pytest.raises(ValueError):
+        index.search(sort_by='price')
+    with pytest.raises(ValueError):
+        index.search(max_cost='Free')
+
+
+def test_suggest_lists_normalized_values_by_prefix():
+    index = TreatmentIndex(random_catalogue())
+    assert index.suggest('crop', 'P') == ['potato']
+    assert index.suggest('certification', '') == sorted(normalize(c) for c in CERTIFICATIONS)
+    assert index.suggest('ingredient', 'c', limit=1) == ['compost tea']
+    assert index.suggest('crop', 'zzz') == []
+    with pytest.raises(ValueError):
+        index.suggest('colour', 'g')
+
+
+def test_recommendations_ignore_a_disease_filter():
+    advisor = TreatmentAdvisor()
+    plain = advisor.get_recommendations('Leaf Blight', min_eco=1)
+    assert advisor.get_recommendations('Leaf Blight', disease='Rust Disease', min_eco=1) == plain
+    assert advisor.get_recommendations('Leaf Blight', disease='Rust Disease') == \
+        advisor.get_recommendations('Leaf Blight')
@@ -0,0 +1,100 @@
+"""Pareto front, per-plot plans and the shared-budget farm plan against brute force"""
+
+import itertools
+import math
+import random
+
+from treatment_catalogue import COST_TIERS, TreatmentCatalogue
+from treatment_optimizer import TreatmentOptimizer, TreatmentSet
+
+DISEASES = ['Leaf Blight', 'Rust Disease', 'Powdery Mildew']
+
+
+def small_catalogue(seed, per_disease=5):
+    rng = random.Random(seed)
+    return TreatmentCatalogue({
+        disease: [{
+            'name': f"{disease} option {i}",
+            'type': 'Organic Spray',
+            'method': 'Foliar spray',
+            'eco_rating': rng.randint(1, 5),
+            'cost': rng.choice(COST_TIERS),
+            'effectiveness': rng.choice([f"{rng.randint(20, 90)}%", 'Variable']),
+        } for i in range(per_disease)]
+        for disease in DISEASES
+    })
+
+
+def all_sets(catalogue, disease, max_treatments=2):
+    records = catalogue.records(disease)
+    return [TreatmentSet(disease, combo)
+            for size in range(1, max_treatments + 1)
+            for combo in itertools.combinations(records, size)]
+
+
+def scores(option):
+    return (option.cost, option.eco_score, option.effectiveness)
+
+
+def test_front_is_exactly_the_non_dominated_scores():
+    for seed in range(10):
+        catalogue = small_catalogue(seed)
+        optimizer = TreatmentOptimizer(catalogue)
+        for disease in DISEASES:
+            candidates = all_sets(catalogue, disease)
+            expected = {scores(c) for c in candidates if not any(o.dominates(c) for o in candidates)}
+            front = optimizer.pareto_front(disease)
+            assert {scores(o) for o in front} == expected
+            assert len(front) == len(expected)
+            assert [o.cost for o in front] == sorted(o.cost for o in front)
+
+
+def test_best_plans_match_brute_force():
+    rng = random.Random(0)
+    for seed in range(10):
+        catalogue = small_catalogue(seed)
+        optimizer = TreatmentOptimizer(catalogue)
+        plots = [rng.choice(DISEASES + ['Unknown']) for _ in range(30)]
+        budgets = [rng.choice([0, 5, 15, 20, 40, 50, 90, 150, math.inf]) for _ in plots]
+        floors = [rng.choice([0, 1, 2.5, 3, 4, 4.5, 5]) for _ in plots]
+        for disease, budget, min_eco, plan in zip(plots, budgets, floors,
+                                                  optimizer.best_plans(plots, budgets, floors)):
+            feasible = [o for o in all_sets(catalogue, disease)
+                        if o.cost <= budget and o.eco_score >= min_eco] if disease in catalogue else []
+            if not feasible:
+                assert plan is None
+                continue
+            assert plan.cost <= budget and plan.eco_score >= min_eco
+            assert plan.effectiveness == max(o.effectiveness for o in feasible)
+
+
+def test_farm_plan_is_near_the_brute_force_optimum():
+    rng = random.Random(1)
+    for seed in range(8):
+        catalogue = small_catalogue(seed, per_disease=4)
+        optimizer = TreatmentOptimizer(catalogue)
+        plots = [rng.choice(DISEASES) for _ in range(3)]
+        budget = rng.choice([10, 30, 60, 100, 200, 1000])
+        min_eco = rng.choice([0, 3, 4])
+        result = optimizer.plan_farm(plots, budget, min_eco)
+
+        choices = [[None] + [o for o in all_sets(catalogue, d) if o.eco_score >= min_eco] for d in plots]
+        best = max(sum(o.effectiveness for o in combo if o)
+                   for combo in itertools.product(*choices)
+                   if sum(o.cost for o in combo if o) <= budget)
+        got = sum(p.effectiveness for p in result['plans'] if p)
+        assert result['total_cost'] <= budget
+        assert all(p is None or p.eco_score >= min_eco for p in result['plans'])
+        assert got <= best + 1e-9
+        # Greedy over hull steps only loses part of the one step the budget cannot cover
+        largest_step = max((o.effectiveness for combo in choices for o in combo if o), default=0)
+        assert got >= best - largest_step - 1e-9
+        if budget >= sum(max((o.cost for o in c if o), default=0) for c in choices):
+            assert math.isclose(got, sum(max((o.effectiveness for o in c if o), default=0) for c in choices))
+
+
+def test_farm_plan_counts_untreated_plots():
+    optimizer = TreatmentOptimizer(small_catalogue(0))
+    result = optimizer.plan_farm(['Leaf Blight', 'Unknown', 'Rust Disease'], total_budget=0)
+    assert result['plans'] == [None, None, None]
+    assert (result['treated_plots'], result['untreated_plots'], result['total_cost']) == (0, 3, 0.0)
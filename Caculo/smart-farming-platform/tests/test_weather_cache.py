@@ -0,0 +1,33 @@
+"""Weather cache stale-while-revalidate and coalescing"""
+
+import threading
+import time
+
+from weather_cache import WeatherCache
+
+
+def test_stale_value_served_while_one_refresh_runs():
+    cache = WeatherCache(ttl_seconds=0.05, stale_seconds=60)
+    assert cache.get('london', lambda: 1) == 1
+    time.sleep(0.1)
+    assert cache.get('london', lambda: 2) == 1
+    for _ in range(100):
+        if cache.get_stats()['in_flight'] == 0:
+            break
+        time.sleep(0.01)
+    assert cache.get('london', lambda: 3) == 2
+    cache.close()
+
+
+def test_stale_lookup_after_close_does_not_block_later_callers():
+    cache = WeatherCache(ttl_seconds=0.05, stale_seconds=60)
+    cache.get('london', lambda: 1)
+    time.sleep(0.1)
+    cache.close()
+    assert cache.get('london', lambda: 2) == 1
+
+    results = []
+    caller = threading.Thread(target=lambda: results.append(cache.get('london', lambda: 3)))
+    caller.start()
+    caller.join(2)
+    assert results == [1] and cache.get_stats()['in_flight'] == 0
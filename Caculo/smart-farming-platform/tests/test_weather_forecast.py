@@ -0,0 +1,62 @@
+"""Forecast ingestion: revised hours, gaps and the rolling window"""
+
+import numpy as np
+
+from weather_forecast import HOUR, HourlySeries, WeatherForecast, rolling_metrics, synthetic_hourly_forecast
+
+START = 1_700_000_000 // HOUR * HOUR
+
+
+def expected_metrics(hourly, window_hours):
+    series = HourlySeries()
+    series.append(hourly['time'], hourly['temperature'], hourly['humidity'],
+                  hourly['wind_speed'], hourly['precipitation'])
+    return rolling_metrics(series, window_hours)
+
+
+def test_refresh_overwrites_overlapping_hours():
+    forecast = WeatherForecast('Testville', window_hours=12)
+    first = synthetic_hourly_forecast('Testville', START, hours=48)
+    forecast.ingest(first)
+
+    # Next fetch starts 6 hours later and is dry and calm, unlike the first
+    second = synthetic_hourly_forecast('Testville', START + 6 * HOUR, hours=48)
+    second['humidity'] = np.full(48, 40.0)
+    second['wind_speed'] = np.zeros(48)
+    second['precipitation'] = np.zeros(48)
+    forecast.ingest(second)
+
+    combined = {key: np.concatenate((first[key][:6], second[key])) for key in first}
+    expected = expected_metrics(combined, 12)
+    np.testing.assert_array_equal(forecast.series.time, combined['time'])
+    np.testing.assert_array_equal(forecast.series.humidity, combined['humidity'].astype(np.float32))
+    for key, values in expected.items():
+        np.testing.assert_array_equal(forecast.hourly_metrics[key], values, err_msg=key)
+
+
+def test_revising_a_single_hour_changes_the_window_from_there():
+    forecast = WeatherForecast('Testville', window_hours=6)
+    hourly = synthetic_hourly_forecast('Testville', START, hours=24)
+    hourly['humidity'] = np.full(24, 50.0)
+    forecast.ingest(hourly)
+    assert forecast.latest_window()['humid_hours'] == 0
+
+    revised = {key: values[10:] for key, values in hourly.items()}
+    revised['humidity'] = revised['humidity'].copy()
+    revised['humidity'][-1] = 95.0
+    forecast.ingest(revised)
+
+    # Hours more than one window before the refresh are trimmed
+    np.testing.assert_array_equal(forecast.series.time, hourly['time'][4:])
+    assert forecast.latest_window()['humid_hours'] == 1
+    assert forecast.hourly_metrics['humid_hours'][:-1].sum() == 0
+
+
+def test_gap_resets_the_series():
+    forecast = WeatherForecast('Testville', window_hours=6)
+    forecast.ingest(synthetic_hourly_forecast('Testville', START, hours=12))
+    later = synthetic_hourly_forecast('Testville', START + 48 * HOUR, hours=12)
+    forecast.ingest(later)
+
+    np.testing.assert_array_equal(forecast.series.time, later['time'])
+    assert forecast.hourly_metrics['window_hours'][0] == 1
@@ -1,8 +1,20 @@
+import argparse
+import os
+import sys
+
+from training_runtime import PRECISION_POLICIES, apply_environment, configure_runtime, launch_local_cluster
+
+# oneDNN is chosen when TensorFlow is imported, so the config is applied first
+apply_environment()
 import tensorflow as tf
 from tensorflow.keras import layers, models
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 import numpy as np
-import os
+
+from crop_disease_model import ARCHITECTURES, TRAINING_CONFIG, build_architecture
+from data_pipeline import DECODERS, DEFAULT_CACHE_DIR, make_datasets
+from dataset_shards import make_shard_datasets
+from training_callbacks import (DEFAULT_CHECKPOINT_DIR, atomic_save, load_checkpoint_state, restore_checkpoint,
+                                training_callbacks)
 
 # CRITICAL: Class labels MUST match training folder order exactly
 CLASS_LABELS = [
@@ -14,9 +26,29 @@ CLASS_LABELS = [
     'Rust Disease'
 ]
 
-def create_model(num_classes=6):
-    """Create CNN model for crop disease classification"""
-    model = models.Sequential([
+def create_model(num_classes=6, jit_compile=False, architecture=None):
+    """
+    Create CNN model for crop disease classification
+    architecture defaults to TRAINING_CONFIG['architecture']; see ARCHITECTURES
+    """
+    architecture = architecture or TRAINING_CONFIG['architecture']
+    if architecture != 'baseline':
+        model = build_architecture(architecture, num_classes)
+    else:
+        model = baseline_model(num_classes)
+    
+    model.compile(
+        optimizer='adam',
+        loss='categorical_crossentropy',
+        metrics=['accuracy'],
+        jit_compile=jit_compile
+    )
+    
+    return model
+
+def baseline_model(num_classes=6):
+    """The original CNN: three conv blocks, Flatten, Dense(512)"""
+    return models.Sequential([
         layers.Conv2D(32, (3, 3), activation='relu', input_shape=(224, 224, 3)),
         layers.BatchNormalization(),
         layers.MaxPooling2D(2, 2),
@@ -35,63 +67,101 @@ def create_model(num_classes=6):
         layers.Flatten(),
         layers.Dense(512, activation='relu'),
         layers.Dropout(0.5),
-        layers.Dense(num_classes, activation='softmax')
+        # float32 softmax, also under mixed precision
+        layers.Dense(num_classes, activation='softmax', dtype='float32')
     ])
-    
-    model.compile(
-        optimizer='adam',
-        loss='categorical_crossentropy',
-        metrics=['accuracy']
-    )
-    
-    return model
 
-def preprocess_data():
-    """Create data generators with proper preprocessing"""
-    # CRITICAL: Same preprocessing as inference
-    train_datagen = ImageDataGenerator(
-        rescale=1./255,  # Normalize to [0,1]
-        rotation_range=20,
-        width_shift_range=0.2,
-        height_shift_range=0.2,
-        horizontal_flip=True,
-        zoom_range=0.2,
-        validation_split=0.2
-    )
-    
-    return train_datagen
+def preprocess_data(data_dir, val_dir=None, batch_size=32, decoder='pil', cache_dir=DEFAULT_CACHE_DIR,
+                    shard_dir=None, val_shard_dir=None, shard=None):
+    """
+    Create streaming train/validation datasets from class folders or packed shards
+    Returns (train_ds, val_ds, counts); with shard=(workers, index) the
+    datasets are this worker's share, batched per worker
+    """
+    # CRITICAL: Same preprocessing as inference (decode, resize, [0,1] scaling)
+    if shard_dir:
+        # Packed once by dataset_shards.py: no decoding at all during training
+        train_ds, val_ds, counts = make_shard_datasets(
+            shard_dir, CLASS_LABELS, val_dir=val_shard_dir, batch_size=batch_size, shard=shard
+        )
+    else:
+        train_ds, val_ds, counts = make_datasets(
+            data_dir, CLASS_LABELS, val_dir=val_dir, batch_size=batch_size,
+            decoder=decoder, cache_dir=cache_dir, shard=shard
+        )
+    print(f"Found {counts['train']} training and {counts['val']} validation images")
+    return train_ds, val_ds, counts
 
-def train_model():
-    """Train the crop disease classification model"""
-    print("Creating model...")
-    model = create_model(len(CLASS_LABELS))
+def demo_dataset(count, batch_size, shard=None):
+    """Random images and labels, generated per batch (demo only)"""
+    num_classes = len(CLASS_LABELS)
+    dataset = tf.data.Dataset.range(count)
+    if shard:
+        dataset = dataset.shard(*shard)
+    return dataset.batch(batch_size).map(lambda ids: (
+        tf.random.uniform((tf.size(ids), 224, 224, 3)),
+        tf.one_hot(tf.random.uniform((tf.size(ids),), 0, num_classes, dtype=tf.int32), num_classes)
+    ))
+
+def train_model(data_dir=None, val_dir=None, epochs=5, batch_size=32, decoder='pil', cache_dir=DEFAULT_CACHE_DIR,
+                shard_dir=None, val_shard_dir=None, runtime=None, checkpoint_dir=DEFAULT_CHECKPOINT_DIR,
+                resume=False, checkpoint_every=None, architecture=None):
+    """
+    Train the crop disease classification model
+    batch_size is the global batch, split between workers when training
+    multi-worker; runtime defaults to TRAINING_CONFIG['runtime']. epochs is
+    the total: resume=True continues from the latest checkpoint in
+    checkpoint_dir up to it (with the same architecture).
+    """
+    runtime = runtime or configure_runtime()
+    worker_batch_size = runtime.worker_batch_size(batch_size)
+    state = load_checkpoint_state(checkpoint_dir) if resume and checkpoint_dir else None
+    if resume and state is None:
+        print(f"No checkpoint in {checkpoint_dir}; starting from scratch")
     
-    # Create dummy training data for demo
-    # In production: replace with real PlantVillage dataset
-    print("Generating training data...")
-    x_train = np.random.random((600, 224, 224, 3))
-    y_train = tf.keras.utils.to_categorical(
-        np.random.randint(0, len(CLASS_LABELS), 600), 
-        num_classes=len(CLASS_LABELS)
-    )
+    print("Creating model...")
+    with runtime.scope():
+        model = create_model(len(CLASS_LABELS), runtime.jit_compile, architecture)
+        if state:
+            restore_checkpoint(model, checkpoint_dir, state)
+    initial_epoch = state['epoch'] if state else 0
+    if state and state['stopped']:
+        print(f"Training already stopped early at epoch {initial_epoch}")
+        initial_epoch = epochs
     
-    x_val = np.random.random((150, 224, 224, 3))
-    y_val = tf.keras.utils.to_categorical(
-        np.random.randint(0, len(CLASS_LABELS), 150),
-        num_classes=len(CLASS_LABELS)
-    )
+    if data_dir or shard_dir:
+        print(f"Streaming training data from {shard_dir or data_dir}...")
+        train_ds, val_ds, counts = preprocess_data(data_dir, val_dir, worker_batch_size, decoder, cache_dir,
+                                                   shard_dir, val_shard_dir, runtime.shard)
+    else:
+        # Create dummy training data for demo
+        # In production: pass --data-dir with a real PlantVillage-style dataset
+        print("Generating training data...")
+        counts = {'train': 600, 'val': 150}
+        train_ds = demo_dataset(counts['train'], worker_batch_size, runtime.shard)
+        val_ds = demo_dataset(counts['val'], worker_batch_size, runtime.shard)
     
     print("Training model...")
-    history = model.fit(
-        x_train, y_train,
-        batch_size=32,
-        epochs=5,  # Demo-friendly
-        validation_data=(x_val, y_val),
-        verbose=1
+    history = runtime.fit(
+        model, train_ds,
+        epochs=epochs,
+        validation_data=val_ds,
+        steps_per_epoch=runtime.steps_per_epoch(counts['train'], batch_size),
+        validation_steps=runtime.steps_per_epoch(counts['val'], batch_size),
+        batch_size=worker_batch_size,
+        verbose=1 if runtime.is_chief else 0,
+        callbacks=training_callbacks(runtime, checkpoint_dir, counts['val'] > 0, state, checkpoint_every),
+        initial_epoch=initial_epoch
     )
     
-    # Save model
-    model.save('models/crop_disease_model.h5')
+    if not runtime.is_chief:
+        # Every worker holds the same weights; only the chief writes them
+        return model, history
+    if runtime.mixed_precision:
+        model = runtime.float32_copy(model, lambda: create_model(len(CLASS_LABELS), architecture=architecture))
+    
+    # Save model (written aside and renamed, so the server never loads half a file)
+    atomic_save(model, 'models/crop_disease_model.h5')
     print("Model saved to models/crop_disease_model.h5")
     
     # Save class labels
@@ -102,11 +172,60 @@ def train_model():
     return model, history
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the crop disease CNN")
+    parser.add_argument('--data-dir', help="folder with one sub-folder per class (omit for random demo data)")
+    parser.add_argument('--val-dir', help="separate validation folder (default: hold out part of --data-dir)")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--decoder', choices=DECODERS, default='pil',
+                        help="pil matches inference preprocessing exactly; tf decodes without the GIL")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="where decoded images are cached")
+    parser.add_argument('--no-cache', action='store_true', help="decode every epoch instead of caching")
+    parser.add_argument('--shards', help="train from a folder packed by dataset_shards.py instead of --data-dir")
+    parser.add_argument('--val-shards', help="separately packed validation folder (default: hold out part of --shards)")
+    parser.add_argument('--architecture', choices=list(ARCHITECTURES),
+                        help="model family (default TRAINING_CONFIG['architecture']); "
+                             "see benchmarks/benchmark_architectures.py")
+    runtime_args = parser.add_argument_group('runtime (defaults from TRAINING_CONFIG["runtime"])')
+    runtime_args.add_argument('--intra-op-threads', type=int, help="threads inside one op (0 = all cores)")
+    runtime_args.add_argument('--inter-op-threads', type=int, help="ops run concurrently")
+    runtime_args.add_argument('--xla', action='store_true', default=None, help="XLA-compile the training step")
+    runtime_args.add_argument('--mixed-precision', choices=PRECISION_POLICIES)
+    runtime_args.add_argument('--multi-worker', action='store_true',
+                              help="MultiWorkerMirroredStrategy over the cluster in TF_CONFIG")
+    runtime_args.add_argument('--local-workers', type=int,
+                              help="run as N local worker processes (a stand-in for a multi-node cluster)")
+    checkpoint_args = parser.add_argument_group('checkpoints')
+    checkpoint_args.add_argument('--checkpoint-dir', default=DEFAULT_CHECKPOINT_DIR,
+                                 help="epoch checkpoints, checkpoint.json and training_log.jsonl")
+    checkpoint_args.add_argument('--checkpoint-every', type=int,
+                                 help="epochs between checkpoints (default TRAINING_CONFIG['checkpoint_every'])")
+    checkpoint_args.add_argument('--resume', action='store_true',
+                                 help="continue from the latest checkpoint up to --epochs")
+    args = parser.parse_args()
+    
+    if args.local_workers and 'TF_CONFIG' not in os.environ:
+        # Re-run this command as the workers of a local cluster
+        sys.exit(launch_local_cluster(args.local_workers, [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]))
+    
     # Create models directory
     os.makedirs('models', exist_ok=True)
     
+    runtime = configure_runtime(
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+        xla_jit=args.xla,
+        mixed_precision=args.mixed_precision,
+        distribution='multi_worker' if args.multi_worker or args.local_workers else None
+    )
+    
     # Train model
-    model, history = train_model()
+    model, history = train_model(args.data_dir, args.val_dir, args.epochs, args.batch_size,
+                                 args.decoder, None if args.no_cache else args.cache_dir,
+                                 args.shards, args.val_shards, runtime, args.checkpoint_dir,
+                                 args.resume, args.checkpoint_every, args.architecture)
+    if not runtime.is_chief:
+        sys.exit(0)
     
     print(f"Training completed!")
     print(f"Classes: {CLASS_LABELS}")
@@ -0,0 +1,257 @@
+"""
+Training callbacks: early stopping, LR reduction, checkpoints, epoch log
+Built from TRAINING_CONFIG for train_model.py and create_dummy_trained_model().
+
+Checkpoints are native .keras archives (weights and optimizer state,
+including the current learning rate). Each is written to a temporary file
+and renamed into place, so a crash mid-write never leaves a truncated
+checkpoint. checkpoint.json is then replaced the same way: it names the
+newest complete checkpoint, its epoch, and the early-stopping and
+LR-reduction counters, so a resumed run continues where the last one
+stopped. Every epoch also appends one JSON line (metrics, learning rate,
+epoch seconds, step time, images/s) to training_log.jsonl.
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'models'))
+
+from crop_disease_model import TRAINING_CONFIG
+
+# Relative, like the model files train_model.py writes
+DEFAULT_CHECKPOINT_DIR = os.path.join('models', 'checkpoints')
+STATE_FILE = 'checkpoint.json'
+LOG_FILE = 'training_log.jsonl'
+# Counters that decide when to stop or cut the learning rate next
+TRACKED_STATE = {
+    'early_stopping': ('wait', 'best', 'best_epoch'),
+    'reduce_lr': ('wait', 'best', 'cooldown_counter'),
+}
+
+
+def _replace_atomically(path, write):
+    directory, name = os.path.split(path)
+    # Keras picks the format from the suffix, so the temporary name keeps it
+    partial = os.path.join(directory or '.', f".partial-{name}")
+    write(partial)
+    os.replace(partial, path)
+
+
+def atomic_save(model, path):
+    """model.save(path) that readers never see half-written"""
+    _replace_atomically(path, model.save)
+
+
+def _write_json(path, data):
+    def write(partial):
+        with open(partial, 'w') as f:
+            json.dump(data, f, indent=2)
+    _replace_atomically(path, write)
+
+
+def load_checkpoint_state(directory):
+    """Contents of checkpoint.json, or None when there is no complete checkpoint"""
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        state = json.load(f)
+    if not os.path.exists(os.path.join(directory, state['file'])):
+        print(f"Checkpoint {state['file']} named in {path} is missing")
+        return None
+    return state
+
+
+def _seed_states(model):
+    # Dropout's random-stream counters, which .keras files leave out
+    # Matched by order: their paths do not name the layer
+    return [variable for variable in model.variables if 'seed_generator_state' in variable.path]
+
+
+def restore_checkpoint(model, directory, state):
+    """Load checkpointed weights and optimizer state into a compiled model of the same architecture"""
+    # Optimizer slots only load into an optimizer that has created them
+    model.optimizer.build(model.trainable_variables)
+    model.load_weights(os.path.join(directory, state['file']))
+    for variable, value in zip(_seed_states(model), state.get('seed_states', [])):
+        variable.assign(np.asarray(value, dtype=variable.dtype))
+    print(f"Resumed from {state['file']} (epoch {state['epoch']})")
+
+
+def _number(value):
+    # JSON-safe: numpy and tensor scalars become int or float
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, np.integer):
+        return int(value)
+    return float(value)
+
+
+def _learning_rate(model):
+    import tensorflow as tf
+    return float(tf.keras.ops.convert_to_numpy(model.optimizer.learning_rate))
+
+
+def epoch_log_callback(path, throughput=None, write=True, append=False):
+    """Keras callback appending one JSON line per epoch; only the chief worker should write"""
+    import tensorflow as tf
+
+    class EpochLog(tf.keras.callbacks.Callback):
+        def on_train_begin(self, logs=None):
+            if write and not append:
+                open(path, 'w').close()
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self.epoch_start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            entry = {'epoch': epoch + 1, 'time': time.time(),
+                     'seconds': time.perf_counter() - self.epoch_start}
+            entry.update({name: _number(value) for name, value in (logs or {}).items()})
+            entry['learning_rate'] = _learning_rate(self.model)
+            if throughput is not None and throughput.epochs and throughput.epochs[-1]['epoch'] == epoch + 1:
+                timing = throughput.epochs[-1]
+                entry.update(steps=timing['steps'], step_ms=timing['step_ms'],
+                             images=timing['images'], images_per_sec=timing['images_per_sec'])
+            if write:
+                with open(path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+
+    return EpochLog()
+
+
+def checkpoint_callback(directory, tracked, every=1, keep=2, write=True, state=None):
+    """
+    Keras callback saving epoch-NNNN.keras every `every` epochs (and after
+    the last one) and keeping the newest `keep`. tracked maps TRACKED_STATE
+    names to callbacks whose counters are checkpointed and, from a resumed
+    state, restored when training starts. Early stopping's best weights go
+    alongside as best-NNNN.npz, so restore_best_weights survives a resume.
+    """
+    import tensorflow as tf
+
+    early_stopping = tracked.get('early_stopping')
+
+    class AtomicCheckpoint(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.files = list(state['files']) if state else []
+            self.best_file = state.get('best_weights') if state else None
+            self.saved_epoch = state['epoch'] if state else None
+            self.last_epoch = None
+
+        def on_train_begin(self, logs=None):
+            # Runs after the tracked callbacks have reset themselves
+            for name, callback in tracked.items():
+                for attribute, value in ((state or {}).get('callbacks', {}).get(name) or {}).items():
+                    setattr(callback, attribute, value)
+            if early_stopping is not None and self.best_file:
+                with np.load(os.path.join(directory, self.best_file)) as arrays:
+                    early_stopping.best_weights = [arrays[f"arr_{i}"] for i in range(len(arrays.files))]
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.last_epoch = epoch + 1
+            if self.last_epoch % every == 0 or self.model.stop_training:
+                self.save(self.last_epoch)
+
+        def on_train_end(self, logs=None):
+            if self.last_epoch is not None and self.saved_epoch != self.last_epoch:
+                self.save(self.last_epoch)
+
+        def save(self, epoch):
+            self.saved_epoch = epoch
+            if not write:
+                return
+            name = f"epoch-{epoch:04d}.keras"
+            start = time.perf_counter()
+            atomic_save(self.model, os.path.join(directory, name))
+            self.files = [f for f in self.files if f != name] + [name]
+            stale = self.files[:-keep]
+            self.files = self.files[-keep:]
+            best_weights = getattr(early_stopping, 'best_weights', None)
+            if best_weights is not None:
+                best_file = f"best-{early_stopping.best_epoch + 1:04d}.npz"
+                if best_file != self.best_file:
+                    def write_best(partial):
+                        with open(partial, 'wb') as f:
+                            np.savez(f, *best_weights)
+                    _replace_atomically(os.path.join(directory, best_file), write_best)
+                    if self.best_file:
+                        stale.append(self.best_file)
+                    self.best_file = best_file
+            _write_json(os.path.join(directory, STATE_FILE), {
+                'epoch': epoch,
+                'file': name,
+                'files': self.files,
+                'best_weights': self.best_file,
+                'seed_states': [np.asarray(variable).tolist() for variable in _seed_states(self.model)],
+                'stopped': bool(self.model.stop_training),
+                'callbacks': {
+                    key: {attribute: _number(getattr(callback, attribute, None))
+                          for attribute in TRACKED_STATE[key]}
+                    for key, callback in tracked.items()
+                },
+                'saved_at': time.time(),
+            })
+            # Old files go only once the state no longer points at them
+            for old in stale:
+                path = os.path.join(directory, old)
+                if os.path.exists(path):
+                    os.remove(path)
+            print(f"Checkpoint {name} saved in {time.perf_counter() - start:.1f}s")
+
+    return AtomicCheckpoint()
+
+
+def training_callbacks(runtime, checkpoint_dir=None, has_validation=True, state=None, checkpoint_every=None):
+    """
+    Early stopping and LR reduction from TRAINING_CONFIG, plus checkpoints
+    and the epoch log when checkpoint_dir is given. state (from
+    load_checkpoint_state) resumes a run; without it, the checkpoints of a
+    previous run in checkpoint_dir are replaced.
+    """
+    import tensorflow as tf
+
+    monitor = 'val_loss' if has_validation else 'loss'
+    verbose = 1 if runtime.is_chief else 0
+    early_stopping = tf.keras.callbacks.EarlyStopping(
+        monitor=monitor, mode='min', patience=TRAINING_CONFIG['early_stopping_patience'],
+        restore_best_weights=True, verbose=verbose)
+    reduce_lr = tf.keras.callbacks.ReduceLROnPlateau(
+        monitor=monitor, mode='min', patience=TRAINING_CONFIG['reduce_lr_patience'],
+        factor=TRAINING_CONFIG['reduce_lr_factor'], min_lr=TRAINING_CONFIG['min_learning_rate'],
+        verbose=verbose)
+    callbacks = [early_stopping, reduce_lr]
+    if checkpoint_dir is None:
+        return callbacks
+
+    write = runtime.is_chief
+    if write:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        # Half-written files from a run that died mid-save
+        stale = [name for name in os.listdir(checkpoint_dir) if name.startswith('.partial-')]
+        previous = load_checkpoint_state(checkpoint_dir) if state is None else None
+        if previous:
+            print(f"Starting a new run: replacing checkpoints of the previous run in {checkpoint_dir} "
+                  f"(use --resume to continue it)")
+            stale += previous['files'] + [STATE_FILE]
+            if previous.get('best_weights'):
+                stale.append(previous['best_weights'])
+        for name in stale:
+            path = os.path.join(checkpoint_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    callbacks.append(epoch_log_callback(os.path.join(checkpoint_dir, LOG_FILE), runtime.throughput, write,
+                                        append=state is not None))
+    # Last, so it records the counters after this epoch's updates
+    callbacks.append(checkpoint_callback(checkpoint_dir, {'early_stopping': early_stopping, 'reduce_lr': reduce_lr},
+                                         checkpoint_every or TRAINING_CONFIG['checkpoint_every'],
+                                         TRAINING_CONFIG['keep_checkpoints'], write, state))
+    return callbacks
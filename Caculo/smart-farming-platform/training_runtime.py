@@ -0,0 +1,346 @@
+"""
+CPU training runtime: threads, oneDNN, XLA, mixed precision, multi-worker
+Settings come from TRAINING_CONFIG['runtime'] (models/crop_disease_model.py)
+with per-run overrides:
+
+    intra_op_threads   threads used inside one op (0 = TensorFlow default, all cores)
+    inter_op_threads   independent ops run at once (0 = TensorFlow default)
+    onednn             oneDNN kernels; read once, when TensorFlow is first imported
+    xla_jit            compile the training step with XLA
+    mixed_precision    'float32' or 'mixed_bfloat16' (worth it on CPUs with AVX512-BF16 / AMX)
+    distribution       None, or 'multi_worker' for tf.distribute.MultiWorkerMirroredStrategy
+                       across the nodes listed in TF_CONFIG
+
+launch_local_cluster() stands in for a real cluster: it starts the same
+command as several local processes, each with its own TF_CONFIG.
+
+Keras 3's fit() cannot consume MultiWorkerMirroredStrategy datasets (its
+symbolic build reduces the whole (x, y) batch across workers and fails), so
+multi-worker runs use the step loop below; gradients are still all-reduced
+by the strategy. Every run reports step time and images/s per epoch.
+"""
+
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'models'))
+
+from crop_disease_model import TRAINING_CONFIG
+
+DISTRIBUTIONS = (None, 'multi_worker')
+PRECISION_POLICIES = ('float32', 'mixed_bfloat16')
+
+
+def runtime_settings(**overrides):
+    """TRAINING_CONFIG['runtime'] with the given (non-None) overrides"""
+    settings = dict(TRAINING_CONFIG['runtime'])
+    unknown = set(overrides) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown runtime settings: {', '.join(sorted(unknown))}")
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    if settings['mixed_precision'] not in PRECISION_POLICIES:
+        raise ValueError(f"mixed_precision must be one of {', '.join(PRECISION_POLICIES)}")
+    if settings['distribution'] not in DISTRIBUTIONS:
+        raise ValueError(f"distribution must be None or 'multi_worker'")
+    return settings
+
+
+def apply_environment(settings=None):
+    """
+    Settings TensorFlow reads from the environment at import time. An
+    explicit TF_ENABLE_ONEDNN_OPTS in the environment wins.
+    """
+    settings = settings or TRAINING_CONFIG['runtime']
+    wanted = '1' if settings['onednn'] else '0'
+    if 'tensorflow' in sys.modules:
+        if os.environ.get('TF_ENABLE_ONEDNN_OPTS', wanted) != wanted:
+            print("oneDNN setting ignored: TensorFlow is already imported")
+        return
+    os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', wanted)
+
+
+class ThroughputLogger:
+    """Per-epoch step time and images/s, shared by fit() and the multi-worker loop"""
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.epochs = []
+
+    def record(self, epoch, step_seconds, images, seconds):
+        entry = {
+            'epoch': epoch,
+            'steps': len(step_seconds),
+            'step_ms': float(np.median(step_seconds) * 1000) if len(step_seconds) else 0.0,
+            'images': int(images),
+            'images_per_sec': images / seconds if seconds > 0 else 0.0,
+        }
+        self.epochs.append(entry)
+        if self.verbose:
+            print(f"  epoch {epoch}: step {entry['step_ms']:.1f} ms (median), "
+                  f"{entry['images_per_sec']:.1f} images/s")
+        return entry
+
+    def callback(self, batch_size):
+        """Keras callback timing every training step of model.fit"""
+        import tensorflow as tf
+        logger = self
+
+        class StepTimer(tf.keras.callbacks.Callback):
+            def on_epoch_begin(self, epoch, logs=None):
+                self.steps, self.epoch_start = [], time.perf_counter()
+
+            def on_train_batch_begin(self, batch, logs=None):
+                self.step_start = time.perf_counter()
+
+            def on_train_batch_end(self, batch, logs=None):
+                self.steps.append(time.perf_counter() - self.step_start)
+
+            def on_epoch_end(self, epoch, logs=None):
+                # Training steps only, so validation does not dilute images/s
+                logger.record(epoch + 1, self.steps, len(self.steps) * batch_size, sum(self.steps))
+
+        return StepTimer()
+
+
+class TrainingRuntime:
+    """
+    Configured TensorFlow runtime for one training process
+    - scope(): build and compile models inside it
+    - num_workers / worker_index / is_chief, shard and worker_batch_size()
+      for splitting input between workers
+    - fit(model, dataset, epochs, ...): model.fit, or the multi-worker loop
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        apply_environment(settings)
+
+        import tensorflow as tf
+
+        for name, setter, getter in (
+            ('intra_op_threads', tf.config.threading.set_intra_op_parallelism_threads,
+             tf.config.threading.get_intra_op_parallelism_threads),
+            ('inter_op_threads', tf.config.threading.set_inter_op_parallelism_threads,
+             tf.config.threading.get_inter_op_parallelism_threads),
+        ):
+            if settings[name] and getter() != settings[name]:
+                try:
+                    setter(settings[name])
+                except RuntimeError:
+                    print(f"{name} ignored: TensorFlow has already started running ops")
+
+        tf.keras.mixed_precision.set_global_policy(settings['mixed_precision'])
+
+        self.strategy = None
+        self.num_workers, self.worker_index = 1, 0
+        if settings['distribution'] == 'multi_worker':
+            if 'TF_CONFIG' not in os.environ:
+                raise ValueError("multi_worker training needs TF_CONFIG describing the cluster "
+                                 "(or launch local workers with launch_local_cluster)")
+            self.strategy = tf.distribute.MultiWorkerMirroredStrategy()
+            resolver = self.strategy.cluster_resolver
+            self.num_workers = resolver.cluster_spec().num_tasks('worker')
+            self.worker_index = resolver.task_id
+        self.throughput = ThroughputLogger(verbose=self.is_chief)
+
+    @property
+    def is_chief(self):
+        return self.worker_index == 0
+
+    @property
+    def jit_compile(self):
+        return bool(self.settings['xla_jit'])
+
+    @property
+    def mixed_precision(self):
+        return self.settings['mixed_precision'] != 'float32'
+
+    @property
+    def shard(self):
+        """(num_workers, worker_index) for the data pipelines, or None on one worker"""
+        return (self.num_workers, self.worker_index) if self.strategy else None
+
+    def worker_batch_size(self, global_batch_size):
+        return max(1, global_batch_size // self.num_workers)
+
+    def steps_per_epoch(self, examples, global_batch_size):
+        """
+        Steps each worker runs per epoch over its shard of examples; None on
+        one worker, where the end of the dataset ends the epoch
+        """
+        if self.strategy is None:
+            return None
+        return max(1, (examples // self.num_workers) // self.worker_batch_size(global_batch_size))
+
+    def scope(self):
+        return self.strategy.scope() if self.strategy else contextlib.nullcontext()
+
+    def describe(self):
+        import tensorflow as tf
+        threading = tf.config.threading
+        threads = lambda n: n or 'default'
+        return (f"intra-op threads {threads(threading.get_intra_op_parallelism_threads())}, "
+                f"inter-op threads {threads(threading.get_inter_op_parallelism_threads())}, "
+                f"oneDNN {'on' if os.environ.get('TF_ENABLE_ONEDNN_OPTS', '1') != '0' else 'off'}, "
+                f"XLA {'on' if self.jit_compile else 'off'}, {self.settings['mixed_precision']}, "
+                f"{self.num_workers} worker(s)")
+
+    def fit(self, model, dataset, epochs, validation_data=None, steps_per_epoch=None,
+            validation_steps=None, batch_size=None, verbose=1, callbacks=None, initial_epoch=0):
+        """
+        Train on a batched dataset; returns a Keras History. With several
+        workers each one passes its own shard, batched per worker, plus
+        steps_per_epoch (the same on every worker). callbacks run after the
+        step timer, so they see this epoch's throughput.
+        """
+        batch_size = batch_size or TRAINING_CONFIG['batch_size']
+        callbacks = [self.throughput.callback(batch_size)] + list(callbacks or [])
+        if self.strategy is None:
+            return model.fit(dataset, epochs=epochs, validation_data=validation_data,
+                             steps_per_epoch=steps_per_epoch, validation_steps=validation_steps,
+                             callbacks=callbacks, initial_epoch=initial_epoch, verbose=verbose)
+        if not steps_per_epoch:
+            raise ValueError("multi-worker training needs steps_per_epoch, equal on every worker")
+        # The loop times steps itself
+        return self._fit_multi_worker(model, dataset, epochs, validation_data, steps_per_epoch,
+                                      validation_steps, callbacks[1:], initial_epoch)
+
+    def _fit_multi_worker(self, model, dataset, epochs, validation_data, steps_per_epoch, validation_steps,
+                          callbacks, initial_epoch):
+        import tensorflow as tf
+
+        strategy = self.strategy
+        loss_fn = tf.keras.losses.CategoricalCrossentropy(reduction=None)
+        optimizer = model.optimizer
+
+        def totals(labels, probabilities, per_example_loss):
+            correct = tf.equal(tf.argmax(labels, axis=1), tf.argmax(probabilities, axis=1))
+            return (tf.reduce_sum(per_example_loss), tf.reduce_sum(tf.cast(correct, tf.float32)),
+                    tf.cast(tf.shape(labels)[0], tf.float32))
+
+        def gradients(images, labels):
+            with tf.GradientTape() as tape:
+                probabilities = tf.cast(model(images, training=True), tf.float32)
+                per_example_loss = loss_fn(labels, probabilities)
+                # Mean over the global batch: the all-reduce sums the replicas
+                loss = tf.nn.compute_average_loss(per_example_loss)
+            return tape.gradient(loss, model.trainable_variables), totals(labels, probabilities, per_example_loss)
+
+        if self.jit_compile:
+            # The all-reduce in apply_gradients stays outside the XLA cluster
+            gradients = tf.function(gradients, jit_compile=True)
+
+        def replica_train_step(images, labels):
+            grads, sums = gradients(images, labels)
+            optimizer.apply_gradients(zip(grads, model.trainable_variables))
+            return sums
+
+        def replica_eval_step(images, labels):
+            probabilities = tf.cast(model(images, training=False), tf.float32)
+            return totals(labels, probabilities, loss_fn(labels, probabilities))
+
+        @tf.function
+        def train_step(iterator):
+            return [strategy.reduce('SUM', value, axis=None)
+                    for value in strategy.run(replica_train_step, args=next(iterator))]
+
+        @tf.function
+        def eval_step(iterator):
+            return [strategy.reduce('SUM', value, axis=None)
+                    for value in strategy.run(replica_eval_step, args=next(iterator))]
+
+        def distribute(data):
+            # Already sharded per worker; repeat() keeps every worker stepping in lockstep
+            data = data.repeat()
+            return iter(strategy.distribute_datasets_from_function(lambda context: data))
+
+        train_iterator = distribute(dataset)
+        val_iterator = distribute(validation_data) if validation_data is not None else None
+        validation_steps = validation_steps or 1
+
+        callback_list = tf.keras.callbacks.CallbackList(callbacks, add_history=True, model=model,
+                                                        epochs=epochs, steps=steps_per_epoch, verbose=0)
+        model.stop_training = False
+        callback_list.on_train_begin()
+        for epoch in range(initial_epoch, epochs):
+            callback_list.on_epoch_begin(epoch)
+            step_seconds, sums = [], np.zeros(3)
+            for _ in range(steps_per_epoch):
+                start = time.perf_counter()
+                sums += [float(value) for value in train_step(train_iterator)]
+                step_seconds.append(time.perf_counter() - start)
+            logs = {'loss': sums[0] / sums[2], 'accuracy': sums[1] / sums[2]}
+            if val_iterator is not None:
+                val_sums = np.zeros(3)
+                for _ in range(validation_steps):
+                    val_sums += [float(value) for value in eval_step(val_iterator)]
+                logs.update(val_loss=val_sums[0] / val_sums[2], val_accuracy=val_sums[1] / val_sums[2])
+            if self.is_chief:
+                print(f"Epoch {epoch + 1}/{epochs}: " + ", ".join(f"{k} {v:.4f}" for k, v in logs.items()))
+            self.throughput.record(epoch + 1, step_seconds, sums[2], sum(step_seconds))
+            callback_list.on_epoch_end(epoch, logs)
+            # Every worker sees the same reduced logs, so they all stop together
+            if model.stop_training:
+                break
+        callback_list.on_train_end()
+        return model.history
+
+    def float32_copy(self, model, build):
+        """
+        Same weights in a float32 model from build(), for saving a model
+        trained under mixed precision (the served model stays float32)
+        """
+        import tensorflow as tf
+
+        tf.keras.mixed_precision.set_global_policy('float32')
+        copy = build()
+        copy.set_weights(model.get_weights())
+        tf.keras.mixed_precision.set_global_policy(self.settings['mixed_precision'])
+        return copy
+
+
+def configure_runtime(**overrides):
+    """TrainingRuntime for TRAINING_CONFIG['runtime'] plus overrides"""
+    runtime = TrainingRuntime(runtime_settings(**overrides))
+    if runtime.is_chief:
+        print(f"Training runtime: {runtime.describe()}")
+    return runtime
+
+
+def _free_ports(count):
+    sockets = [socket.socket() for _ in range(count)]
+    for s in sockets:
+        s.bind(('localhost', 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def launch_local_cluster(num_workers, command, env=None):
+    """
+    Run command as num_workers local processes forming one multi-worker
+    cluster (TF_CONFIG per process, worker 0 is the chief). Returns the
+    first non-zero exit code, or 0.
+    """
+    cluster = {'worker': [f"localhost:{port}" for port in _free_ports(num_workers)]}
+    processes = []
+    try:
+        for index in range(num_workers):
+            worker_env = dict(os.environ if env is None else env)
+            worker_env['TF_CONFIG'] = json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}})
+            processes.append(subprocess.Popen(command, env=worker_env))
+        codes = [process.wait() for process in processes]
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+    return next((code for code in codes if code), 0)